@@ -0,0 +1,69 @@
+/*
+ * Client-side route drawing for the "client" render mode.
+ * The Leaflet base map is created once on first call; each route
+ * selection only swaps the layer of encoded legs sent by the server.
+ */
+function decodePolyline(encoded, precision) {
+    const factor = Math.pow(10, precision || 5);
+    const points = [];
+    let index = 0, lat = 0, lon = 0;
+    while (index < encoded.length) {
+        const deltas = [0, 0];
+        for (let axis = 0; axis < 2; axis++) {
+            let shift = 0, result = 0, byte;
+            do {
+                byte = encoded.charCodeAt(index++) - 63;
+                result |= (byte & 0x1f) << shift;
+                shift += 5;
+            } while (byte >= 0x20);
+            deltas[axis] = (result & 1) ? ~(result >> 1) : (result >> 1);
+        }
+        lat += deltas[0];
+        lon += deltas[1];
+        points.push([lat / factor, lon / factor]);
+    }
+    return points;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    green_mapper: {
+        draw_route: function(route, base) {
+            const container = document.getElementById('leaflet-map');
+            if (!container || typeof L === 'undefined') {
+                return window.dash_clientside.no_update;
+            }
+
+            let state = container._greenMapper;
+            if (!state) {
+                const map = L.map(container).setView(base.location, base.zoom_start);
+                L.tileLayer(base.tiles_url, {
+                    attribution: base.attribution,
+                    maxZoom: 19,
+                }).addTo(map);
+                state = container._greenMapper = {map: map, layer: null};
+            }
+
+            if (state.layer) {
+                state.map.removeLayer(state.layer);
+                state.layer = null;
+            }
+            if (route) {
+                const layer = L.layerGroup();
+                route.legs.forEach(function(leg) {
+                    L.polyline(decodePolyline(leg.polyline), {
+                        color: leg.colour,
+                        weight: 8,
+                        opacity: 1,
+                    }).addTo(layer);
+                });
+                route.markers.forEach(function(marker) {
+                    L.marker(marker.location).bindPopup(marker.popup).addTo(layer);
+                });
+                state.layer = layer.addTo(state.map);
+                // recentre on the start point like the folium render does
+                state.map.panTo(route.center);
+            }
+            return '';
+        }
+    }
+});
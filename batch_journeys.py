@@ -0,0 +1,115 @@
+"""
+This script plans many origin-destination pairs
+concurrently through a shared TFL API client, streaming
+the parsed journeys back as they complete
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional, Union
+
+from get_routes import Journey
+from response_cache import ResponseCache
+from tfl_client import TflClient
+
+
+class BatchResult():
+    """
+    The outcome of planning one item of a batch.
+
+    Attributes:
+        index (int): position of the item in the input iterable
+        start: start point of the item
+        end: end point of the item
+        journey (Journey): the planned journey with routes extracted, None on failure
+        error (str): description of the failure, None on success
+    """
+
+    def __init__(
+            self,
+            index: int,
+            start: Union[float, str],
+            end: Union[float, str],
+            journey: Optional[Journey] = None,
+            error: Optional[str] = None,
+        ):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.journey = journey
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        outcome = "ok" if self.ok else f"error: {self.error}"
+        return f"BatchResult {self.index} from {self.start} to {self.end} ({outcome})"
+
+
+def plan_journey(
+        index: int,
+        start: Union[float, str],
+        end: Union[float, str],
+        route_params: dict,
+        client: TflClient,
+        cache: Optional[ResponseCache] = None,
+    ) -> BatchResult:
+    """
+    Plans a single item of a batch, catching any failure so that
+    one bad pair does not stop the rest of the batch
+    """
+    try:
+        journey = Journey(
+            points=(start, end),
+            route_params=route_params,
+            cache=cache,
+            client=client,
+        )
+        journey.retrieve_routes()
+        if journey.full_content is None:
+            return BatchResult(index, start, end, journey, error=journey.status)
+        journey.extract_route_info()
+        return BatchResult(index, start, end, journey)
+    except Exception as error:
+        return BatchResult(index, start, end, error=client.describe_error(error))
+
+
+def plan_journeys(
+        od_pairs: Iterable[tuple],
+        client: TflClient,
+        cache: Optional[ResponseCache] = None,
+        max_in_flight: int = 8,
+    ) -> Iterator[BatchResult]:
+    """
+    Plans an iterable of `(start, end, route_params)` items concurrently
+    and yields a BatchResult for each one in order of completion.
+
+    At most `max_in_flight` requests are outstanding at once and the
+    input is consumed lazily, so arbitrarily long batches can be streamed.
+    The request rate is governed by the client's rate limiter.
+    """
+    pairs = iter(od_pairs)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        in_flight = set()
+        index = 0
+        exhausted = False
+        while True:
+            # top up the pool from the input iterable
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    start, end, route_params = next(pairs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight.add(
+                    executor.submit(plan_journey, index, start, end, route_params, client, cache)
+                )
+                index += 1
+
+            if not in_flight:
+                return
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
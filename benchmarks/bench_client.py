@@ -0,0 +1,59 @@
+"""
+Compares a fresh connection per request (the old bare
+`requests.get`) against the pooled keep-alive TflClient
+using a local stub server over plain HTTP and over TLS.
+
+Run from the repository root:
+    python -m benchmarks.bench_client
+"""
+
+import time
+import warnings
+from functools import partial
+
+import requests
+import urllib3
+
+from benchmarks.stub_server import StubServer
+from tfl_client import Credentials, TflClient
+
+N_REQUESTS = 500
+
+
+def time_requests(fetch, url: str, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fetch(url).content
+    return time.perf_counter() - start
+
+
+def compare(tls: bool):
+    with StubServer(tls=tls) as server:
+        client = TflClient(Credentials("id", "key"), base_url=server.base_url)
+        # the stub uses a self-signed certificate
+        client.session.verify = False
+        client.session.trust_env = False
+        url = client.journey_url("SW1A1AA", "EC3N4AB", {})
+        fresh_get = partial(requests.get, verify=False)
+
+        # warm both paths once so imports and first connect are excluded
+        fresh_get(url)
+        client.get(url)
+
+        fresh = time_requests(fresh_get, url, N_REQUESTS)
+        pooled = time_requests(client.get, url, N_REQUESTS)
+
+    print(f"{'https' if tls else 'http'} x {N_REQUESTS} requests")
+    print(f"  fresh connection:  {fresh * 1e3 / N_REQUESTS:.3f} ms/request")
+    print(f"  pooled keep-alive: {pooled * 1e3 / N_REQUESTS:.3f} ms/request")
+    print(f"  speed-up:          {fresh / pooled:.2f}x")
+
+
+def main():
+    warnings.simplefilter("ignore", urllib3.exceptions.InsecureRequestWarning)
+    compare(tls=False)
+    compare(tls=True)
+
+
+if __name__ == "__main__":
+    main()
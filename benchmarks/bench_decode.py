@@ -0,0 +1,58 @@
+"""
+Times the lineString decoder against the previous
+`ast.literal_eval` parse, per leg and for a whole
+`Journey.extract_route_info` call.
+
+Run from the repository root:
+    python -m benchmarks.bench_decode
+"""
+
+import ast
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_journey_response
+from get_routes import Journey, decode_line_string
+from tfl_client import Credentials, TflClient
+
+RESPONSES = {
+    'short walk (1 route x 1 leg x 50 points)': (1, 1, 50),
+    'multi-leg tube (4 routes x 4 legs x 150 points)': (4, 4, 150),
+    'long cycle with alternatives (6 routes x 2 legs x 3000 points)': (6, 2, 3000),
+}
+
+
+def offline_journey(content: dict) -> Journey:
+    """
+    Builds a journey around an already decoded response
+    """
+    journey = Journey(("A", "B"), client=TflClient(Credentials("id", "key")))
+    journey.full_content = content
+    return journey
+
+
+def main():
+    for name, shape in RESPONSES.items():
+        content = synthetic_journey_response(*shape)
+        line_strings = [
+            leg['path']['lineString'] for route in content['journeys'] for leg in route['legs']
+        ]
+        for line_string in line_strings:
+            assert np.allclose(decode_line_string(line_string), ast.literal_eval(line_string))
+
+        n = 20
+        legacy = timeit.timeit(
+            lambda: [[tuple(p) for p in ast.literal_eval(s)] for s in line_strings], number=n
+        ) / n
+        decoded = timeit.timeit(lambda: [decode_line_string(s) for s in line_strings], number=n) / n
+        extract = timeit.timeit(lambda: offline_journey(content).extract_route_info(), number=n) / n
+
+        print(name)
+        print(f"  literal_eval decode:  {legacy * 1e3:8.2f} ms")
+        print(f"  decode_line_string:   {decoded * 1e3:8.2f} ms  ({legacy / decoded:.1f}x)")
+        print(f"  extract_route_info:   {extract * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Validates the vectorised haversine distance kernel against
+the scalar reference and times it against the previous
+pure Python loop over long cycle and bus paths.
+
+Run from the repository root:
+    python -m benchmarks.bench_distance
+"""
+
+import math
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import random_walk_path
+from get_routes import haversine_distance, path_distance, path_distances
+
+PATHS = {
+    'bus (400 points)': 400,
+    'long cycle (3000 points)': 3000,
+    'cross-London cycle (10000 points)': 10000,
+}
+
+
+def legacy_path_distance(points) -> float:
+    """
+    The previous planar loop, kept here only for timing
+    """
+    tot_dist = 0.0
+    for i in range(len(points) - 1):
+        tot_dist += math.sqrt(
+            (points[i + 1][0] - points[i][0])**2 + (points[i + 1][0] - points[i][0])**2
+        )
+    return tot_dist
+
+
+def reference_path_distance(points) -> float:
+    return sum(haversine_distance(points[i], points[i + 1]) for i in range(len(points) - 1))
+
+
+def main():
+    for name, n_points in PATHS.items():
+        array = random_walk_path(n_points)
+        tuples = [tuple(point) for point in array]
+
+        reference = reference_path_distance(tuples)
+        vectorised = path_distance(array)
+        assert math.isclose(vectorised, reference, rel_tol=1e-9), (vectorised, reference)
+
+        n = 200
+        legacy_s = timeit.timeit(lambda: legacy_path_distance(tuples), number=n) / n
+        vector_s = timeit.timeit(lambda: path_distance(array), number=n) / n
+        print(f"{name}: {vectorised:,.1f} m")
+        print(f"  legacy loop:  {legacy_s * 1e6:9.1f} us")
+        print(f"  vectorised:   {vector_s * 1e6:9.1f} us  ({legacy_s / vector_s:.1f}x)")
+
+    # a batch of 500 legs of mixed lengths in one call
+    legs = [random_walk_path(n, seed=i) for i, n in enumerate(np.random.default_rng(1).integers(2, 2000, 500))]
+    batch = path_distances(legs)
+    assert np.allclose(batch, [path_distance(leg) for leg in legs])
+    n = 20
+    loop_s = timeit.timeit(lambda: [legacy_path_distance(leg) for leg in legs], number=n) / n
+    batch_s = timeit.timeit(lambda: path_distances(legs), number=n) / n
+    print(f"batch of {len(legs)} legs ({sum(map(len, legs)):,} points)")
+    print(f"  legacy loop:  {loop_s * 1e3:9.2f} ms")
+    print(f"  vectorised:   {batch_s * 1e3:9.2f} ms  ({loop_s / batch_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
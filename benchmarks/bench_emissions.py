@@ -0,0 +1,54 @@
+"""
+Times the vectorised emissions scorer on a million legs
+against the previous per-leg EnvImpacts() lookup and
+Python sum, and checks both give the same totals.
+
+Run from the repository root:
+    python -m benchmarks.bench_emissions
+"""
+
+import time
+
+import numpy as np
+
+from get_env_impacts import ENV_IMPACTS, EnvImpacts
+
+N_LEGS = 1_000_000
+MAX_LEGS_PER_ROUTE = 6
+
+
+def legacy_score(modes, distances, route_offsets) -> list:
+    leg_co2 = [EnvImpacts().co2[mode] * distance * 0.001 for mode, distance in zip(modes, distances)]
+    return [sum(leg_co2[start:end]) for start, end in zip(route_offsets[:-1], route_offsets[1:])]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    codes = rng.integers(len(ENV_IMPACTS.modes), size=N_LEGS)
+    distances = rng.uniform(50, 20_000, size=N_LEGS)
+    route_lengths = rng.integers(1, MAX_LEGS_PER_ROUTE + 1, size=N_LEGS)
+    route_offsets = np.concatenate([[0], np.cumsum(route_lengths)])
+    route_offsets = np.append(route_offsets[route_offsets < N_LEGS], N_LEGS)
+    modes = [ENV_IMPACTS.modes[code] for code in codes]
+
+    start = time.perf_counter()
+    legacy = legacy_score(modes, distances.tolist(), route_offsets.tolist())
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, by_name = ENV_IMPACTS.score(modes, distances, route_offsets)
+    names_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, by_code = ENV_IMPACTS.score(codes, distances, route_offsets)
+    codes_s = time.perf_counter() - start
+
+    assert np.allclose(legacy, by_code) and np.array_equal(by_name, by_code)
+    print(f"{N_LEGS:,} legs in {len(route_offsets) - 1:,} routes")
+    print(f"  per-leg EnvImpacts loop: {legacy_s * 1e3:9.1f} ms")
+    print(f"  vectorised, mode names:  {names_s * 1e3:9.1f} ms  ({legacy_s / names_s:.0f}x)")
+    print(f"  vectorised, mode codes:  {codes_s * 1e3:9.1f} ms  ({legacy_s / codes_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
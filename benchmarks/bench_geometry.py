@@ -0,0 +1,42 @@
+"""
+Measures the memory a fully extracted journey holds on to once
+its decoded response has been dropped, in total and per path point.
+
+Run from the repository root:
+    python -m benchmarks.bench_geometry
+"""
+
+import tracemalloc
+
+from benchmarks.bench_decode import RESPONSES, offline_journey
+from benchmarks.synthetic import synthetic_journey_response
+
+
+def retained_bytes(content: dict) -> int:
+    tracemalloc.start()
+    journey = offline_journey(content)
+    journey.extract_route_info()
+    journey.full_content = None
+    # plotting and ranking read every route's path and distance
+    for route in journey.routes.values():
+        route.path
+        route.total_distance
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained
+
+
+def main():
+    for name, shape in RESPONSES.items():
+        content = synthetic_journey_response(*shape)
+        n_points = sum(
+            len(leg['path']['lineString'].split('],[')) + 2
+            for route in content['journeys'] for leg in route['legs']
+        )
+        retained = retained_bytes(content)
+        print(name)
+        print(f"  retained: {retained / 1024:9.1f} KiB  {retained / n_points:6.1f} bytes/point")
+
+
+if __name__ == "__main__":
+    main()
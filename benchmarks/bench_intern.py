@@ -0,0 +1,84 @@
+"""
+Compares building every route of a response with a Leg of its own
+against interning legs in a `LegTable`, so legs shared between
+alternatives are parsed, measured and scored once. Reports the
+build time and the memory held by the routes, for the recorded
+fixtures and for synthetic responses whose alternatives share legs.
+
+Run from the repository root:
+    python -m benchmarks.bench_intern
+"""
+
+import copy
+import json
+import os
+import timeit
+import tracemalloc
+
+from benchmarks.make_fixtures import FIXTURE_DIR
+from benchmarks.synthetic import synthetic_journey_response
+from get_routes import LegTable, Route
+
+
+def shared_leg_response(n_routes: int, legs_per_route: int, points_per_leg: int) -> dict:
+    """
+    Returns a synthetic response whose alternatives all start with the
+    same walk, and half of them then take the same second leg
+    """
+    content = synthetic_journey_response(n_routes, legs_per_route, points_per_leg)
+    first = content['journeys'][0]['legs']
+    for i, journey in enumerate(content['journeys']):
+        journey['legs'][0] = copy.deepcopy(first[0])
+        if i % 2 == 0:
+            journey['legs'][1] = copy.deepcopy(first[1])
+    return content
+
+
+def responses() -> dict[str, dict]:
+    found = {}
+    for file_name in sorted(os.listdir(FIXTURE_DIR)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(FIXTURE_DIR, file_name)) as file:
+                found[f"fixture {file_name[:-len('.json')]}"] = json.load(file)
+    found['shared legs (6 routes x 4 legs x 150 points)'] = shared_leg_response(6, 4, 150)
+    found['shared legs (8 routes x 3 legs x 1000 points)'] = shared_leg_response(8, 3, 1000)
+    return found
+
+
+def build(content: dict, intern: bool) -> dict[int, Route]:
+    leg_table = LegTable() if intern else None
+    return {
+        i: Route(journey_info, leg_table=leg_table)
+        for i, journey_info in enumerate(content['journeys'])
+    }
+
+
+def retained(content: dict, intern: bool) -> int:
+    """
+    Returns the memory held by the built routes, in bytes
+    """
+    tracemalloc.start()
+    routes = build(content, intern)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del routes
+    return held
+
+
+def main():
+    n = 20
+    for name, content in responses().items():
+        routes = build(content, intern=True)
+        legs = sum(route.num_legs for route in routes.values())
+        unique = len({id(leg) for route in routes.values() for leg in route.legs.values()})
+        print(f"{name}: {len(routes)} routes, {legs} legs, {unique} distinct")
+        for mode, intern in {'leg per route': False, 'interned legs': True}.items():
+            seconds = timeit.timeit(lambda: build(content, intern), number=n) / n
+            print(
+                f"  {mode:15s} {seconds * 1e3:8.3f} ms"
+                f"  retained {retained(content, intern) / 1024:9.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
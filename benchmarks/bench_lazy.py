@@ -0,0 +1,53 @@
+"""
+Compares eager and lazy route extraction on the time and
+peak memory needed to produce the route dropdown labels,
+and the cost of then opening a single route.
+
+Run from the repository root:
+    python -m benchmarks.bench_lazy
+"""
+
+import timeit
+import tracemalloc
+
+from benchmarks.bench_decode import RESPONSES, offline_journey
+from benchmarks.synthetic import synthetic_journey_response
+
+
+def dropdown(content: dict, lazy: bool) -> list:
+    journey = offline_journey(content)
+    journey.extract_route_info(lazy=lazy)
+    return [' - '.join(route.modes) for route in journey.routes.values()]
+
+
+def open_first_route(content: dict, lazy: bool) -> float:
+    journey = offline_journey(content)
+    journey.extract_route_info(lazy=lazy)
+    return journey.routes[0].total_co2
+
+
+def peak_bytes(function, *args) -> int:
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    for name, shape in RESPONSES.items():
+        content = synthetic_journey_response(*shape)
+        print(name)
+        for lazy in (False, True):
+            n = 20
+            to_dropdown = timeit.timeit(lambda: dropdown(content, lazy), number=n) / n
+            to_first = timeit.timeit(lambda: open_first_route(content, lazy), number=n) / n
+            peak = peak_bytes(dropdown, content, lazy)
+            print(
+                f"  {'lazy ' if lazy else 'eager'}: dropdown {to_dropdown * 1e3:7.2f} ms, "
+                f"peak {peak / 1024:8.1f} KiB, dropdown + one route {to_first * 1e3:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
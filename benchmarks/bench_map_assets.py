@@ -0,0 +1,111 @@
+"""
+Compares the html sent per route selection, and the hosts the map
+iframe must reach for its scripts and stylesheets before it can
+paint, when folium links to the CDNs against map assets served by
+the app. Assets fetched with `python map_assets.py <dir>` can be
+passed with --assets, otherwise empty placeholders are written so
+the html can be compared offline.
+
+Run from the repository root:
+    python -m benchmarks.bench_map_assets
+    python -m benchmarks.bench_map_assets --assets cache/map_assets
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import timeit
+from urllib.parse import urlsplit
+
+import flask
+
+from benchmarks.bench_decode import RESPONSES, offline_journey
+from benchmarks.bench_simplify import MAP_PARAMS
+from benchmarks.synthetic import synthetic_journey_response
+from init_map import Map
+from map_assets import MANIFEST, MapAssets, asset_path, content_digest, map_asset_urls
+
+_ASSET_LINK = re.compile(r'(?:<script src|<link rel="stylesheet" href)="([^"]+)"')
+
+
+def placeholder_assets(directory: str):
+    """
+    Writes an empty file and a manifest entry for every map asset
+    """
+    links = map_asset_urls()
+    files = {}
+    for url in links:
+        path = asset_path(url)
+        os.makedirs(os.path.join(directory, os.path.dirname(path)), exist_ok=True)
+        body = f"/* {url} */".encode()
+        with open(os.path.join(directory, path), "wb") as file:
+            file.write(body)
+        files[url] = {'path': path, 'digest': content_digest(body)}
+    with open(os.path.join(directory, MANIFEST), "w") as file:
+        json.dump({'links': links, 'files': files}, file)
+
+
+def cdn_render(journey) -> str:
+    map = Map(MAP_PARAMS)
+    map._plot_route(journey, 0)
+    return map._repr_html_()
+
+
+def local_render(journey, assets: MapAssets) -> str:
+    map = Map(MAP_PARAMS)
+    map._plot_route(journey, 0)
+    return assets.localise(map._repr_html_())
+
+
+def asset_hosts(html: str) -> set[str]:
+    """
+    Hosts other than the app's own that the map's assets load from
+    """
+    return {urlsplit(url).netloc for url in _ASSET_LINK.findall(html.replace("&quot;", '"')) if urlsplit(url).netloc}
+
+
+def check_headers(assets: MapAssets):
+    """
+    Requests every asset from a Flask app serving them and prints the
+    bytes served and the cache header a browser keeps them under
+    """
+    server = flask.Flask(__name__)
+    assets.add_routes(server)
+    client = server.test_client()
+    n_bytes = 0
+    for url in list(assets.urls.values()) + assets.bundle_urls:
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        n_bytes += len(response.data)
+    print(f"served {len(assets.urls) + len(assets.bundle_urls)} assets, {n_bytes / 1024:.1f} KiB, Cache-Control: {response.headers['Cache-Control']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CDN and locally served map assets")
+    parser.add_argument("--assets", help="directory of assets fetched with map_assets.py")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.assets is None:
+            placeholder_assets(directory)
+        assets = MapAssets(args.assets or directory)
+        check_headers(assets)
+
+        for name, shape in RESPONSES.items():
+            journey = offline_journey(synthetic_journey_response(*shape))
+            journey.extract_route_info()
+            n = 20
+            print(name)
+            for mode, render in {'cdn links': lambda: cdn_render(journey), 'local assets': lambda: local_render(journey, assets)}.items():
+                seconds = timeit.timeit(render, number=n) / n
+                html = render()
+                print(
+                    f"  {mode:13s} {len(html.encode()) / 1024:8.1f} KiB  {seconds * 1e3:7.2f} ms"
+                    f"  asset hosts {len(asset_hosts(html))}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Times building a route graph from synthetic harvested legs,
+contracting it, and answering random queries with A*, with the
+contraction hierarchy and with one-to-all Dijkstra for an
+origin-destination matrix, checking every method agrees.
+
+Run from the repository root:
+    python -m benchmarks.bench_offline_router
+"""
+
+import math
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_network_legs
+from get_routes import Leg
+from offline_router import OfflineRouter, build_graph
+
+N_QUERIES = 500
+OD_SIZE = 20
+
+
+def time_queries(router: OfflineRouter, pairs: np.ndarray, objective: str) -> tuple[np.ndarray, list]:
+    latencies, costs = [], []
+    for source, target in pairs.tolist():
+        start = time.perf_counter()
+        cost, _ = router.shortest_path(source, target, objective)
+        latencies.append(time.perf_counter() - start)
+        costs.append(cost)
+    return np.array(latencies) * 1e3, costs
+
+
+def main():
+    legs = [Leg(leg_info) for leg_info in synthetic_network_legs(grid_size=40)]
+
+    start = time.perf_counter()
+    graph = build_graph(legs)
+    build_s = time.perf_counter() - start
+    print(f"{len(legs):,} legs -> {graph.n_nodes:,} stops, {graph.n_edges:,} edges in {build_s * 1e3:.0f} ms")
+
+    astar = OfflineRouter(graph)
+    contracted = OfflineRouter(graph)
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(graph.n_nodes, size=(N_QUERIES, 2))
+    for objective in ('time', 'distance', 'emissions'):
+        start = time.perf_counter()
+        contracted.contract([objective])
+        contract_s = time.perf_counter() - start
+
+        astar_ms, astar_costs = time_queries(astar, pairs, objective)
+        ch_ms, ch_costs = time_queries(contracted, pairs, objective)
+        assert all(
+            math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) or a == b == math.inf
+            for a, b in zip(astar_costs, ch_costs)
+        )
+        print(f"  {objective}: contracted in {contract_s:.1f} s, "
+              f"{contracted.hierarchies[objective].n_shortcuts:,} shortcuts")
+        print(f"    A*:   p50 {np.percentile(astar_ms, 50):6.3f} ms  p95 {np.percentile(astar_ms, 95):6.3f} ms")
+        print(f"    CH:   p50 {np.percentile(ch_ms, 50):6.3f} ms  p95 {np.percentile(ch_ms, 95):6.3f} ms")
+
+    points = [tuple(point) for point in graph.node_coords[rng.integers(graph.n_nodes, size=OD_SIZE)]]
+    start = time.perf_counter()
+    matrix = astar.od_matrix(points, points, 'time')
+    od_s = time.perf_counter() - start
+    assert np.allclose(np.diag(matrix), 0)
+    print(f"  {OD_SIZE}x{OD_SIZE} time matrix in {od_s * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
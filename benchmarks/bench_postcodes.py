@@ -0,0 +1,69 @@
+"""
+Times loading and querying the memory-mapped postcode
+index against reading the same extract into a dict, using
+a synthetic ONSPD-shaped CSV of one million postcodes.
+
+Run from the repository root:
+    python -m benchmarks.bench_postcodes
+"""
+
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from postcode_index import PostcodeIndex, build_index, normalise_postcode
+
+N_POSTCODES = 1_000_000
+LETTERS = np.array(list("ABCDEFGHJKLMNPRSTUWXYZ"))
+
+
+def synthetic_postcodes(n: int, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    area = LETTERS[rng.integers(len(LETTERS), size=(n, 2))]
+    digits = rng.integers(10, size=(n, 2))
+    unit = LETTERS[rng.integers(len(LETTERS), size=(n, 2))]
+    return sorted({
+        f"{a[0]}{a[1]}{d[0]} {d[1]}{u[0]}{u[1]}" for a, d, u in zip(area, digits, unit)
+    })
+
+
+def main():
+    postcodes = synthetic_postcodes(N_POSTCODES)
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "onspd.csv")
+        with open(csv_path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["pcds", "lat", "long"])
+            for postcode in postcodes:
+                writer.writerow([postcode, 51 + rng.random(), -rng.random()])
+
+        start = time.perf_counter()
+        n = build_index(csv_path, os.path.join(directory, "index"))
+        print(f"built index of {n:,} postcodes in {time.perf_counter() - start:.2f} s")
+
+        start = time.perf_counter()
+        index = PostcodeIndex(os.path.join(directory, "index"))
+        print(f"memory-mapped load: {(time.perf_counter() - start) * 1e3:8.2f} ms")
+
+        start = time.perf_counter()
+        with open(csv_path, newline="") as file:
+            table = {
+                normalise_postcode(row["pcds"]): (float(row["lat"]), float(row["long"]))
+                for row in csv.DictReader(file)
+            }
+        print(f"dict load from csv: {(time.perf_counter() - start) * 1e3:8.2f} ms")
+
+        queries = [postcodes[i] for i in rng.integers(len(postcodes), size=10_000)]
+        start = time.perf_counter()
+        for query in queries:
+            assert index.lookup(query) == table[normalise_postcode(query)]
+        per_lookup = (time.perf_counter() - start) / len(queries)
+        print(f"index lookup (incl. check): {per_lookup * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
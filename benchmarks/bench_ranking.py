@@ -0,0 +1,68 @@
+"""
+Times batched Pareto front and weighted ranking over a large
+synthetic set of journeys, padded to a common number of routes,
+against a per-journey Python loop, and checks both agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_ranking
+"""
+
+import time
+
+import numpy as np
+
+from route_ranking import RANKINGS, pareto_front, weighted_scores
+
+N_JOURNEYS = 100_000
+MAX_ROUTES = 6
+
+
+def loop_pareto(objectives: list) -> list:
+    fronts = []
+    for routes in objectives:
+        front = []
+        for i, a in enumerate(routes):
+            dominated = any(
+                all(b_k <= a_k for a_k, b_k in zip(a, b)) and any(b_k < a_k for a_k, b_k in zip(a, b))
+                for j, b in enumerate(routes) if j != i
+            )
+            front.append(not dominated)
+        fronts.append(front)
+    return fronts
+
+
+def main():
+    rng = np.random.default_rng(0)
+    n_routes = rng.integers(1, MAX_ROUTES + 1, size=N_JOURNEYS)
+    valid = np.arange(MAX_ROUTES) < n_routes[:, None]
+    # minutes, metres, gCO2e
+    objectives = np.stack([
+        rng.integers(10, 120, size=(N_JOURNEYS, MAX_ROUTES)).astype(np.float64),
+        rng.uniform(1_000, 30_000, size=(N_JOURNEYS, MAX_ROUTES)),
+        rng.uniform(0, 3_000, size=(N_JOURNEYS, MAX_ROUTES)),
+    ], axis=-1)
+    ragged = [objectives[i, :n].tolist() for i, n in enumerate(n_routes)]
+
+    start = time.perf_counter()
+    looped = loop_pareto(ragged)
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    front = pareto_front(objectives, valid)
+    pareto_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = weighted_scores(objectives, RANKINGS['balanced'], valid)
+    order = np.argsort(scores, axis=-1, kind='stable')
+    score_s = time.perf_counter() - start
+
+    assert all(front[i, :n].tolist() == looped[i] for i, n in enumerate(n_routes))
+    assert valid[np.arange(N_JOURNEYS), order[:, 0]].all()
+    print(f"{N_JOURNEYS:,} journeys, {int(n_routes.sum()):,} routes")
+    print(f"  Pareto front, Python loop:   {loop_s * 1e3:9.1f} ms")
+    print(f"  Pareto front, batched:       {pareto_s * 1e3:9.1f} ms  ({loop_s / pareto_s:.0f}x)")
+    print(f"  balanced scores and ranking: {score_s * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compares refreshing a journey by rebuilding every route
+(`extract_route_info`) against `update_routes`, which reuses the
+routes and legs left unchanged, after one leg of one route has
+changed. Also times a conditional `refresh` answered with a 304
+by a local stub server against a full 200 response.
+
+Run from the repository root:
+    python -m benchmarks.bench_refresh
+"""
+
+import copy
+import json
+import timeit
+
+from benchmarks.bench_decode import RESPONSES
+from benchmarks.stub_server import StubHandler, StubServer
+from benchmarks.synthetic import synthetic_journey_response
+from get_routes import Journey
+from tfl_client import Credentials, TflClient
+
+
+class ConditionalHandler(StubHandler):
+    """
+    Answers with a 304 when the request carries the body's ETag
+    """
+    etag = '"v1"'
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+def viewed_journey(content: dict) -> Journey:
+    """
+    Returns a journey whose routes have all been viewed, i.e. have
+    their legs, geometry and emissions built
+    """
+    journey = Journey.from_routes(("A", "B"), {}, {})
+    journey.update_routes(content, lazy=False)
+    return journey
+
+
+def changed_content(content: dict) -> dict:
+    """
+    Returns a copy of a response with the last leg of the first
+    route moved slightly, as when a bus is diverted
+    """
+    changed = copy.deepcopy(content)
+    leg = changed['journeys'][0]['legs'][-1]
+    leg['arrivalPoint']['lat'] += 1e-4
+    return changed
+
+
+def main():
+    n = 20
+    for name, shape in RESPONSES.items():
+        content = synthetic_journey_response(*shape)
+        changed = changed_content(content)
+
+        def rebuild():
+            journey = viewed_journey(content)
+            journey.full_content = changed
+            journey.extract_route_info(lazy=False)
+
+        def update():
+            journey = viewed_journey(content)
+            journey.update_routes(changed, lazy=False)
+
+        baseline = timeit.timeit(lambda: viewed_journey(content), number=n) / n
+        print(name)
+        for mode, refresh in {'rebuild every route': rebuild, 'reuse unchanged legs': update}.items():
+            seconds = timeit.timeit(refresh, number=n) / n - baseline
+            print(f"  {mode:25s} {seconds * 1e3:8.3f} ms")
+
+    body = json.dumps(synthetic_journey_response(*RESPONSES[name])).encode()
+    handler = type("Handler", (ConditionalHandler,), {'body': body})
+    with StubServer(handler) as server:
+        client = TflClient(Credentials("id", "key"), base_url=server.base_url)
+        client.session.trust_env = False
+        journey = Journey(("A", "B"), client=client)
+        journey.retrieve_routes()
+        journey.extract_route_info(lazy=False)
+
+        print(f"refresh over http, {len(body) / 1024:.0f} KiB body")
+        unconditional = timeit.timeit(lambda: journey.update_routes(client.get(journey.url).json()), number=n) / n
+        conditional = timeit.timeit(journey.refresh, number=n) / n
+        print(f"  {'200 and update':25s} {unconditional * 1e3:8.3f} ms")
+        print(f"  {'304 not modified':25s} {conditional * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
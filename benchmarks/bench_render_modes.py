@@ -0,0 +1,47 @@
+"""
+Compares the bytes and server time per route selection of
+the folium html render mode with the client-side encoded polyline mode.
+
+Run from the repository root:
+    python -m benchmarks.bench_render_modes
+"""
+
+import json
+import timeit
+
+from benchmarks.bench_decode import RESPONSES, offline_journey
+from benchmarks.bench_simplify import MAP_PARAMS
+from benchmarks.synthetic import synthetic_journey_response
+from init_map import Map, route_geometry
+
+
+def server_render(journey) -> str:
+    map = Map(MAP_PARAMS)
+    map._plot_route(journey, 0)
+    return map._repr_html_()
+
+
+def client_payload(journey) -> str:
+    # dash serialises callback outputs to json
+    return json.dumps(route_geometry(journey, 0, MAP_PARAMS['zoom_start']))
+
+
+def main():
+    for name, shape in RESPONSES.items():
+        journey = offline_journey(synthetic_journey_response(*shape))
+        journey.extract_route_info()
+        n = 20
+        html_s = timeit.timeit(lambda: server_render(journey), number=n) / n
+        json_s = timeit.timeit(lambda: client_payload(journey), number=n) / n
+        html_bytes = len(server_render(journey).encode())
+        json_bytes = len(client_payload(journey).encode())
+        print(name)
+        print(f"  server (folium html): {html_bytes / 1024:8.1f} KiB  {html_s * 1e3:7.2f} ms")
+        print(
+            f"  client (polyline):    {json_bytes / 1024:8.1f} KiB  {json_s * 1e3:7.2f} ms"
+            f"  ({json_bytes / html_bytes:.0%} of the bytes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
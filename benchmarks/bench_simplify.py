@@ -0,0 +1,42 @@
+"""
+Reports the rendered map payload and render time with
+and without display simplification of route geometry.
+
+Run from the repository root:
+    python -m benchmarks.bench_simplify
+"""
+
+import time
+
+from benchmarks.bench_decode import RESPONSES, offline_journey
+from benchmarks.synthetic import synthetic_journey_response
+from init_map import Map
+
+MAP_PARAMS = {'location': [51.515419, -0.141099], 'zoom_start': 13.5, 'tiles': 'openstreetmap'}
+
+
+def render(journey, simplify_px) -> tuple[int, float]:
+    start = time.perf_counter()
+    map = Map(MAP_PARAMS, simplify_px)
+    map._plot_route(journey, 0)
+    html = map._repr_html_()
+    return len(html.encode()), time.perf_counter() - start
+
+
+def main():
+    for name, shape in RESPONSES.items():
+        journey = offline_journey(synthetic_journey_response(*shape))
+        journey.extract_route_info()
+        full_bytes, full_s = render(journey, None)
+        print(name)
+        print(f"  full geometry:  {full_bytes / 1024:8.1f} KiB  {full_s * 1e3:7.1f} ms")
+        for pixels in (0.5, 1.0, 2.0):
+            simple_bytes, simple_s = render(journey, pixels)
+            print(
+                f"  simplify {pixels:.1f}px: {simple_bytes / 1024:8.1f} KiB  {simple_s * 1e3:7.1f} ms"
+                f"  ({simple_bytes / full_bytes:.0%} of full)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Times a cold start of the app in a fresh interpreter, as on a
+restart: importing `launch` and building `MapApp` from `params.yml`,
+as `python launch.py` does before binding its port. Also lists which
+heavy modules that pulled in. The initial journey is planned in the
+background and is not waited for.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+
+import subprocess
+import sys
+
+from launch import STARTUP_BUDGET_SECONDS
+
+N_RUNS = 5
+# modules that `import launch` should not pull in, omegaconf is
+# only imported to read the parameters when launched
+DEFERRED = ('folium', 'omegaconf')
+
+PROBE = f"""
+import os, sys, tempfile, time
+start = time.perf_counter()
+import launch
+loaded = [name for name in {DEFERRED!r} if name in sys.modules]
+import omegaconf
+params = omegaconf.OmegaConf.load("params.yml").default
+with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+    file.write("app_id: startup\\napp_key: startup\\n")
+params.api_cred = file.name
+# nothing listens here, so the background warm-up fails at once
+params.client.base_url = "http://127.0.0.1:9/"
+app = launch.MapApp(params)
+elapsed = time.perf_counter() - start
+print(elapsed, app.startup_seconds['init'], ",".join(loaded))
+os.remove(file.name)
+# without waiting for the warm-up pool
+os._exit(0)
+"""
+
+
+def cold_start() -> tuple[float, float, list[str]]:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(output[0]), float(output[1]), output[2].split(",") if len(output) > 2 else []
+
+
+def main():
+    times, inits = [], []
+    for _ in range(N_RUNS):
+        elapsed, init, loaded = cold_start()
+        times.append(elapsed)
+        inits.append(init)
+    times.sort()
+    inits.sort()
+    print(f"cold `import launch` and `MapApp(params)` x {N_RUNS}, budget {STARTUP_BUDGET_SECONDS * 1e3:.0f} ms")
+    print(f"  median: {times[N_RUNS // 2] * 1e3:.1f} ms, of which MapApp {inits[N_RUNS // 2] * 1e3:.1f} ms")
+    print(f"  best:   {times[0] * 1e3:.1f} ms")
+    print(f"  deferred modules imported: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares the peak and retained memory of planning a journey
+from the whole decoded response (`retrieve_routes` then
+`extract_route_info`) against streaming it with `stream_routes`,
+using a local stub server for the journey planner.
+
+Run from the repository root:
+    python -m benchmarks.bench_stream
+"""
+
+import json
+import timeit
+import tracemalloc
+
+from benchmarks.bench_decode import RESPONSES
+from benchmarks.stub_server import StubHandler, StubServer
+from benchmarks.synthetic import synthetic_journey_response
+from get_routes import Journey
+from tfl_client import Credentials, TflClient
+
+
+def whole(client: TflClient, lazy: bool) -> Journey:
+    journey = Journey(("A", "B"), client=client)
+    journey.retrieve_routes()
+    journey.extract_route_info(lazy=lazy)
+    return journey
+
+
+def streamed(client: TflClient) -> Journey:
+    journey = Journey(("A", "B"), client=client)
+    journey.stream_routes()
+    return journey
+
+
+def traced(plan) -> tuple[int, int]:
+    """
+    Returns the peak memory while planning and the memory still
+    held by the planned journey, in bytes
+    """
+    tracemalloc.start()
+    journey = plan()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del journey
+    return peak, retained
+
+
+def main():
+    for name, shape in RESPONSES.items():
+        body = json.dumps(synthetic_journey_response(*shape)).encode()
+        handler = type("Handler", (StubHandler,), {'body': body})
+        with StubServer(handler) as server:
+            client = TflClient(Credentials("id", "key"), base_url=server.base_url)
+            client.session.trust_env = False
+            modes = {
+                'whole response, lazy routes': lambda: whole(client, lazy=True),
+                'whole response, eager routes': lambda: whole(client, lazy=False),
+                'streamed, eager routes': lambda: streamed(client),
+            }
+
+            print(f"{name}, {len(body) / 1024:.0f} KiB body")
+            for mode, plan in modes.items():
+                # warm up the connection and imports
+                plan()
+                n = 10
+                seconds = timeit.timeit(plan, number=n) / n
+                peak, retained = traced(plan)
+                print(
+                    f"  {mode:30s} {seconds * 1e3:8.2f} ms"
+                    f"  peak {peak / 1024:9.1f} KiB  retained {retained / 1024:9.1f} KiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Checks that the lazily built legs, geometry and emissions of a
+journey's routes can be first read from several threads at once,
+as the prerender pool, the archive writer and the ranking of the
+request thread do, without errors or differing results.
+
+Run from the repository root:
+    python -m benchmarks.check_lazy_threads --trials 200 --threads 3
+"""
+
+import argparse
+import sys
+import threading
+
+import numpy as np
+
+from benchmarks.bench_decode import offline_journey
+from benchmarks.synthetic import synthetic_journey_response
+from route_ranking import rank_routes
+
+
+def read_routes(journey) -> list:
+    """
+    Reads everything the app builds lazily from every route
+    """
+    rank_routes(journey, 'balanced')
+    return [
+        (route.coords, route.offsets, route.total_distance, route.total_co2, len(route.legs))
+        for route in journey.routes.values()
+    ]
+
+
+def run_trial(content: dict, n_threads: int) -> tuple[list, list]:
+    """
+    Reads a fresh lazy journey from `n_threads` threads released at
+    once, returning what each thread read and the errors raised
+    """
+    journey = offline_journey(content)
+    journey.extract_route_info(lazy=True)
+    barrier = threading.Barrier(n_threads)
+    results, errors = [], []
+
+    def read():
+        barrier.wait()
+        try:
+            results.append(read_routes(journey))
+        except Exception as error:
+            errors.append(f"{type(error).__name__}: {error}")
+
+    threads = [threading.Thread(target=read) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def same_results(results: list) -> bool:
+    first = results[0]
+    for other in results[1:]:
+        for (coords, offsets, distance, co2, n_legs), expected in zip(other, first):
+            if not (
+                np.array_equal(coords, expected[0]) and np.array_equal(offsets, expected[1])
+                and (distance, co2, n_legs) == expected[2:]
+            ):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read lazy routes from several threads at once")
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=3)
+    args = parser.parse_args()
+
+    content = synthetic_journey_response(6, 3, 200)
+    errors, mismatches = [], 0
+    for _ in range(args.trials):
+        results, trial_errors = run_trial(content, args.threads)
+        errors += trial_errors
+        mismatches += bool(results) and not same_results(results)
+
+    print(f"{args.trials} trials x {args.threads} threads: {len(errors)} errors, {mismatches} mismatched reads")
+    for error in sorted(set(errors)):
+        print(f"  {error}")
+    sys.exit(1 if errors or mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Load tests the app's `get_n_routes` and `update_visuals` callbacks
+from concurrent simulated users against the local TFL stand-in,
+reporting requests/sec, p50/p95/p99 latency and errors per callback.
+
+Each user plans a journey, picked from a pool of start/end pairs,
+under its own session and then views one of its routes. A smaller
+pool means more response cache hits.
+
+Run from the repository root:
+    python -m benchmarks.load_test --users 16 --duration 20 --latency-ms 80
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8099/Journey/JourneyResults/
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import omegaconf
+
+from benchmarks.make_fixtures import JOURNEYS
+from benchmarks.tfl_standin import add_standin_arguments, standin_from_args
+from launch import MapApp
+
+CALLBACKS = ('get_n_routes', 'update_visuals')
+
+
+def journey_pool(n_pairs: int, seed: int = 0) -> list[tuple[str, str]]:
+    """
+    Returns `n_pairs` distinct start/end pairs, the recorded journeys
+    first and then the same journeys with their points nudged
+    """
+    rng = random.Random(seed)
+    recorded = list(JOURNEYS.values())
+    pairs = []
+    for i in range(n_pairs):
+        start, end = recorded[i % len(recorded)]
+        if i >= len(recorded):
+            start, end = (nudge(point, rng) for point in (start, end))
+        pairs.append((start, end))
+    return pairs
+
+
+def nudge(point: str, rng: random.Random) -> str:
+    lat, lon = (float(value) for value in point.split(","))
+    return f"{lat + rng.uniform(-0.01, 0.01):.5f},{lon + rng.uniform(-0.01, 0.01):.5f}"
+
+
+def load_test_params(args: argparse.Namespace, base_url: str, cred_file: str):
+    """
+    Returns the app parameters from `params.yml` pointed at the stand-in
+    """
+    params = omegaconf.OmegaConf.load(args.params).default
+    params.api_cred = cred_file
+    params.client.base_url = base_url
+    params.client.requests_per_minute = args.requests_per_minute
+    params.points.start, params.points.end = next(iter(JOURNEYS.values()))
+    params.display.render_mode = args.render_mode
+    params.cache.enabled = not args.no_cache
+    # no background work beyond what a live server does
+    params.archive.directory = None
+    return params
+
+
+class LoadStats():
+    """
+    Latencies and errors recorded by every user thread, per callback
+    """
+
+    def __init__(self):
+        self.latencies = {name: [] for name in CALLBACKS}
+        self.errors = {name: {} for name in CALLBACKS}
+        self._lock = threading.Lock()
+
+    def record(self, callback: str, seconds: float, error: str = None):
+        with self._lock:
+            self.latencies[callback].append(seconds)
+            if error is not None:
+                self.errors[callback][error] = self.errors[callback].get(error, 0) + 1
+
+    def summary(self, elapsed: float) -> list[dict]:
+        results = []
+        for name in CALLBACKS:
+            latencies = np.array(self.latencies[name]) * 1e3
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+            results.append({
+                'callback': name,
+                'requests': len(latencies),
+                'requests_per_sec': len(latencies) / elapsed,
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'errors': sum(self.errors[name].values()),
+                'error_types': self.errors[name],
+            })
+        return results
+
+
+def timed(stats: LoadStats, callback: str, call):
+    """
+    Calls a callback, recording its latency and any exception
+    """
+    start = time.perf_counter()
+    try:
+        result = call()
+    except Exception as error:
+        stats.record(callback, time.perf_counter() - start, type(error).__name__)
+        return None
+    stats.record(callback, time.perf_counter() - start)
+    return result
+
+
+def simulate_user(app: MapApp, user: int, pairs: list, deadline: float, stats: LoadStats, seed: int):
+    rng = random.Random(seed * 1000 + user)
+    session_id = f"load-test-{user}"
+    while time.perf_counter() < deadline:
+        start, end = rng.choice(pairs)
+        options = timed(stats, 'get_n_routes', lambda: app.get_n_routes(1, start, end, session_id))
+        if not options:
+            continue
+        route_id = rng.choice(options)['value']
+        timed(stats, 'update_visuals', lambda: app.update_visuals(route_id, session_id))
+
+
+def run_load_test(app: MapApp, users: int, duration: float, pairs: list, seed: int = 0) -> tuple[list, float]:
+    stats = LoadStats()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [
+        threading.Thread(target=simulate_user, args=(app, user, pairs, deadline, stats, seed))
+        for user in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return stats.summary(elapsed), elapsed
+
+
+def print_table(results: list[dict]):
+    print(f"{'callback':16s} {'requests':>9s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>7s}")
+    for row in results:
+        print(
+            f"{row['callback']:16s} {row['requests']:9d} {row['requests_per_sec']:8.1f} "
+            f"{row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f} {row['errors']:7d}"
+        )
+        for error, count in row['error_types'].items():
+            print(f"  {error}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app callbacks against the TFL stand-in")
+    parser.add_argument("--params", default="params.yml")
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run for")
+    parser.add_argument("--pairs", type=int, default=24, help="distinct start/end pairs planned")
+    parser.add_argument("--render-mode", choices=("server", "client"), default="server")
+    parser.add_argument("--requests-per-minute", type=float, default=None, help="client rate limit, none by default")
+    parser.add_argument("--no-cache", action="store_true", help="turn the response cache off")
+    parser.add_argument("--base-url", help="an already running stand-in, otherwise one is started here")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+
+    standin = nullcontext() if args.base_url else standin_from_args(args)
+    with standin as server, tempfile.TemporaryDirectory() as directory:
+        base_url = args.base_url or server.base_url
+        cred_file = os.path.join(directory, "creds.txt")
+        with open(cred_file, "w") as file:
+            file.write("app_id: load-test\napp_key: load-test\n")
+
+        app = MapApp(load_test_params(args, base_url, cred_file))
+        app.client.session.trust_env = False
+        app.default_journey.result()
+        results, elapsed = run_load_test(app, args.users, args.duration, journey_pool(args.pairs, args.seed), args.seed)
+
+    print(f"{args.users} users for {elapsed:.1f} s against {base_url}")
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({'args': vars(args), 'elapsed': elapsed, 'results': results}, file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Writes the journey planner fixtures used by the benchmark suite
+to `benchmarks/fixtures/`. By default the fixtures are generated,
+deterministically, in the full shape of TFL journey planner responses
+(including the fields the app does not read). With `--record` the
+same journeys are requested from the live API instead.
+
+Run from the repository root:
+    python -m benchmarks.make_fixtures
+    python -m benchmarks.make_fixtures --record params.yml
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.synthetic import random_walk_path
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# fixture name -> (start, end) of the journey it records
+JOURNEYS = {
+    'short_walk': ("51.501364,-0.14189", "51.503,-0.1277"),
+    'multi_leg_tube': ("51.5308,-0.1238", "51.4613,-0.1156"),
+    'long_cycle_alternatives': ("51.5416,-0.3033", "51.5088,-0.0722"),
+}
+
+TYPE = "Tfl.Api.Presentation.Entities.{}, Tfl.Api.Presentation.Entities"
+DEPART = datetime(2024, 3, 12, 9, 0)
+
+
+def line_string(path: np.ndarray) -> str:
+    """
+    Formats interior path points like a TFL `lineString`
+    """
+    return "[" + ",".join(f"[{lat:.5f}, {lon:.5f}]" for lat, lon in path[1:-1]) + "]"
+
+
+def stop_point(name: str, point: np.ndarray, naptan: str) -> dict:
+    return {
+        "$type": TYPE.format("JourneyPlanner.StopPoint"),
+        "naptanId": naptan,
+        "platformName": "",
+        "icsCode": naptan[-7:],
+        "individualStopId": "",
+        "commonName": name,
+        "placeType": "StopPoint",
+        "additionalProperties": [],
+        "lat": round(float(point[0]), 6),
+        "lon": round(float(point[1]), 6),
+    }
+
+
+def tfl_leg(
+        path: np.ndarray,
+        mode: str,
+        line: str,
+        duration: int,
+        start: datetime,
+        names: tuple[str, str],
+        interchange: str = "",
+    ) -> dict:
+    """
+    Returns a leg in the shape of a TFL journey planner leg, with
+    turn by turn steps for walking and cycling legs
+    """
+    summary = f"{mode.title()} to {names[1]}" if mode in ('walking', 'cycle') else f"{line} line to {names[1]}"
+    steps = []
+    if mode in ('walking', 'cycle'):
+        for index in range(0, len(path) - 1, max(1, len(path) // 8)):
+            steps.append({
+                "$type": TYPE.format("Instructions.InstructionStep"),
+                "description": f"on Street {index}",
+                "turnDirection": "STRAIGHT",
+                "streetName": f"Street {index}",
+                "distance": 120,
+                "cumulativeDistance": 120 * (index + 1),
+                "skyDirection": 90,
+                "skyDirectionDescription": "East",
+                "cumulativeTravelTime": 60 * (index + 1),
+                "latitude": round(float(path[index][0]), 6),
+                "longitude": round(float(path[index][1]), 6),
+                "pathAttribute": {"$type": TYPE.format("PathAttribute")},
+                "descriptionHeading": "Continue along ",
+                "trackType": "None",
+            })
+    end = start + timedelta(minutes=duration)
+    return {
+        "$type": TYPE.format("JourneyPlanner.Leg"),
+        "duration": duration,
+        "instruction": {
+            "$type": TYPE.format("Instruction"),
+            "summary": summary,
+            "detailed": summary,
+            "steps": steps,
+        },
+        "obstacles": [],
+        "departureTime": start.isoformat(),
+        "arrivalTime": end.isoformat(),
+        "departurePoint": stop_point(names[0], path[0], f"940GZZLU{names[0][:3].upper()}"),
+        "arrivalPoint": stop_point(names[1], path[-1], f"940GZZLU{names[1][:3].upper()}"),
+        "path": {
+            "$type": TYPE.format("JourneyPlanner.Path"),
+            "lineString": line_string(path),
+            "stopPoints": [],
+            "elevation": [],
+        },
+        "routeOptions": [{
+            "$type": TYPE.format("JourneyPlanner.RouteOption"),
+            "name": line,
+            "directions": [""],
+            "lineIdentifier": {"$type": TYPE.format("Identifier"), "id": line.lower(), "name": line},
+        }],
+        "mode": {
+            "$type": TYPE.format("Identifier"),
+            "id": mode,
+            "name": mode,
+            "type": "Mode",
+            "routeType": "Unknown",
+            "status": "Unknown",
+        },
+        "disruptions": [],
+        "plannedWorks": [],
+        "isDisrupted": False,
+        "hasFixedLocations": mode not in ('walking', 'cycle'),
+        "scheduledDepartureTime": start.isoformat(),
+        "scheduledArrivalTime": end.isoformat(),
+        "interChangeDuration": "2" if interchange else "",
+        "interChangePosition": interchange,
+    }
+
+
+def tfl_journey(legs_spec: list, seed: int) -> dict:
+    """
+    Builds a journey from (mode, line, points, duration) leg specs,
+    each leg continuing from the end of the last
+    """
+    path = random_walk_path(sum(points for _, _, points, _ in legs_spec) + 1, seed=seed)
+    legs, start, offset = [], DEPART, 0
+    for index, (mode, line, points, duration) in enumerate(legs_spec):
+        leg_path = path[offset:offset + points + 1]
+        names = (f"Stop {seed}-{index}", f"Stop {seed}-{index + 1}")
+        interchange = "AFTER" if index < len(legs_spec) - 1 and mode not in ('walking', 'cycle') else ""
+        legs.append(tfl_leg(leg_path, mode, line, duration, start, names, interchange))
+        start += timedelta(minutes=duration)
+        offset += points
+    return {
+        "$type": TYPE.format("JourneyPlanner.Journey"),
+        "startDateTime": DEPART.isoformat(),
+        "duration": sum(duration for *_, duration in legs_spec),
+        "arrivalDateTime": start.isoformat(),
+        "legs": legs,
+        "fare": {"$type": TYPE.format("JourneyPlanner.JourneyFare"), "totalCost": 280, "fares": [], "caveats": []},
+    }
+
+
+def tfl_response(journeys: list, start: str, end: str) -> dict:
+    return {
+        "$type": TYPE.format("JourneyPlanner.ItineraryResult"),
+        "journeys": journeys,
+        "lines": [],
+        "stopMessages": [],
+        "recommendedMaxAgeMinutes": 5,
+        "searchCriteria": {
+            "$type": TYPE.format("JourneyPlanner.SearchCriteria"),
+            "dateTime": DEPART.isoformat(),
+            "dateTimeType": "Departing",
+        },
+        "journeyVector": {
+            "$type": TYPE.format("JourneyPlanner.JourneyVector"),
+            "from": start,
+            "to": end,
+            "via": "",
+            "uri": f"/journey/journeyresults/{start}/to/{end}",
+        },
+    }
+
+
+def generated_fixtures() -> dict:
+    """
+    Returns the generated fixtures by name
+    """
+    walk = [[('walking', 'walking', 60, 12)]]
+    tube = [
+        [('walking', 'walking', 25, 4), ('tube', 'Victoria', 30, 9), ('tube', 'Northern', 40, 11), ('walking', 'walking', 25, 5)],
+        [('walking', 'walking', 20, 3), ('tube', 'Piccadily', 35, 8), ('tube', 'Victoria', 30, 12), ('walking', 'walking', 30, 6)],
+        [('walking', 'walking', 30, 6), ('bus', 'bus', 80, 24), ('tube', 'Victoria', 20, 7), ('walking', 'walking', 15, 3)],
+    ]
+    cycle = [
+        [('walking', 'walking', 40, 4), ('cycle', 'cycle', 3000, 62), ('walking', 'walking', 40, 3)],
+        [('cycle', 'cycle', 3200, 68)],
+        [('walking', 'walking', 50, 7), ('elizabeth-line', 'Elizabeth line', 60, 18), ('walking', 'walking', 60, 9)],
+        [('walking', 'walking', 30, 5), ('tube', 'Central', 90, 31), ('walking', 'walking', 40, 6)],
+        [('cycle', 'cycle', 2800, 59), ('walking', 'walking', 120, 14)],
+        [('walking', 'walking', 30, 5), ('overground', 'London Overground', 70, 22), ('dlr', 'DLR', 40, 12), ('walking', 'walking', 40, 8)],
+    ]
+    fixtures = {}
+    for seed, (name, specs) in enumerate(zip(JOURNEYS, (walk, tube, cycle))):
+        journeys = [tfl_journey(spec, seed=100 * seed + i) for i, spec in enumerate(specs)]
+        fixtures[name] = tfl_response(journeys, *JOURNEYS[name])
+    return fixtures
+
+
+def recorded_fixtures(params_file: str) -> dict:
+    """
+    Returns the same journeys requested from the live API
+    """
+    import omegaconf
+
+    from tfl_client import TflClient
+
+    params = omegaconf.OmegaConf.load(params_file).default
+    client = TflClient.from_params(params)
+    fixtures = {}
+    for name, (start, end) in JOURNEYS.items():
+        response = client.get(client.journey_url(start, end, params.route_params))
+        response.raise_for_status()
+        fixtures[name] = response.json()
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the benchmark journey planner fixtures")
+    parser.add_argument("--record", metavar="PARAMS", help="request the journeys from the live API")
+    args = parser.parse_args()
+    fixtures = recorded_fixtures(args.record) if args.record else generated_fixtures()
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, content in fixtures.items():
+        with open(os.path.join(FIXTURE_DIR, f"{name}.json"), "w") as file:
+            json.dump(content, file, indent=1)
+        print(f"wrote {name}.json ({len(content['journeys'])} journeys)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+A minimal local stand-in for the TFL journey planner
+used by the benchmarks. It answers every GET request
+with the same JSON body over keep-alive HTTP/1.1.
+"""
+
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send headers and body in one segment so keep-alive is not hit by delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    body = json.dumps({'journeys': []}).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def self_signed_context(directory: str) -> ssl.SSLContext:
+    """
+    Creates a throwaway self-signed certificate with the openssl
+    command line tool and returns a server TLS context for it
+    """
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+class StubServer():
+    """
+    Runs the stub handler on a local port, a free one by default, in a
+    background thread.
+    Use as a context manager; `base_url` points at the journey endpoint.
+    With `tls=True` the server speaks HTTPS with a self-signed certificate
+    so clients must skip verification.
+    """
+
+    def __init__(self, handler=StubHandler, tls: bool = False, port: int = 0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        scheme = "http"
+        if tls:
+            with tempfile.TemporaryDirectory() as directory:
+                context = self_signed_context(directory)
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+            scheme = "https"
+        self.base_url = f"{scheme}://127.0.0.1:{self.server.server_port}/Journey/JourneyResults/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StubServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,207 @@
+"""
+Benchmarks the journey parsing and map rendering hot paths
+on the recorded journey planner fixtures in `benchmarks/fixtures/`,
+reporting throughput, latency percentiles and peak memory per
+stage. Results are written as JSON, and compared against a
+previous results file to flag regressions.
+
+Run from the repository root:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --output cache/new.json --baseline cache/benchmarks.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import numpy as np
+
+from benchmarks.bench_decode import offline_journey
+from benchmarks.bench_simplify import MAP_PARAMS
+from benchmarks.make_fixtures import FIXTURE_DIR
+from get_routes import Leg
+from init_map import Map
+
+# relative growth in median latency or peak memory flagged as a regression
+DEFAULT_THRESHOLD = 0.2
+
+
+def load_fixtures() -> dict[str, bytes]:
+    """
+    Returns the raw bytes of each fixture by name
+    """
+    fixtures = {}
+    for file_name in sorted(os.listdir(FIXTURE_DIR)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(FIXTURE_DIR, file_name), "rb") as file:
+                fixtures[file_name[:-len(".json")]] = file.read()
+    return fixtures
+
+
+def stages(raw: bytes) -> dict[str, tuple[Callable[[], object], int, str]]:
+    """
+    Returns stage name -> (callable, items per call, item unit) for a fixture
+    """
+    content = json.loads(raw)
+    journey = offline_journey(content)
+    journey.extract_route_info()
+    leg_infos = [leg for route in content['journeys'] for leg in route['legs']]
+    routes = list(journey.routes.values())
+    plotted = Map(MAP_PARAMS)
+    plotted._plot_route(journey, 0)
+
+    def extract():
+        fresh = offline_journey(content)
+        fresh.extract_route_info()
+
+    def plot():
+        Map(MAP_PARAMS)._plot_route(journey, 0)
+
+    return {
+        'json_parse': (lambda: json.loads(raw), len(raw), "bytes"),
+        'extract_route_info': (extract, len(routes), "routes"),
+        'leg_init': (lambda: [Leg(leg_info) for leg_info in leg_infos], len(leg_infos), "legs"),
+        'get_modes': (lambda: [route._get_modes() for route in routes], len(routes), "routes"),
+        'plot_route': (plot, 1, "maps"),
+        'repr_html': (plotted._repr_html_, 1, "maps"),
+    }
+
+
+def measure(run: Callable[[], object], min_time: float, min_calls: int) -> tuple[np.ndarray, int]:
+    """
+    Returns per call latencies in seconds, after a warm up call, and
+    the peak traced memory in bytes of one further call
+    """
+    run()
+    latencies = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < min_calls or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+
+    # traced separately, tracemalloc slows every allocation down
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return np.array(latencies), peak
+
+
+def run_suite(min_time: float = 0.5, min_calls: int = 5, only: Optional[list] = None) -> list[dict]:
+    """
+    Benchmarks every stage on every fixture, returning one record each
+    """
+    results = []
+    for fixture, raw in load_fixtures().items():
+        for stage, (run, items, unit) in stages(raw).items():
+            if only and stage not in only:
+                continue
+            latencies, peak = measure(run, min_time, min_calls)
+            mean = float(latencies.mean())
+            results.append({
+                'fixture': fixture,
+                'stage': stage,
+                'calls': len(latencies),
+                'items_per_call': items,
+                'unit': unit,
+                'mean_ms': mean * 1e3,
+                'p50_ms': float(np.percentile(latencies, 50)) * 1e3,
+                'p95_ms': float(np.percentile(latencies, 95)) * 1e3,
+                'p99_ms': float(np.percentile(latencies, 99)) * 1e3,
+                'calls_per_s': 1 / mean,
+                'items_per_s': items / mean,
+                'peak_kib': peak / 1024,
+            })
+    return results
+
+
+def environment() -> dict:
+    """
+    Returns what a results file was measured on
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+
+def regressions(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """
+    Returns a description of each stage whose median latency or peak
+    memory grew by more than `threshold` over the baseline
+    """
+    previous = {(record['fixture'], record['stage']): record for record in baseline}
+    found = []
+    for record in results:
+        old = previous.get((record['fixture'], record['stage']))
+        if old is None:
+            continue
+        for metric in ('p50_ms', 'peak_kib'):
+            if old[metric] > 0 and record[metric] > old[metric] * (1 + threshold):
+                found.append(
+                    f"{record['fixture']}/{record['stage']}: {metric} "
+                    f"{old[metric]:.3f} -> {record[metric]:.3f} (+{record[metric] / old[metric] - 1:.0%})"
+                )
+    return found
+
+
+def print_table(results: list[dict]):
+    print(f"{'fixture':<26}{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'throughput':>21}{'peak KiB':>11}")
+    for record in results:
+        print(
+            f"{record['fixture']:<26}{record['stage']:<20}"
+            f"{record['p50_ms']:>10.3f}{record['p95_ms']:>10.3f}{record['p99_ms']:>10.3f}"
+            f"{record['items_per_s']:>14,.0f} {record['unit'] + '/s':<6}{record['peak_kib']:>11,.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing and rendering on the fixtures")
+    parser.add_argument("--output", default="cache/benchmarks.json", help="results file to write")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative growth in p50 latency or peak memory flagged as a regression")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to time each stage for")
+    parser.add_argument("--stage", action="append", help="only run these stages")
+    args = parser.parse_args()
+
+    results = run_suite(args.min_time, only=args.stage)
+    print_table(results)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump({'environment': environment(), 'results': results}, file, indent=1)
+    print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            found = regressions(results, json.load(file)['results'], args.threshold)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        if found:
+            sys.exit(1)
+        print(f"no regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
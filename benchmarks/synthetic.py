@@ -0,0 +1,108 @@
+"""
+Generators for synthetic route geometry shaped like the
+paths returned by the TFL journey planner in central London
+"""
+
+import numpy as np
+
+
+def random_walk_path(n_points: int, seed: int = 0, step: float = 2e-4) -> np.ndarray:
+    """
+    Returns an (n_points, 2) array of (lat, lon) points forming a
+    random walk with a slowly turning heading, like a street path,
+    starting near Buckingham Palace. The default step is roughly the
+    vertex spacing of a TFL walking or cycling lineString.
+    """
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(scale=0.3, size=n_points))
+    steps = step * np.column_stack([np.sin(heading), np.cos(heading)])
+    steps[0] = (51.501364, -0.14189)
+    return np.cumsum(steps, axis=0)
+
+
+LEG_MODES = ['walking', 'tube', 'bus', 'cycle', 'overground', 'dlr', 'elizabeth-line']
+TUBE_LINES = ['Central', 'Jubilee', 'Victoria', 'District', 'Northern', 'Bakerloo']
+
+
+def synthetic_leg(path: np.ndarray, mode: str, line: str, interchange: str = '') -> dict:
+    """
+    Returns a leg dictionary with the fields of a TFL journey planner leg
+    """
+    line_string = "[" + ",".join(f"[{lat:.5f},{lon:.5f}]" for lat, lon in path[1:-1]) + "]"
+    return {
+        'duration': max(1, len(path) // 20),
+        'departurePoint': {'lat': path[0][0], 'lon': path[0][1], 'commonName': f"Stop {path[0][0]:.4f}"},
+        'arrivalPoint': {'lat': path[-1][0], 'lon': path[-1][1], 'commonName': f"Stop {path[-1][0]:.4f}"},
+        'instruction': {'summary': f"{mode.title()} to Stop {path[-1][0]:.4f}"},
+        'path': {'lineString': line_string},
+        'mode': {'name': mode},
+        'routeOptions': [{'name': line}],
+        'interChangeDuration': '2',
+        'interChangePosition': interchange,
+    }
+
+
+def synthetic_journey_response(
+        n_routes: int = 4,
+        legs_per_route: int = 3,
+        points_per_leg: int = 500,
+        seed: int = 0,
+    ) -> dict:
+    """
+    Returns a decoded journey planner response with `n_routes` alternative
+    journeys, each made of `legs_per_route` legs of about `points_per_leg` points
+    """
+    rng = np.random.default_rng(seed)
+    journeys = []
+    for route in range(n_routes):
+        path = random_walk_path(legs_per_route * points_per_leg + 1, seed=seed * 1000 + route)
+        legs = []
+        for leg in range(legs_per_route):
+            mode = LEG_MODES[int(rng.integers(len(LEG_MODES)))]
+            line = TUBE_LINES[int(rng.integers(len(TUBE_LINES)))] if mode == 'tube' else mode
+            leg_path = path[leg * points_per_leg:(leg + 1) * points_per_leg + 1]
+            legs.append(synthetic_leg(leg_path, mode, line, 'AFTER' if leg < legs_per_route - 1 else ''))
+        duration = sum(leg['duration'] for leg in legs)
+        journeys.append({
+            'startDateTime': "2024-03-12T09:00:00",
+            'arrivalDateTime': f"2024-03-12T{9 + duration // 60:02d}:{duration % 60:02d}:00",
+            'duration': duration,
+            'legs': legs,
+        })
+    return {'journeys': journeys}
+
+
+def synthetic_network_legs(
+        grid_size: int = 30,
+        spacing: float = 0.006,
+        points_per_leg: int = 8,
+        seed: int = 0,
+    ) -> list[dict]:
+    """
+    Returns leg dictionaries joining the stops of a `grid_size` square
+    grid, about 600 m apart, in both directions with some legs missing,
+    like the legs harvested from many journey planner responses
+    """
+    rng = np.random.default_rng(seed)
+    origin = np.array([51.45, -0.25])
+    legs = []
+    for row in range(grid_size):
+        for col in range(grid_size):
+            for d_row, d_col in ((0, 1), (1, 0)):
+                if row + d_row >= grid_size or col + d_col >= grid_size:
+                    continue
+                a, b = (row, col), (row + d_row, col + d_col)
+                for start, end in ((a, b), (b, a)):
+                    if rng.random() < 0.15:
+                        continue
+                    p0, p1 = origin + spacing * np.array(start), origin + spacing * np.array(end)
+                    path = p0 + np.linspace(0, 1, points_per_leg)[:, None] * (p1 - p0)
+                    path[1:-1] += rng.normal(scale=5e-5, size=(points_per_leg - 2, 2))
+                    mode = LEG_MODES[int(rng.integers(len(LEG_MODES)))]
+                    line = TUBE_LINES[int(rng.integers(len(TUBE_LINES)))] if mode == 'tube' else mode
+                    leg = synthetic_leg(path, mode, line)
+                    leg['duration'] = int(rng.integers(1, 10))
+                    leg['departurePoint']['commonName'] = f"Stop {start[0]}-{start[1]}"
+                    leg['arrivalPoint']['commonName'] = f"Stop {end[0]}-{end[1]}"
+                    legs.append(leg)
+    return legs
@@ -0,0 +1,145 @@
+"""
+A local stand-in for the TFL journey planner that replays the
+recorded fixtures in `benchmarks/fixtures/`, with configurable
+latency, server errors and 429 rate limiting, so the app can be
+load tested offline. Point `client.base_url` in `params.yml` at it.
+
+Run from the repository root:
+    python -m benchmarks.tfl_standin --port 8099 --latency-ms 80 --throttle-rate 0.02
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import zlib
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+from benchmarks.make_fixtures import FIXTURE_DIR, JOURNEYS
+from benchmarks.stub_server import StubHandler, StubServer
+
+
+def load_fixture_bodies(directory: str = FIXTURE_DIR) -> dict[str, bytes]:
+    """
+    Returns the compact JSON body of each fixture by name
+    """
+    bodies = {}
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(directory, file_name)) as file:
+                content = json.load(file)
+            bodies[file_name[:-len(".json")]] = json.dumps(content, separators=(",", ":")).encode()
+    return bodies
+
+
+class ReplayHandler(StubHandler):
+    """
+    Answers journey requests with the fixture recorded for the start
+    and end points, or a fixture picked by hashing them otherwise.
+    The class attributes are set by `replay_handler`.
+    """
+    bodies = {}
+    routes = {}
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    throttle_rate = 0.0
+    retry_after = 1
+    rng = random.Random(0)
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path)
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+        draw = self.rng.random()
+        if draw < self.throttle_rate:
+            self.reply(429, b'{"message":"Too many requests"}', {"Retry-After": str(self.retry_after)})
+        elif draw < self.throttle_rate + self.error_rate:
+            self.reply(500, b'{"message":"Internal server error"}')
+        else:
+            self.reply(200, self.body_for(path))
+
+    def body_for(self, path: str) -> bytes:
+        points = tuple(path.rsplit("/", 3)[-3::2]) if "/to/" in path else ()
+        name = self.routes.get(points)
+        if name is None:
+            names = sorted(self.bodies)
+            name = names[zlib.crc32(path.encode()) % len(names)]
+        return self.bodies[name]
+
+    def reply(self, status: int, body: bytes, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def replay_handler(
+        bodies: Optional[dict[str, bytes]] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+    ) -> type:
+    """
+    Returns a replay handler class serving `bodies` (the recorded
+    fixtures by default) after `latency_ms` plus up to `jitter_ms`,
+    failing a share of requests with 500s and another with 429s
+    """
+    bodies = bodies or load_fixture_bodies()
+    return type("ConfiguredReplayHandler", (ReplayHandler,), {
+        'bodies': bodies,
+        'routes': {points: name for name, points in JOURNEYS.items() if name in bodies},
+        'latency': latency_ms / 1e3,
+        'jitter': jitter_ms / 1e3,
+        'error_rate': error_rate,
+        'throttle_rate': throttle_rate,
+        'retry_after': retry_after,
+        'rng': random.Random(seed),
+    })
+
+
+def add_standin_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="base response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniformly random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with a 429")
+
+
+def standin_from_args(args: argparse.Namespace, port: int = 0) -> StubServer:
+    return StubServer(
+        replay_handler(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            retry_after=args.retry_after,
+        ),
+        port=port,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded journey planner responses locally")
+    parser.add_argument("--port", type=int, default=8099)
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+    with standin_from_args(args, port=args.port) as server:
+        print(f"Replaying {FIXTURE_DIR} at {server.base_url}")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
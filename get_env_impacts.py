@@ -5,6 +5,11 @@ of different forms of public transport
 """
 
 import os
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+M_TO_KM = 0.001
 
 
 class EnvImpacts():
@@ -13,6 +18,9 @@ class EnvImpacts():
     
     Attributes:
         co2 (dict): a dictionary containing gCO2e/passenger km by transport mode
+        modes (list): the transport modes in code order
+        mode_codes (dict): a dictionary mapping transport mode to its integer code
+        co2_factors (np.ndarray): gCO2e/passenger km indexed by mode code
     """
 
     def __init__(self):
@@ -43,3 +51,49 @@ class EnvImpacts():
             'river-bus': 29.2, # use overground as proxy - electric motors
             'cablecar': 40.5 * 0.46, # use tram as proxy - electric cable power
         }
+
+        # mode-indexed factor array for vectorised scoring
+        self.modes = list(self.co2)
+        self.mode_codes = {mode: code for code, mode in enumerate(self.modes)}
+        self.co2_factors = np.array([self.co2[mode] for mode in self.modes], dtype=np.float64)
+
+    def encode_modes(self, modes: Iterable[str]) -> np.ndarray:
+        """
+        Converts transport mode names into integer mode codes.
+        Raises a KeyError for an unknown mode.
+        """
+        return np.fromiter((self.mode_codes[mode] for mode in modes), dtype=np.int64)
+
+    def score(
+            self,
+            modes: Union[np.ndarray, Iterable[str]],
+            distances: np.ndarray,
+            route_offsets: Optional[np.ndarray] = None,
+        ) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Scores legs in one vectorised pass from columnar arrays of mode
+        (an integer array of codes, or names) and distance in metres,
+        returning gCO2e per leg.
+        If `route_offsets` is given (n_routes + 1 offsets into the legs,
+        as in CSR format) the per-route totals are also returned.
+        """
+        if not (isinstance(modes, np.ndarray) and modes.dtype.kind in 'iu'):
+            # names, as a list or an array of strings
+            modes = self.encode_modes(modes)
+        # average intensity of mode per passenger km * metres * 1/1000
+        leg_co2 = self.co2_factors[modes] * np.asarray(distances, dtype=np.float64) * M_TO_KM
+        if route_offsets is None:
+            return leg_co2, None
+
+        # segmented sum, legs are accumulated in order within each route
+        route_offsets = np.asarray(route_offsets, dtype=np.int64)
+        if route_offsets[0] != 0 or route_offsets[-1] != len(leg_co2):
+            raise ValueError("route_offsets must run from 0 to the number of legs")
+        n_routes = len(route_offsets) - 1
+        route_ids = np.repeat(np.arange(n_routes), np.diff(route_offsets))
+        route_co2 = np.bincount(route_ids, weights=leg_co2, minlength=n_routes)
+        return leg_co2, route_co2
+
+
+# shared instance so the factor table is only built once
+ENV_IMPACTS = EnvImpacts()
@@ -6,11 +6,23 @@ transport network status
 
 import os
 import math
-import requests
-import omegaconf
+import time
 import ast
-from typing import List, Union
-from get_env_impacts import EnvImpacts
+import hashlib
+import logging
+import threading
+import numpy as np
+import requests
+from typing import List, Optional, Union
+from get_env_impacts import ENV_IMPACTS
+from lru import LruCache
+from metrics import METRICS
+from postcode_index import PointResolver
+from response_cache import ResponseCache, make_cache_key
+from stream_parse import iter_array_items
+from tfl_client import Credentials, TflClient, load_credentials
+
+logger = logging.getLogger('green_mapper')
 
 def get_start_end(file: str = "params.yml") -> tuple[Union[float, str], Union[float, str]]:
     """
@@ -19,38 +31,94 @@ def get_start_end(file: str = "params.yml") -> tuple[Union[float, str], Union[fl
     The points in `params.yml` should be either postcodes or 
     long/lat coordinates.
     """
+    import omegaconf
+
     params = omegaconf.OmegaConf.load(file)
     return params.default.points.start, params.default.points.end
 
 
-class Credentials():
-    def __init__(self, app_id, app_key):
-        self.app_id = app_id
-        self.app_key = app_key
+# guards creating the per-instance locks of `cached_slot`
+_CACHE_LOCK_CREATION = threading.Lock()
+
+
+def _cache_lock(instance) -> threading.RLock:
+    """
+    Returns the lock an instance computes its cached slots under,
+    creating it on first use
+    """
+    try:
+        return instance._cache_lock
+    except AttributeError:
+        with _CACHE_LOCK_CREATION:
+            try:
+                return instance._cache_lock
+            except AttributeError:
+                instance._cache_lock = threading.RLock()
+                return instance._cache_lock
 
 
-def load_credentials(file: str) -> Credentials:
+class cached_slot():
     """
-    This function accesses the text file with
-    the TFL API credentials and stores them in
-    a Credentials container
+    A `functools.cached_property` for classes with `__slots__`.
+    The value is computed on first access and stored in the
+    slot named after the property with a leading underscore.
+    The class needs a `_cache_lock` slot: the value is computed
+    under a per-instance lock, so threads first reading it at the
+    same time compute it once.
     """
-    with open(file, 'r') as file:
-        lines = file.readlines()
 
-    app_id = lines[0].replace(" ", "").replace("\n", "").split(':')[1]
-    app_key = lines[1].replace(" ", "").replace("\n", "").split(':')[1]
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.slot = owner.__dict__['_' + name]
 
-    return Credentials(app_id, app_key)
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return self.slot.__get__(instance, owner)
+        except AttributeError:
+            pass
+        with _cache_lock(instance):
+            try:
+                return self.slot.__get__(instance, owner)
+            except AttributeError:
+                value = self.func(instance)
+                self.slot.__set__(instance, value)
+                return value
+
+    def __set__(self, instance, value):
+        self.slot.__set__(instance, value)
 
 
 class Leg():
     """
     Contains information about a route leg between two
     intermediate points based on the dictionary output
-    from the TFL API journey planner
+    from the TFL API journey planner.
+
+    In lazy mode the geometry, distance and emissions are
+    computed on first access and then memoised. The legs of
+    a route hold their path as a view of the route's coordinates.
+    Legs shared through a `LegTable` are not changed once built.
     """
-    def __init__(self, leg_info: dict, compute_cost: bool = True, compute_env_cost: bool = True):
+    __slots__ = (
+        'duration', 'start_point_coord', 'start_point_name', 'end_point_coord', 'end_point_name',
+        'summary', 'mode', 'line', 'interchange_duration', 'interchange_position', 'cost', 'air_poll',
+        'content_hash', '_line_string', '_compute_env_cost', '_path', '_distance', '_co2_cost',
+        '_cache_lock',
+    )
+
+    def __init__(
+            self,
+            leg_info: dict,
+            compute_cost: bool = True,
+            compute_env_cost: bool = True,
+            lazy: bool = False,
+            path: Optional[np.ndarray] = None,
+        ):
         self.duration = leg_info['duration']
         self.start_point_coord = [leg_info['departurePoint']['lat'], leg_info['departurePoint']['lon']]
         self.start_point_name = leg_info['departurePoint']['commonName']
@@ -58,13 +126,16 @@ class Leg():
         self.end_point_name = leg_info['arrivalPoint']['commonName']
 
         self.summary = leg_info['instruction']['summary']
-    
-        self.path = (
-            [tuple(self.start_point_coord)] +
-            [tuple(point) for point in ast.literal_eval(leg_info['path']['lineString'])] +
-            [tuple(self.end_point_coord)]
-        )
-        self.distance = path_distance(self.path)
+
+        # set by the route, to spot the leg in a later response
+        self.content_hash = None
+        # only the raw geometry string is kept until the path is needed
+        self._line_string = None
+        if path is not None:
+            self.path = path
+        else:
+            self._line_string = leg_info['path']['lineString']
+        self._compute_env_cost = compute_env_cost
 
         self.mode = leg_info['mode']['name']
         self.line = leg_info['routeOptions'][0]['name']
@@ -81,66 +152,312 @@ class Leg():
         if compute_cost:
             self._calc_cost(leg_info)
         
-        self.co2_cost = None
         self.air_poll = None
-        if compute_env_cost:
-            self._calc_env_cost()
+        if not lazy:
+            self.distance
+            self.co2_cost
+
+    @classmethod
+    def from_fields(
+            cls,
+            path: np.ndarray,
+            compute_env_cost: bool = True,
+            **fields,
+        ) -> "Leg":
+        """
+        Rebuilds a leg from already extracted fields and geometry,
+        e.g. from an archive, without an API leg dictionary.
+        `fields` are the leg's attributes: duration, start_point_coord,
+        start_point_name, end_point_coord, end_point_name, summary,
+        mode, line, interchange_duration, interchange_position and,
+        optionally, distance and co2_cost to skip recomputing them.
+        """
+        leg = cls.__new__(cls)
+        leg.content_hash = None
+        leg._line_string = None
+        leg._compute_env_cost = compute_env_cost
+        leg.cost = None
+        leg.air_poll = None
+        leg.path = path
+        for name, value in fields.items():
+            setattr(leg, name, value)
+        return leg
+
+    def with_path(self, path: np.ndarray) -> "Leg":
+        """
+        Returns a copy of the leg with `path` as its geometry, keeping
+        the distance and emissions if they are already computed
+        """
+        leg = type(self).__new__(type(self))
+        for name in self.__slots__:
+            if name not in ('_line_string', '_path', '_cache_lock') and hasattr(self, name):
+                setattr(leg, name, getattr(self, name))
+        leg._line_string = None
+        leg.path = path
+        return leg
+
+    @cached_slot
+    def path(self) -> np.ndarray:
+        """
+        (n, 2) array of lat/lon points including the leg end points
+        """
+        path = np.vstack([
+            self.start_point_coord,
+            decode_line_string(self._line_string),
+            self.end_point_coord,
+        ])
+        self._path = path
+        self._line_string = None
+        return path
+
+    @cached_slot
+    def distance(self) -> float:
+        return path_distance(self.path)
+
+    @cached_slot
+    def co2_cost(self) -> Optional[float]:
+        if not self._compute_env_cost:
+            return None
+        return self._calc_env_cost()
     
     def _calc_cost(self, leg_info: dict):
         self.cost=None
     
-    def _calc_env_cost(self):
+    def _calc_env_cost(self) -> float:
         """
         Calculates the environmental impact of the leg.
         Currently includes calculation of CO2 emissions.
         """
-        m_to_km = 0.001
-        env_info = EnvImpacts()
-
-        # average intensity of mode per passenger km * metres * 1/1000
-        self.co2_cost = env_info.co2[self.mode] * self.distance * m_to_km
+        leg_co2, _ = ENV_IMPACTS.score([self.mode], [self.distance])
+        return float(leg_co2[0])
 
 
 class Route():
     """
     Contains summary information about a possible route between
-    two points and a dictionary containing each leg as well
+    two points and a dictionary containing each leg as well.
+
+    In lazy mode only the cheap summary fields (duration, times,
+    modes and instructions) are read up front. The legs, path and
+    emissions are built on first access and then memoised.
+
+    The geometry of every leg is held in one contiguous (n, 2)
+    float64 `coords` buffer, leg `i` being the rows between
+    `offsets[i]` and `offsets[i + 1]`. Leg paths are views of it,
+    or of the buffer of the route that first built a shared leg.
+
+    Legs with the same content as a leg in `leg_table`, e.g. the
+    walk to the station shared by several alternatives, reuse that
+    Leg instead of being decoded, measured and scored again.
     """
-    def __init__(self, route_info: dict, compute_total_cost: bool = True, compute_env_cost: bool = True):
+    __slots__ = (
+        'total_duration', 'depart_date', 'depart_time', 'arrive_date', 'arrive_time', 'num_legs',
+        'summary', 'modes', 'print_summary', 'total_cost', 'total_air_poll', 'co2_saving',
+        '_coords', '_offsets', '_leg_infos', '_compute_total_cost', '_compute_env_cost', '_lazy',
+        '_leg_table', '_legs', '_path', '_total_distance', '_total_co2', '_leg_hashes', '_content_hash',
+        '_cache_lock',
+    )
+
+    def __init__(
+            self,
+            route_info: dict,
+            compute_total_cost: bool = True,
+            compute_env_cost: bool = True,
+            lazy: bool = False,
+            leg_table: Optional["LegTable"] = None,
+        ):
         self.total_duration = route_info['duration']
         self.depart_date, self.depart_time = route_info['startDateTime'].split("T")
         self.arrive_date, self.arrive_time = route_info['arrivalDateTime'].split("T")
         self.num_legs = len(route_info['legs'])
 
-        # extract info by leg
-        self.legs = {}
-        for i in range(self.num_legs):
-            self.legs[i] = Leg(route_info['legs'][i],compute_total_cost, compute_env_cost)
+        self._leg_infos = route_info['legs']
+        self._compute_total_cost = compute_total_cost
+        self._compute_env_cost = compute_env_cost
+        self._lazy = lazy
+        self._leg_table = leg_table
 
-        # stitch leg paths to get total route path
-        self.path = []
-        self.summary = []
-        self.modes = []
-        for _, leg in self.legs.items():
-
-            # stitch leg paths to get total route path
-            self.path.append(leg.path)
-            # stitch summaries and modes together
-            self.summary.append(leg.summary)
-            self.modes.append(leg.mode)
-        self.print_summary = ""
-        for index, str in enumerate(self.summary, start=1):
-            self.print_summary += f"{index}.) {str}  \n"
+        # stitch summaries and modes together
+        self.summary = [leg_info['instruction']['summary'] for leg_info in self._leg_infos]
+        self.modes = [leg_info['mode']['name'] for leg_info in self._leg_infos]
+        self._build_print_summary()
         
         self.total_cost = None
         if compute_total_cost:
             self.total_cost = self._calc_total_cost()
 
-        self.total_co2 = None
         self.total_air_poll = None
         self.co2_saving = 0.0
-        if compute_env_cost:
-            self._calc_total_env_cost()
+        if not lazy:
+            self.path
+            self.total_co2
+
+    @classmethod
+    def from_legs(
+            cls,
+            legs: dict[int, Leg],
+            total_duration: int,
+            start_date_time: str,
+            arrival_date_time: str,
+            compute_env_cost: bool = True,
+            coords: Optional[np.ndarray] = None,
+        ) -> "Route":
+        """
+        Rebuilds a route from already built legs, e.g. from an
+        archive, without an API journey dictionary. `coords` is
+        the legs' paths one after another if they are already
+        contiguous, otherwise they are copied into one buffer. The
+        route holds copies of the legs whose paths are views of that
+        buffer, and the legs passed in are left unchanged.
+        """
+        route = cls.__new__(cls)
+        lengths = [len(leg.path) for leg in legs.values()]
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        if coords is None:
+            coords = np.concatenate([leg.path for leg in legs.values()]) if legs else np.empty((0, 2))
+        # copies, as the legs passed in may be shared with other routes
+        legs = {
+            key: leg.with_path(coords[offsets[i]:offsets[i + 1]])
+            for i, (key, leg) in enumerate(legs.items())
+        }
+        route._coords, route._offsets = coords, offsets
+        route.total_duration = total_duration
+        route.depart_date, route.depart_time = start_date_time.split("T")
+        route.arrive_date, route.arrive_time = arrival_date_time.split("T")
+        route.num_legs = len(legs)
+        route._leg_infos = None
+        route._leg_table = None
+        route._compute_total_cost = False
+        route._compute_env_cost = compute_env_cost
+        route._lazy = True
+        route.legs = legs
+        route.summary = [leg.summary for leg in legs.values()]
+        route.modes = [leg.mode for leg in legs.values()]
+        route._build_print_summary()
+        route.total_cost = None
+        route.total_air_poll = None
+        route.co2_saving = 0.0
+        return route
+
+    def _build_print_summary(self):
+        self.print_summary = ""
+        for index, str in enumerate(self.summary, start=1):
+            self.print_summary += f"{index}.) {str}  \n"
+
+    @cached_slot
+    def legs(self) -> dict[int, Leg]:
+        """
+        Extracts info by leg, decoding every leg's geometry into
+        the route's coordinate buffer. The geometry of legs found
+        in the leg table is copied in instead.
+        """
+        table = self._leg_table
+        shared = [None] * self.num_legs
+        if table is not None:
+            shared = [table.get(leg_hash) for leg_hash in self.leg_hashes]
+            # legs scored differently are not interchangeable
+            shared = [
+                leg if leg is not None and leg._compute_env_cost == self._compute_env_cost else None
+                for leg in shared
+            ]
+        coords, offsets = stack_leg_paths(
+            self._leg_infos, [None if leg is None else leg.path for leg in shared]
+        )
+        legs = {}
+        for i in range(self.num_legs):
+            if shared[i] is not None:
+                legs[i] = shared[i]
+                continue
+            legs[i] = Leg(
+                self._leg_infos[i],
+                self._compute_total_cost,
+                self._compute_env_cost,
+                lazy=self._lazy,
+                path=coords[offsets[i]:offsets[i + 1]],
+            )
+            legs[i].content_hash = self.leg_hashes[i]
+            if table is not None:
+                legs[i] = table.add(self.leg_hashes[i], legs[i])
+        self._coords, self._offsets = coords, offsets
+        # store the legs before dropping what they are built from
+        self._legs = legs
+        self._leg_infos = None
+        self._leg_table = None
+        return legs
+
+    def built_legs(self) -> dict[int, Leg]:
+        """
+        The legs if they have already been built, otherwise an empty dict
+        """
+        try:
+            return self._legs
+        except AttributeError:
+            return {}
+
+    def same_times(self, other: "Route") -> bool:
+        """
+        Whether another route departs and arrives at the same times
+        """
+        return (
+            (self.total_duration, self.depart_date, self.depart_time, self.arrive_date, self.arrive_time)
+            == (other.total_duration, other.depart_date, other.depart_time, other.arrive_date, other.arrive_time)
+        )
+
+    @cached_slot
+    def leg_hashes(self) -> List[Optional[bytes]]:
+        """
+        Content hash of each leg, None for legs rebuilt without
+        their API content
+        """
+        if self._leg_infos is not None:
+            return [leg_content_hash(leg_info) for leg_info in self._leg_infos]
+        return [leg.content_hash for leg in self.legs.values()]
+
+    @cached_slot
+    def content_hash(self) -> Optional[bytes]:
+        """
+        Hash of the content of every leg, equal for routes that are
+        drawn the same, or None if a leg's content is unknown
+        """
+        if None in self.leg_hashes:
+            return None
+        return route_content_hash(self.leg_hashes)
+
+    @property
+    def coords(self) -> np.ndarray:
+        """
+        (n, 2) float64 buffer of every leg's lat/lon points in order
+        """
+        self.legs
+        return self._coords
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        Row of `coords` each leg starts at, followed by the number of rows
+        """
+        self.legs
+        return self._offsets
+
+    @cached_slot
+    def path(self) -> List[np.ndarray]:
+        """
+        Per leg views of the route's coordinate buffer
+        """
+        return [leg.path for _, leg in self.legs.items()]
+
+    @cached_slot
+    def total_distance(self) -> float:
+        """
+        Total length of the route in metres
+        """
+        return float(sum(leg.distance for _, leg in self.legs.items()))
+
+    @cached_slot
+    def total_co2(self) -> Optional[float]:
+        if not self._compute_env_cost:
+            return None
+        return self._calc_total_env_cost()
     
     def _calc_total_cost(self) -> float:
         """
@@ -148,14 +465,18 @@ class Route():
         """
         return None
 
-    def _calc_total_env_cost(self):
+    def _calc_total_env_cost(self) -> float:
         """
-        Sums up the gCO2e/passenger km across route legs.
+        Sums up the gCO2e/passenger km across route legs
+        with the same engine used to score batches of routes.
         """
-        total_co2 = 0.0
-        for _, leg in self.legs.items():
-            total_co2 += leg.co2_cost
-        self.total_co2 = total_co2
+        legs = self.legs.values()
+        _, route_co2 = ENV_IMPACTS.score(
+            [leg.mode for leg in legs],
+            [leg.distance for leg in legs],
+            route_offsets=[0, self.num_legs],
+        )
+        return float(route_co2[0])
     
     def _get_modes(self) -> List[str]:
         """
@@ -186,23 +507,109 @@ class Journey():
             points: tuple[Union[float, str], Union[float, str]],
             route_params: dict = {},
             cred_file: str = 'tfl_api.txt',
+            cache: Optional[ResponseCache] = None,
+            client: Optional[TflClient] = None,
+            resolver: Optional[PointResolver] = None,
+            leg_table: Optional["LegTable"] = None,
         ):
         """
         params:
             points: tuple containing the start and end point of the route
             route_params: dictionary containing other parameters to pass to API request
-            cred_file: text file holding API access key and id information
+            cred_file: text file holding API access key and id information,
+                only read when no client is passed
+            cache: optional response cache shared between journeys
+            client: optional long-lived API client shared between journeys
+            resolver: optional resolver turning the points into canonical coordinates
+            leg_table: optional table of legs shared between journeys, otherwise
+                legs are only shared between the routes of this journey
         """
 
-        # load credentials from a text file
-        self.credentials = load_credentials(cred_file)
-        self.start = points[0]
-        self.end = points[1]
+        # reuse a shared client, otherwise load credentials from a text file
+        if client is None:
+            client = TflClient(load_credentials(cred_file))
+        self.client = client
+        self.credentials = client.credentials
+        # points as given, and as sent to the api
+        self.points = points
+        if resolver is not None:
+            self.start = resolver.resolve(points[0])
+            self.end = resolver.resolve(points[1])
+        else:
+            self.start = points[0]
+            self.end = points[1]
         self.route_params = route_params
 
         # build url query
         self.url = self._construct_route_url()
+
+        self.cache = cache
+        self.leg_table = leg_table
+        self.cache_key = make_cache_key(self.start, self.end, self.route_params)
+        self.from_cache = False
+        self.retrieved_at = None
+        # validators of the last API response, for conditional refreshes
+        self.etag = None
+        self.last_modified = None
     
+    @classmethod
+    def from_content(
+            cls,
+            points: tuple[Union[float, str], Union[float, str]],
+            route_params: dict,
+            content: dict,
+            retrieved_at: Optional[float] = None,
+            client: Optional[TflClient] = None,
+            lazy: bool = True,
+            resolver: Optional[PointResolver] = None,
+        ) -> "Journey":
+        """
+        Rebuilds a journey from a previously retrieved API response
+        without calling the API again
+        """
+        journey = cls(points=points, route_params=route_params, client=client, resolver=resolver)
+        journey.status = "Successful"
+        journey.full_content = content
+        journey.retrieved_at = retrieved_at
+        journey.extract_route_info(lazy=lazy)
+        return journey
+
+    @classmethod
+    def from_routes(
+            cls,
+            points: tuple[Union[float, str], Union[float, str]],
+            route_params: dict,
+            routes: dict[int, Route],
+            retrieved_at: Optional[float] = None,
+            start: Optional[str] = None,
+            end: Optional[str] = None,
+        ) -> "Journey":
+        """
+        Rebuilds a journey from already built routes, e.g. from an
+        archive. The journey has no api client and is not retrieved again.
+        `start` and `end` are the points as sent to the api, if different.
+        """
+        journey = cls.__new__(cls)
+        journey.client = None
+        journey.credentials = None
+        journey.points = points
+        journey.start = points[0] if start is None else start
+        journey.end = points[1] if end is None else end
+        journey.route_params = route_params
+        journey.url = None
+        journey.cache = None
+        journey.leg_table = None
+        journey.cache_key = make_cache_key(journey.start, journey.end, route_params)
+        journey.from_cache = False
+        journey.retrieved_at = retrieved_at
+        journey.etag = None
+        journey.last_modified = None
+        journey.status = "Successful"
+        journey.full_content = None
+        journey.routes = routes
+        journey.num_routes = len(routes)
+        return journey
+
     def _construct_route_url(self) -> str:
         """
         This function uses the start and end points of the
@@ -211,66 +618,456 @@ class Journey():
         Additional parameters allowed by the API call can be added to
         the parameter object passed to the class.
         """
-        base_url = "https://api.tfl.gov.uk/Journey/JourneyResults/"
-        points = f"{self.start}/to/{self.end}"
-        credentials = f"?app_id={self.credentials.app_id}&app_key={self.credentials.app_key}"
-
-        url = base_url + points + credentials
-        for key, value in self.route_params.items():
-            url += f"&{key}={value}"
-
-        return url
+        return self.client.journey_url(self.start, self.end, self.route_params)
     
     def retrieve_routes(self):
         """
         This function executes the API request using the TFL
-        API and the constructed URL
+        API and the constructed URL. If a cache is attached,
+        a valid cached response is used instead of calling the API.
+        """
+        self.retrieved_at = time.time()
+        with METRICS.span('retrieve_routes'):
+            if self.cache is not None:
+                cached = self.cache.get(self.cache_key)
+                METRICS.count_cache('responses', cached is not None)
+                if cached is not None:
+                    self.status = "Successful"
+                    self.full_content = cached
+                    self.from_cache = True
+                    return
+
+            try:
+                response = self.client.get(self.url)
+            except requests.RequestException as error:
+                METRICS.count_response('error')
+                self.status = f"Failed with error: {self.client.describe_error(error)}"
+                self.full_content = None
+                return
+
+            METRICS.count_response(response.status_code, len(response.content))
+            if response.status_code == 200:
+                self.status = "Successful"
+                self.full_content = response.json()
+                self._record_validators(response)
+                if self.cache is not None:
+                    self.cache.set(self.cache_key, self.full_content)
+            else:
+                self.status = f"Failed with status code: {response.status_code}"
+                self.full_content = None
+
+    def stream_routes(self, chunk_size: int = 64 * 1024):
+        """
+        This function retrieves the routes like `retrieve_routes` and
+        `extract_route_info` together, but parses the response body as
+        it downloads, building each route as soon as its journey has
+        arrived. The decoded response is never kept, so `full_content`
+        stays None. An attached cache is given the raw response body.
         """
-        response = requests.get(self.url)
-        if response.status_code == 200:
+        self.retrieved_at = time.time()
+        self.full_content = None
+        self.routes = {}
+        self.num_routes = 0
+        with METRICS.span('stream_routes'):
+            if self.cache is not None:
+                cached = self.cache.get(self.cache_key)
+                METRICS.count_cache('responses', cached is not None)
+                if cached is not None:
+                    self.status = "Successful"
+                    self.from_cache = True
+                    leg_table = self._new_leg_table()
+                    for journey_info in cached['journeys']:
+                        self.routes[len(self.routes)] = Route(journey_info, leg_table=leg_table)
+                    self.num_routes = len(self.routes)
+                    return
+
+            try:
+                response = self.client.get(self.url, stream=True)
+            except requests.RequestException as error:
+                METRICS.count_response('error')
+                self.status = f"Failed with error: {self.client.describe_error(error)}"
+                return
+
+            with response:
+                if response.status_code != 200:
+                    METRICS.count_response(response.status_code, len(response.content))
+                    self.status = f"Failed with status code: {response.status_code}"
+                    return
+
+                # the raw body is only kept when it is going into the cache
+                body = [] if self.cache is not None else None
+                n_bytes = 0
+
+                def chunks():
+                    nonlocal n_bytes
+                    for chunk in response.iter_content(chunk_size):
+                        n_bytes += len(chunk)
+                        if body is not None:
+                            body.append(chunk)
+                        yield chunk
+
+                leg_table = self._new_leg_table()
+                try:
+                    # eager routes drop each journey's raw legs once they are built
+                    for journey_info in iter_array_items(chunks(), 'journeys'):
+                        self.routes[len(self.routes)] = Route(journey_info, leg_table=leg_table)
+                except (requests.RequestException, ValueError) as error:
+                    METRICS.count_response('error')
+                    self.status = f"Failed with error: {self.client.describe_error(error)}"
+                    self.routes = {}
+                    return
+                METRICS.count_response(response.status_code, n_bytes)
+
             self.status = "Successful"
-            self.full_content = response.json()
-        else:
-            self.status = f"Failed with status code: {response.status_code}"
-            self.full_content = None
+            self.num_routes = len(self.routes)
+            self._record_validators(response)
+            if self.cache is not None:
+                self.cache.set_raw(self.cache_key, b"".join(body))
 
-    def extract_route_info(self):
+    def refresh(self, lazy: bool = True) -> bool:
+        """
+        This function retrieves the journey again from the API, skipping
+        the cache. The request is conditional on the validators of the
+        last response, so an unchanged journey costs a 304 and keeps its
+        routes. Otherwise the new routes reuse the old Route and Leg
+        objects whose content is unchanged. Returns whether the routes
+        were updated; the current routes are kept if the request fails.
+        """
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+
+        with METRICS.span('refresh_routes'):
+            try:
+                response = self.client.get(self.url, headers=headers or None)
+            except requests.RequestException as error:
+                METRICS.count_response('error')
+                logger.warning("Could not refresh %r: %s", self, self.client.describe_error(error))
+                return False
+
+            METRICS.count_response(response.status_code, len(response.content))
+            if response.status_code == 304:
+                self.retrieved_at = time.time()
+                return False
+            if response.status_code != 200:
+                logger.warning("Could not refresh %r: status code %s", self, response.status_code)
+                return False
+
+            content = response.json()
+            self.retrieved_at = time.time()
+            self.status = "Successful"
+            self.from_cache = False
+            self._record_validators(response)
+            if self.cache is not None:
+                self.cache.set(self.cache_key, content)
+            self.update_routes(content, lazy=lazy)
+            return True
+
+    def update_routes(self, content: dict, lazy: bool = True):
+        """
+        This function replaces the routes with those of a newer API
+        response. Routes whose legs are all unchanged are kept as they
+        are, and the other routes take their unchanged legs, already
+        parsed and with their geometry decoded, from the old routes.
+        """
+        old_routes = {}
+        leg_table = self._new_leg_table()
+        for route in getattr(self, 'routes', {}).values():
+            if route.content_hash is not None:
+                old_routes.setdefault(route.content_hash, route)
+            # only legs that have already been built are worth reusing
+            for leg in route.built_legs().values():
+                leg_table.add(leg.content_hash, leg)
+
+        self.full_content = content
+        routes = {}
+        with METRICS.span('extract_route_info'):
+            for i, journey_info in enumerate(content['journeys']):
+                route = Route(journey_info, lazy=lazy, leg_table=leg_table)
+                old_route = old_routes.get(route.content_hash)
+                reused = old_route is not None and old_route.same_times(route)
+                METRICS.count_cache('refreshed_routes', reused)
+                if reused:
+                    route = old_routes.pop(route.content_hash)
+                routes[i] = route
+        self.routes = routes
+        self.num_routes = len(routes)
+
+    def _new_leg_table(self) -> "LegTable":
+        """
+        The shared leg table if there is one, otherwise a new
+        table for the routes of this journey
+        """
+        return self.leg_table if self.leg_table is not None else LegTable()
+
+    def _record_validators(self, response: "requests.Response"):
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+
+    def extract_route_info(self, lazy: bool = False):
         """
         This function converts the JSON output of the API
         request to custom classes containing key information
-        and can be used throughout the model
+        and can be used throughout the model.
+        With `lazy=True` each route only reads its summary fields
+        until its legs, path or emissions are first accessed.
         """
-        self.num_routes = len(self.full_content['journeys'])
-        self.routes = {}
-        for i in range(self.num_routes):
-            self.routes[i] = Route(self.full_content['journeys'][i])
+        with METRICS.span('extract_route_info'):
+            self.num_routes = len(self.full_content['journeys'])
+            self.routes = {}
+            leg_table = self._new_leg_table()
+            for i in range(self.num_routes):
+                self.routes[i] = Route(self.full_content['journeys'][i], lazy=lazy, leg_table=leg_table)
 
     def __repr__(self):
         return f"Journey class from {self.start} to {self.end}"
 
 
+def stack_leg_paths(
+        leg_infos: List[dict],
+        paths: Optional[List[Optional[np.ndarray]]] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    This function decodes the geometry of a route's API legs into one
+    contiguous (n, 2) float64 buffer, each leg's lineString between its
+    departure and arrival points, and returns it with the n_legs + 1
+    row offsets where each leg starts and the last one ends.
+    Legs with an already decoded path in `paths` are copied instead.
+    """
+    paths = paths or [None] * len(leg_infos)
+    lines = [
+        decode_line_string(leg_info['path']['lineString']) if path is None else path
+        for leg_info, path in zip(leg_infos, paths)
+    ]
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(line) + (2 if path is None else 0) for line, path in zip(lines, paths)])
+    coords = np.empty((offsets[-1], 2), dtype=np.float64)
+    for leg_info, line, path, start, end in zip(leg_infos, lines, paths, offsets[:-1], offsets[1:]):
+        if path is not None:
+            coords[start:end] = path
+            continue
+        coords[start] = (leg_info['departurePoint']['lat'], leg_info['departurePoint']['lon'])
+        coords[start + 1:end - 1] = line
+        coords[end - 1] = (leg_info['arrivalPoint']['lat'], leg_info['arrivalPoint']['lon'])
+    return coords, offsets
+
+
+def leg_content_hash(leg_info: dict) -> bytes:
+    """
+    This function hashes the fields of an API leg that a Leg is built
+    from, i.e. its mode, line, end points, instructions and geometry,
+    so identical legs can be found in other routes and responses
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for value in (
+        leg_info['duration'],
+        leg_info['departurePoint']['lat'],
+        leg_info['departurePoint']['lon'],
+        leg_info['departurePoint']['commonName'],
+        leg_info['arrivalPoint']['lat'],
+        leg_info['arrivalPoint']['lon'],
+        leg_info['arrivalPoint']['commonName'],
+        leg_info['instruction']['summary'],
+        leg_info['mode']['name'],
+        leg_info['routeOptions'][0]['name'],
+        leg_info.get('interChangeDuration', None),
+        leg_info.get('interChangePosition', None),
+        leg_info['path']['lineString'],
+    ):
+        digest.update(str(value).encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class LegTable():
+    """
+    Interns legs by their content hash, so routes that share a leg
+    share one Leg that is decoded, measured and scored once. Bounded
+    tables evict the least recently used legs and can be shared by
+    every journey in the process. A held leg keeps the coordinate
+    buffer of the route that built it alive.
+
+    Attributes:
+        max_entries (int): maximum number of legs held, None for no limit
+        hits (int): number of lookups that found a leg
+        misses (int): number of lookups that did not
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._legs = LruCache(max_entries)
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[bytes]) -> Optional[Leg]:
+        """
+        Returns the leg with a content hash, or None if it is not held
+        """
+        if key is None:
+            return None
+        leg = self._legs.get(key)
+        with self._lock:
+            if leg is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        METRICS.count_cache('legs', leg is not None)
+        return leg
+
+    def add(self, key: Optional[bytes], leg: Leg) -> Leg:
+        """
+        Holds a leg under its content hash and returns it, or the leg
+        already held under that hash
+        """
+        if key is None:
+            return leg
+        return self._legs.setdefault(key, leg)
+
+    def __len__(self) -> int:
+        return len(self._legs)
+
+
+def leg_table_from_params(cache_params) -> Optional[LegTable]:
+    """
+    This function builds the leg table shared by every journey from the
+    cache block of `params.yml`, or returns None if it is turned off
+    """
+    max_entries = (cache_params or {}).get('leg_table_entries', 0)
+    return LegTable(max_entries) if max_entries else None
+
+
+def route_content_hash(leg_hashes: List[bytes]) -> bytes:
+    """
+    This function combines the content hashes of a route's legs
+    """
+    return hashlib.blake2b(b"".join(leg_hashes), digest_size=16).digest()
+
+
 def extract_start_end(points: List)-> tuple[List[float], List[float]]:
     """
     This function takes a list of lists of points and extracts the
     first and last coordinate pair as lists
     """
-    return list(points[0][0]), list(points[-1][-1])
+    return [float(x) for x in points[0][0]], [float(x) for x in points[-1][-1]]
+
+
+_BRACKETS = str.maketrans("[]", "  ")
+# deleting the characters of numbers and spaces leaves only a lineString's punctuation
+_NUMBER_BYTES = b"0123456789.-+eE "
+
+
+def decode_line_string(line_string: str) -> np.ndarray:
+    """
+    This function parses a TFL `lineString` of the form
+    "[[lat,lon],[lat,lon],...]" into a contiguous (n, 2) float64 array.
+    Strings of any other shape, e.g. with a point of three values,
+    fall back to a slower structural parse and, failing that,
+    an empty array.
+    """
+    try:
+        flat = np.array(line_string.translate(_BRACKETS).split(","), dtype=np.float64)
+        # every point must be a bracketed pair, not just the totals add up
+        n = flat.size // 2
+        punctuation = line_string.encode().translate(None, _NUMBER_BYTES)
+        if n and punctuation == b"[[" + b",],[" * (n - 1) + b",]]":
+            return flat.reshape(-1, 2)
+    except (AttributeError, ValueError):
+        pass
+
+    try:
+        points = np.asarray(ast.literal_eval(line_string), dtype=np.float64)
+        if points.ndim == 2 and points.shape[1] == 2:
+            return points
+    except (SyntaxError, TypeError, ValueError):
+        pass
+    return np.empty((0, 2), dtype=np.float64)
+
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_distance(point1: tuple[float, float], point2: tuple[float, float]) -> float:
+    """
+    This function calculates the great circle distance in metres between
+    two (lat, lon) points in degrees. It is the scalar reference for the
+    vectorised functions below.
+    """
+    lat1, lon1 = math.radians(point1[0]), math.radians(point1[1])
+    lat2, lon2 = math.radians(point2[0]), math.radians(point2[1])
+    a = (
+        math.sin((lat2 - lat1) / 2)**2 +
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2)**2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def haversine_distances(points1: np.ndarray, points2: np.ndarray) -> np.ndarray:
+    """
+    This function calculates the haversine distance in metres between
+    matching rows of two (n, 2) arrays of (lat, lon) points. Either
+    can be a single (2,) point to measure from it to every row.
+    """
+    radians1 = np.radians(np.asarray(points1, dtype=np.float64))
+    radians2 = np.radians(np.asarray(points2, dtype=np.float64))
+    lat1, lon1 = radians1[..., 0], radians1[..., 1]
+    lat2, lon2 = radians2[..., 0], radians2[..., 1]
+    a = (
+        np.sin((lat2 - lat1) / 2)**2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    )
+    # rounding can take a just past 1 for antipodal points
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
 
 
-def euc_distance(point1: tuple[float, float], point2: tuple[float, float]) -> float:
+def segment_distances(points: Union[np.ndarray, List[tuple[float]]]) -> np.ndarray:
     """
-    This function calculates the euclidean distance between two points
+    This function calculates the haversine distance in metres between
+    each consecutive pair in an (n, 2) array of (lat, lon) points,
+    returning an array of n-1 segment lengths
     """
-    return math.sqrt((point2[0] - point1[0])**2 + (point2[0] - point1[0])**2)
+    radians = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    lat, lon = radians[:, 0], radians[:, 1]
+    # each point's cosine is computed once for both segments it ends
+    a = (
+        np.sin(np.diff(lat) / 2)**2 +
+        np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2)**2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
 
 
-def path_distance(points: List[tuple[float]]) -> float:
+def path_distance(points: Union[np.ndarray, List[tuple[float]]]) -> float:
     """
-    This function applies the euclidean distance formula
-    sequentially to pairs of points in a list to approximate 
-    the total distance of the path described by the entire list.
+    This function calculates the total length in metres of the path
+    described by a sequence of (lat, lon) points
     """
-    tot_dist = 0.0
-    for i in range(len(points) -1):
-        tot_dist += euc_distance(points[i], points[i+1])
-    return tot_dist
+    if len(points) < 2:
+        return 0.0
+    return float(segment_distances(points).sum())
+
+
+def path_distances(paths: List) -> np.ndarray:
+    """
+    This function calculates the length in metres of each path in a
+    list of paths (e.g. every leg of a batch of routes) in one
+    vectorised pass over the concatenated points
+    """
+    lengths = np.array([len(path) for path in paths], dtype=np.int64)
+    if len(paths) == 0 or lengths.sum() == 0:
+        return np.zeros(len(paths))
+    points = np.concatenate([np.asarray(path, dtype=np.float64).reshape(-1, 2) for path in paths])
+    segments = segment_distances(points)
+
+    # zero the segments joining the end of one path to the start of the next
+    joins = np.cumsum(lengths) - 1
+    segments[joins[(joins >= 0) & (joins < len(segments))]] = 0.0
+
+    # sum the segments belonging to each path with at least one segment
+    totals = np.zeros(len(paths))
+    has_segments = lengths > 1
+    if has_segments.any():
+        starts = (np.cumsum(lengths) - lengths)[has_segments]
+        totals[has_segments] = np.add.reduceat(segments, starts)
+    return totals
@@ -4,8 +4,38 @@ interactive folium map and plot journeys
 """
 
 import folium
-from typing import List
+import branca.colormap
+import numpy as np
+from typing import List, Optional
 from get_routes import Journey, extract_start_end
+from isochrones import IsochroneGrid
+from simplify_paths import simplify_path, tolerance_for_zoom
+
+# hex codes from https://blog.tfl.gov.uk/2022/12/22/digital-colour-standard/
+COLOUR_MAP = {
+    'walking': 'lightgray',
+    'cycle': 'lightgreen',
+    'tube/Bakerloo': '#B26300',
+    'tube/Central': '#DC241F',
+    'tube/Circle': '#FFC80A',
+    'tube/District': '#007D32',
+    'tube/Hammersmith & City': '#F589A6',
+    'tube/Jubilee': '#838D93',
+    'tube/Metropolitan': '#9B0058',
+    'tube/Northern': '#000000',
+    'tube/Piccadily': '#0019A8',
+    'tube/Victoria': '#039BE5',
+    'tube/Waterloo & City': '#76D0BD',
+    'elizabeth-line': "#60399E",
+    'national-rail': "#BF40BF",
+    'overground': '#FA7B05',
+    'dlr': '#00AFAD',
+    'bus': '#DC241F',
+    'river-bus': '#039BE5',
+    'cablecar': '#DC241F',
+    'tram': '#5FB526'
+}
+
 
 class Map(folium.Map):
     """
@@ -17,40 +47,23 @@ class Map(folium.Map):
 
     Attributes:
         colour_map (dict): dictionary mapping transport mode to colour for plotting
+        zoom (float): zoom level the map is rendered at
+        simplify_px (float): display simplification tolerance in screen pixels,
+            None plots every point
     """
 
     def __init__(
             self,
             map_params: dict,
+            simplify_px: Optional[float] = 1.0,
         ):
         # initialise map with base parameters
         super().__init__(**map_params)
+        self.zoom = float(map_params.get('zoom_start', 10))
+        self.simplify_px = simplify_px
 
         # set colour attribute map
-        # hex codes from https://blog.tfl.gov.uk/2022/12/22/digital-colour-standard/
-        self.colour_map = {
-            'walking': 'lightgray',
-            'cycle': 'lightgreen',
-            'tube/Bakerloo': '#B26300',
-            'tube/Central': '#DC241F',
-            'tube/Circle': '#FFC80A',
-            'tube/District': '#007D32',
-            'tube/Hammersmith & City': '#F589A6',
-            'tube/Jubilee': '#838D93',
-            'tube/Metropolitan': '#9B0058',
-            'tube/Northern': '#000000',
-            'tube/Piccadily': '#0019A8',
-            'tube/Victoria': '#039BE5',
-            'tube/Waterloo & City': '#76D0BD',
-            'elizabeth-line': "#60399E",
-            'national-rail': "#BF40BF",
-            'overground': '#FA7B05',
-            'dlr': '#00AFAD',
-            'bus': '#DC241F',
-            'river-bus': '#039BE5',
-            'cablecar': '#DC241F',
-            'tram': '#5FB526'
-        }
+        self.colour_map = dict(COLOUR_MAP)
     
     def _plot_route(self, journey: Journey, route_id: float):
         """
@@ -69,8 +82,9 @@ class Map(folium.Map):
         )
         assert route_id <= journey.num_routes - 1, msg
         
-        self.path = journey.routes[route_id].path
-        self.start_point, self.end_point = extract_start_end(self.path)
+        # per leg views of the route's coordinates, not kept on the map
+        path = journey.routes[route_id].path
+        self.start_point, self.end_point = extract_start_end(path)
         self.start_name = journey.routes[route_id].legs[0].start_point_name
         self.end_name = journey.routes[route_id].legs[journey.routes[route_id].num_legs - 1].end_point_name
 
@@ -88,16 +102,60 @@ class Map(folium.Map):
         ).add_to(self)
         
         modes = journey.routes[route_id]._get_modes()
-        lines_col_zip = match_line_to_col(self.path, modes, self.colour_map)
-        # add each leg to map
+        lines_col_zip = match_line_to_col(path, modes, self.colour_map)
+        # add each leg to map, simplified for display only
         for line, colour in lines_col_zip:
+            if self.simplify_px is not None:
+                tolerance = tolerance_for_zoom(self.zoom, self.start_point[0], self.simplify_px)
+                line = simplify_path(line, tolerance)
             folium.PolyLine(
-                locations=line,
+                locations=line.tolist(),
                 color=colour,
                 weight = 8,
                 opacity=1,
             ).add_to(self)
 
+    def _plot_isochrone(
+            self,
+            grid: IsochroneGrid,
+            max_minutes: Optional[float] = None,
+            metric: str = 'duration',
+        ):
+        """
+        This function overlays an isochrone grid onto the base map as a
+        single image layer with a colour scale legend
+
+        Args:
+            grid: quickest time and lowest emissions to each grid cell
+            max_minutes: cells further than this are left clear
+            metric: 'duration' to colour cells by minutes, 'co2' by gCO2e
+        """
+        values = grid.duration if metric == 'duration' else grid.co2
+        shown = np.isfinite(values)
+        if max_minutes is not None:
+            shown &= np.nan_to_num(grid.duration, nan=np.inf) <= max_minutes
+
+        caption = "Journey time (minutes)" if metric == 'duration' else "Emissions (gCO2e)"
+        low, high = (float(values[shown].min()), float(values[shown].max())) if shown.any() else (0.0, 1.0)
+        colour_scale = branca.colormap.LinearColormap(
+            ['green', 'yellow', 'red'], vmin=low, vmax=max(high, low + 1), caption=caption,
+        )
+        image = np.zeros(values.shape + (4,), dtype=np.uint8)
+        for cell in zip(*np.nonzero(shown)):
+            image[cell] = colour_scale.rgba_bytes_tuple(float(values[cell]))
+            image[cell + (3,)] = 160
+
+        (south, west), (north, east) = grid.bounds
+        folium.raster_layers.ImageOverlay(
+            image=image,
+            bounds=[[south, west], [north, east]],
+            name=caption,
+        ).add_to(self)
+        colour_scale.add_to(self)
+        if grid.origin is not None:
+            origin = [float(x) for x in grid.origin]
+            folium.Marker(location=origin, popup=f'Start Point:<br>{origin}').add_to(self)
+
     def _repr_html_(self):
         """
         Renders a folium map as a html block to be used in the dash app
@@ -115,4 +173,75 @@ def match_line_to_col(lines: List, modes: List, col_map:dict) -> zip:
     for line, mode in zip(lines, modes):
         colours.append(col_map[mode])
     mapped_lines = zip(lines, colours)
-    return mapped_lines
\ No newline at end of file
+    return mapped_lines
+
+
+def encode_polyline(path, precision: int = 5) -> str:
+    """
+    This function encodes an (n, 2) array of (lat, lon) points with the
+    Google encoded polyline algorithm, which takes a few bytes per point.
+    Every point is encoded in one vectorised pass.
+    """
+    ints = np.round(np.asarray(path, dtype=np.float64).reshape(-1, 2) * 10**precision).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=0).ravel()
+    # zig-zag encode the sign into the lowest bit
+    values = (deltas << 1) ^ (deltas >> 63)
+
+    # split each value into 5 bit chunks, lowest first, flagging all but the last
+    shifts = np.arange(7) * 5
+    chunks = (values[:, None] >> shifts) & 31
+    n_chunks = 1 + ((values[:, None] >> shifts[1:]) > 0).sum(axis=1)
+    used = shifts // 5 < n_chunks[:, None]
+    continued = shifts // 5 < n_chunks[:, None] - 1
+    chars = (chunks | continued * 0x20) + 63
+    return chars[used].astype(np.uint8).tobytes().decode('ascii')
+
+
+def route_geometry(
+        journey: Journey,
+        route_id: int,
+        zoom: float,
+        simplify_px: Optional[float] = 1.0,
+        col_map: dict = COLOUR_MAP,
+    ) -> dict:
+    """
+    This function converts a route into the compact geometry drawn
+    client-side: one encoded polyline and colour per leg, plus the
+    start and end markers with their popup text
+    """
+    route = journey.routes[route_id]
+    start_point, end_point = extract_start_end(route.path)
+    start_name = route.legs[0].start_point_name
+    end_name = route.legs[route.num_legs - 1].end_point_name
+
+    legs = []
+    for line, colour in match_line_to_col(route.path, route._get_modes(), col_map):
+        if simplify_px is not None:
+            line = simplify_path(line, tolerance_for_zoom(zoom, start_point[0], simplify_px))
+        legs.append({'colour': colour, 'polyline': encode_polyline(line)})
+
+    markers = [
+        {'location': start_point, 'popup': f'Start Point:<br>{start_name}<br>{start_point}'},
+        {'location': end_point, 'popup': f'End Point:<br>{end_name}<br>{end_point}'},
+    ]
+    return {'center': start_point, 'legs': legs, 'markers': markers}
+
+
+def base_map_config(map_params: dict) -> dict:
+    """
+    This function converts the folium base map parameters into
+    the settings the client-side Leaflet map is created with
+    """
+    tiles = map_params.get('tiles', 'openstreetmap')
+    if tiles.lower() == 'openstreetmap':
+        tiles_url = 'https://tile.openstreetmap.org/{z}/{x}/{y}.png'
+        attribution = '&copy; OpenStreetMap contributors'
+    else:
+        tiles_url = tiles
+        attribution = map_params.get('attr', '')
+    return {
+        'location': [float(x) for x in map_params['location']],
+        'zoom_start': float(map_params.get('zoom_start', 10)),
+        'tiles_url': tiles_url,
+        'attribution': attribution,
+    }
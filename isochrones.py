@@ -0,0 +1,192 @@
+"""
+This script maps where can be reached from one origin:
+journeys to a grid of destinations over the map viewport
+are planned concurrently and reduced to the quickest time
+and lowest emissions per cell, coarse cells first and then
+finer cells along the edge of the reachable area
+"""
+
+import math
+import threading
+from typing import Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from batch_journeys import plan_journeys
+from response_cache import ResponseCache
+from tfl_client import TflClient
+
+
+def viewport_bounds(
+        location: Sequence[float],
+        zoom: float,
+        width_px: int = 800,
+        height_px: int = 600,
+    ) -> tuple[tuple[float, float], tuple[float, float]]:
+    """
+    This function returns the ((south, west), (north, east)) corners
+    of a web mercator map of the given size in pixels centred on a
+    (lat, lon) location at a zoom level
+    """
+    lat, lon = float(location[0]), float(location[1])
+    degrees_per_pixel = 360 / (256 * 2**zoom)
+    half_width = width_px / 2 * degrees_per_pixel
+    half_height = height_px / 2 * degrees_per_pixel * math.cos(math.radians(lat))
+    return (lat - half_height, lon - half_width), (lat + half_height, lon + half_width)
+
+
+class IsochroneGrid():
+    """
+    The quickest journey time and lowest emissions from an origin
+    to each cell of a square grid over a bounding box. Row 0 is the
+    northern edge, so the arrays can be drawn as an image.
+
+    Attributes:
+        bounds (tuple): ((south, west), (north, east)) corners of the grid
+        size (int): number of cells along each side
+        duration (np.ndarray): (size, size) minutes of the quickest route, NaN if unknown
+        co2 (np.ndarray): (size, size) gCO2e of the lowest emission route, NaN if unknown
+        planned (np.ndarray): (size, size) cells planned at this size, the rest
+            hold the values of the coarser cell they are part of
+        failed (int): number of journeys that could not be planned
+        origin (list): (lat, lon) the journeys start from, None until one is planned
+    """
+
+    def __init__(self, bounds: tuple, size: int):
+        self.bounds = bounds
+        self.size = size
+        self.duration = np.full((size, size), np.nan)
+        self.co2 = np.full((size, size), np.nan)
+        self.planned = np.zeros((size, size), dtype=bool)
+        self.failed = 0
+        self.origin = None
+
+    def cell_centres(self) -> np.ndarray:
+        """
+        (size, size, 2) array of the (lat, lon) centre of each cell
+        """
+        (south, west), (north, east) = self.bounds
+        offsets = (np.arange(self.size) + 0.5) / self.size
+        lats = north - offsets * (north - south)
+        lons = west + offsets * (east - west)
+        return np.stack(np.meshgrid(lats, lons, indexing='ij'), axis=-1)
+
+    def refined(self) -> "IsochroneGrid":
+        """
+        Returns a grid with twice the cells along each side, each
+        holding the values of its parent cell until it is planned
+        """
+        grid = IsochroneGrid(self.bounds, self.size * 2)
+        grid.duration = np.repeat(np.repeat(self.duration, 2, axis=0), 2, axis=1)
+        grid.co2 = np.repeat(np.repeat(self.co2, 2, axis=0), 2, axis=1)
+        grid.failed = self.failed
+        grid.origin = self.origin
+        return grid
+
+    def record(self, cell: tuple[int, int], routes: Optional[dict]):
+        """
+        Reduces the routes planned to a cell to their minimum duration
+        and emissions, or marks the cell unknown if planning failed
+        """
+        self.planned[cell] = True
+        if not routes:
+            self.duration[cell] = self.co2[cell] = np.nan
+            self.failed += routes is None
+            return
+        if self.origin is None:
+            self.origin = next(iter(routes.values())).legs[0].start_point_coord
+        self.duration[cell] = min(route.total_duration for route in routes.values())
+        co2 = [route.total_co2 for route in routes.values() if route.total_co2 is not None]
+        self.co2[cell] = min(co2) if co2 else np.nan
+
+
+def edge_cells(grid: IsochroneGrid, max_minutes: float) -> np.ndarray:
+    """
+    This function returns the cells whose 3x3 neighbourhood is partly
+    within `max_minutes` and partly beyond it or unknown, i.e. the
+    cells along the edge of the reachable area worth refining
+    """
+    within = np.pad(np.nan_to_num(grid.duration, nan=np.inf) <= max_minutes, 1, mode='edge')
+    size = grid.size
+    windows = [within[i:i + size, j:j + size] for i in range(3) for j in range(3)]
+    return np.logical_or.reduce(windows) & ~np.logical_and.reduce(windows)
+
+
+def plan_isochrone(
+        origin: Union[float, str],
+        bounds: tuple,
+        client: TflClient,
+        route_params: dict = {},
+        cache: Optional[ResponseCache] = None,
+        levels: Sequence[int] = (4, 8, 16),
+        max_minutes: float = 30,
+        max_in_flight: int = 8,
+    ) -> Iterator[IsochroneGrid]:
+    """
+    This function plans journeys from an origin to the centre of every
+    cell of a `levels[0]` square grid over `bounds`, and then to the
+    cells of each finer level that lie along the `max_minutes` edge.
+    Each level must double the one before. The grid is yielded after
+    every journey, so coarse results can be shown while finer ones
+    arrive. Cached responses are reused through `cache`.
+    """
+    grid = IsochroneGrid(bounds, levels[0])
+    to_plan = np.ones((grid.size, grid.size), dtype=bool)
+    for level, size in enumerate(levels):
+        if level > 0:
+            if size != grid.size * 2:
+                raise ValueError(f"Isochrone levels must double each time, got {list(levels)}")
+            refine = np.repeat(np.repeat(edge_cells(grid, max_minutes), 2, axis=0), 2, axis=1)
+            grid = grid.refined()
+            to_plan = refine
+
+        cells = list(zip(*np.nonzero(to_plan)))
+        centres = grid.cell_centres()
+        pairs = (
+            (origin, f"{centres[cell][0]:.5f},{centres[cell][1]:.5f}", route_params)
+            for cell in cells
+        )
+        for result in plan_journeys(pairs, client, cache, max_in_flight=max_in_flight):
+            grid.record(cells[result.index], result.journey.routes if result.ok else None)
+            yield grid
+        if not cells:
+            yield grid
+
+
+class IsochroneJob():
+    """
+    Plans an isochrone on a background thread, keeping the latest
+    grid so it can be drawn while the finer cells are planned.
+
+    Attributes:
+        grid (IsochroneGrid): latest grid, None until the first journey is planned
+        done (bool): whether planning has finished or been cancelled
+        error (str): description of a failure that stopped planning, None otherwise
+    """
+
+    def __init__(self, origin: Union[float, str], bounds: tuple, client: TflClient, **kwargs):
+        self.grid = None
+        self.done = False
+        self.error = None
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(origin, bounds, client), kwargs=kwargs, name="isochrone", daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, origin, bounds, client, **kwargs):
+        try:
+            for grid in plan_isochrone(origin, bounds, client, **kwargs):
+                self.grid = grid
+                if self._cancelled.is_set():
+                    break
+        except Exception as error:
+            self.error = client.describe_error(error)
+        finally:
+            self.done = True
+
+    def cancel(self):
+        """
+        Stops planning after the journeys already in flight
+        """
+        self._cancelled.set()
@@ -0,0 +1,331 @@
+"""
+This script archives planned journeys as columnar tables
+of journeys, routes and legs, with leg geometry held as
+one flat coordinate array plus offsets. Tables are raw
+NumPy structured arrays on disk: appends write to the end
+of each file and reads are zero-copy memory maps.
+"""
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from get_routes import Journey, Leg, Route
+
+# string columns hold an index into the archive's string pool, -1 for None
+NO_STRING = -1
+
+JOURNEY_DTYPE = np.dtype([
+    ('journey_id', 'i8'),
+    ('retrieved_at', 'f8'),
+    ('points', 'i8'),
+    ('start', 'i8'),
+    ('end', 'i8'),
+    ('route_params', 'i8'),
+    ('route_offset', 'i8'),
+    ('route_count', 'i8'),
+])
+
+ROUTE_DTYPE = np.dtype([
+    ('journey_id', 'i8'),
+    ('duration', 'i8'),
+    ('depart', 'M8[s]'),
+    ('arrive', 'M8[s]'),
+    ('distance', 'f8'),
+    ('total_co2', 'f8'),
+    ('leg_offset', 'i8'),
+    ('leg_count', 'i8'),
+])
+
+LEG_DTYPE = np.dtype([
+    ('journey_id', 'i8'),
+    ('route_row', 'i8'),
+    ('mode', 'i8'),
+    ('line', 'i8'),
+    ('duration', 'i8'),
+    ('start_name', 'i8'),
+    ('end_name', 'i8'),
+    ('summary', 'i8'),
+    ('start_lat', 'f8'),
+    ('start_lon', 'f8'),
+    ('end_lat', 'f8'),
+    ('end_lon', 'f8'),
+    ('interchange_duration', 'i8'),
+    ('interchange_position', 'i8'),
+    ('distance', 'f8'),
+    ('co2', 'f8'),
+    ('coord_offset', 'i8'),
+    ('coord_count', 'i8'),
+])
+
+COORD_DTYPE = np.dtype([('lat', 'f8'), ('lon', 'f8')])
+
+TABLES = {
+    'journeys': JOURNEY_DTYPE,
+    'routes': ROUTE_DTYPE,
+    'legs': LEG_DTYPE,
+    'coords': COORD_DTYPE,
+    # utf-8 bytes of every string and the end offset of each
+    'strings': np.dtype('u1'),
+    'string_offsets': np.dtype('i8'),
+}
+
+
+class JourneyArchive():
+    """
+    An append-only columnar archive of journeys in a directory.
+    A single process should append at a time; any number may read.
+
+    Attributes:
+        directory (str): folder holding one `.bin` file per table
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        for table in TABLES:
+            open(self._path(table), 'ab').close()
+        self._string_ids = None
+        # table -> (file size, memory map) so maps are only reopened after appends
+        self._maps = {}
+
+    def _path(self, table: str) -> str:
+        return os.path.join(self.directory, f"{table}.bin")
+
+    def _table(self, table: str) -> np.ndarray:
+        """
+        Returns a read-only memory map of a table, or an empty array
+        """
+        dtype = TABLES[table]
+        size = os.path.getsize(self._path(table))
+        cached = self._maps.get(table)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        if size < dtype.itemsize:
+            array = np.empty(0, dtype=dtype)
+        else:
+            array = np.memmap(self._path(table), dtype=dtype, mode='r', shape=(size // dtype.itemsize,))
+        self._maps[table] = (size, array)
+        return array
+
+    @property
+    def journeys(self) -> np.ndarray:
+        return self._table('journeys')
+
+    @property
+    def routes(self) -> np.ndarray:
+        return self._table('routes')
+
+    @property
+    def legs(self) -> np.ndarray:
+        return self._table('legs')
+
+    @property
+    def coords(self) -> np.ndarray:
+        """
+        (n, 2) float64 view of every leg point, sliced by leg coord offsets
+        """
+        return self._table('coords').view(np.float64).reshape(-1, 2)
+
+    def __len__(self) -> int:
+        return len(self.journeys)
+
+    def string(self, ref: int) -> Optional[str]:
+        """
+        Returns the string stored under a string column value
+        """
+        if ref == NO_STRING:
+            return None
+        offsets = self._table('string_offsets')
+        start = int(offsets[ref - 1]) if ref > 0 else 0
+        return self._table('strings')[start:int(offsets[ref])].tobytes().decode()
+
+    def strings(self) -> list[str]:
+        """
+        Returns the whole string pool, e.g. to label mode codes
+        """
+        offsets = self._table('string_offsets')
+        data = self._table('strings').tobytes()
+        starts = np.concatenate([[0], offsets[:-1]])
+        return [data[start:end].decode() for start, end in zip(starts, offsets)]
+
+    def leg_path(self, leg_row: int) -> np.ndarray:
+        """
+        Returns a zero-copy view of a leg's (n, 2) geometry
+        """
+        leg = self.legs[leg_row]
+        start = int(leg['coord_offset'])
+        return self.coords[start:start + int(leg['coord_count'])]
+
+    def route_coords(self, leg_start: int, leg_count: int) -> np.ndarray:
+        """
+        Returns a zero-copy view of the geometry of a route's legs,
+        which are written one after another
+        """
+        if leg_count == 0:
+            return self.coords[:0]
+        first, last = self.legs[leg_start], self.legs[leg_start + leg_count - 1]
+        return self.coords[int(first['coord_offset']):int(last['coord_offset']) + int(last['coord_count'])]
+
+    def append(self, journey: Journey) -> int:
+        """
+        Appends a journey with extracted routes to the archive and
+        returns its journey id
+        """
+        journey_id = len(self.journeys)
+        route_row = len(self.routes)
+        leg_row = len(self.legs)
+        coord_row = len(self._table('coords'))
+
+        routes, legs, paths = [], [], []
+        n_coords = 0
+        new_strings = []
+        try:
+            for route in journey.routes.values():
+                route_legs = list(route.legs.values())
+                routes.append((
+                    journey_id,
+                    route.total_duration,
+                    np.datetime64(f"{route.depart_date}T{route.depart_time}", 's'),
+                    np.datetime64(f"{route.arrive_date}T{route.arrive_time}", 's'),
+                    route.total_distance,
+                    np.nan if route.total_co2 is None else route.total_co2,
+                    leg_row + len(legs),
+                    len(route_legs),
+                ))
+                for leg in route_legs:
+                    path = np.asarray(leg.path, dtype=np.float64).reshape(-1, 2)
+                    legs.append((
+                        journey_id,
+                        route_row + len(routes) - 1,
+                        self._intern(leg.mode, new_strings),
+                        self._intern(leg.line, new_strings),
+                        leg.duration,
+                        self._intern(leg.start_point_name, new_strings),
+                        self._intern(leg.end_point_name, new_strings),
+                        self._intern(leg.summary, new_strings),
+                        leg.start_point_coord[0],
+                        leg.start_point_coord[1],
+                        leg.end_point_coord[0],
+                        leg.end_point_coord[1],
+                        self._intern(leg.interchange_duration, new_strings),
+                        self._intern(leg.interchange_position, new_strings),
+                        leg.distance,
+                        np.nan if leg.co2_cost is None else leg.co2_cost,
+                        coord_row + n_coords,
+                        len(path),
+                    ))
+                    paths.append(path)
+                    n_coords += len(path)
+
+            journey_record = np.array([(
+                journey_id,
+                np.nan if journey.retrieved_at is None else journey.retrieved_at,
+                self._intern(json.dumps([str(point) for point in journey.points]), new_strings),
+                self._intern(str(journey.start), new_strings),
+                self._intern(str(journey.end), new_strings),
+                self._intern(json.dumps(dict(journey.route_params), sort_keys=True), new_strings),
+                route_row,
+                len(routes),
+            )], dtype=JOURNEY_DTYPE)
+
+            coords = np.concatenate(paths).view(COORD_DTYPE).ravel() if paths else None
+            leg_rows = np.array(legs, dtype=LEG_DTYPE)
+            route_rows = np.array(routes, dtype=ROUTE_DTYPE)
+            self._write_strings(new_strings)
+        except BaseException:
+            # strings that were never written must not be referred to by later journeys
+            for string in new_strings:
+                del self._string_ids[string]
+            raise
+
+        # child tables after the strings, so a reader never sees a journey without its rows
+        if coords is not None:
+            self._write('coords', coords)
+        self._write('legs', leg_rows)
+        self._write('routes', route_rows)
+        self._write('journeys', journey_record)
+        return journey_id
+
+    def load_journey(self, journey_id: int) -> Journey:
+        """
+        Rebuilds a journey with its routes and legs from the archive
+        without calling the API
+        """
+        record = self.journeys[journey_id]
+        routes = {}
+        route_start = int(record['route_offset'])
+        for route_id in range(int(record['route_count'])):
+            route = self.routes[route_start + route_id]
+            legs = {}
+            leg_start = int(route['leg_offset'])
+            for leg_id in range(int(route['leg_count'])):
+                legs[leg_id] = self._load_leg(leg_start + leg_id)
+            routes[route_id] = Route.from_legs(
+                legs,
+                int(route['duration']),
+                str(route['depart']),
+                str(route['arrive']),
+                coords=self.route_coords(leg_start, int(route['leg_count'])),
+            )
+
+        retrieved_at = float(record['retrieved_at'])
+        return Journey.from_routes(
+            points=tuple(json.loads(self.string(int(record['points'])))),
+            route_params=json.loads(self.string(int(record['route_params']))),
+            routes=routes,
+            retrieved_at=None if np.isnan(retrieved_at) else retrieved_at,
+            start=self.string(int(record['start'])),
+            end=self.string(int(record['end'])),
+        )
+
+    def _load_leg(self, leg_row: int) -> Leg:
+        leg = self.legs[leg_row]
+        co2 = float(leg['co2'])
+        return Leg.from_fields(
+            path=self.leg_path(leg_row),
+            duration=int(leg['duration']),
+            start_point_coord=[float(leg['start_lat']), float(leg['start_lon'])],
+            start_point_name=self.string(int(leg['start_name'])),
+            end_point_coord=[float(leg['end_lat']), float(leg['end_lon'])],
+            end_point_name=self.string(int(leg['end_name'])),
+            summary=self.string(int(leg['summary'])),
+            mode=self.string(int(leg['mode'])),
+            line=self.string(int(leg['line'])),
+            interchange_duration=self.string(int(leg['interchange_duration'])),
+            interchange_position=self.string(int(leg['interchange_position'])),
+            distance=float(leg['distance']),
+            co2_cost=None if np.isnan(co2) else co2,
+        )
+
+    def _intern(self, value, new_strings: list) -> int:
+        """
+        Returns the string pool index of a value, queueing new strings
+        """
+        if value is None:
+            return NO_STRING
+        if self._string_ids is None:
+            self._string_ids = {string: i for i, string in enumerate(self.strings())}
+        value = str(value)
+        ref = self._string_ids.get(value)
+        if ref is None:
+            ref = len(self._string_ids)
+            self._string_ids[value] = ref
+            new_strings.append(value)
+        return ref
+
+    def _write_strings(self, new_strings: list):
+        if not new_strings:
+            return
+        encoded = [string.encode() for string in new_strings]
+        offsets = self._table('string_offsets')
+        end = int(offsets[-1]) if len(offsets) else 0
+        # bytes before offsets, so every offset a reader sees is backed by data
+        self._write('strings', np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        self._write('string_offsets', end + np.cumsum([len(data) for data in encoded]))
+
+    def _write(self, table: str, rows: np.ndarray):
+        with open(self._path(table), 'ab') as file:
+            file.write(np.ascontiguousarray(rows, dtype=TABLES[table]).tobytes())
@@ -0,0 +1,150 @@
+"""
+This script contains session-keyed stores for the journey
+each user of the app last planned, so concurrent users do
+not overwrite each other and the app can run across
+several worker processes
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from get_routes import Journey
+from lru import LruCache
+from postcode_index import PointResolver
+from tfl_client import TflClient
+
+
+class MemoryJourneyStore():
+    """
+    A thread-safe in-process LRU store of journeys by session id.
+    Suitable for a single (threaded) server process.
+
+    Attributes:
+        max_sessions (int): maximum number of sessions kept
+    """
+
+    def __init__(self, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        self._journeys = LruCache(max_sessions)
+
+    def get(self, session_id: str) -> Optional[Journey]:
+        return self._journeys.get(session_id)
+
+    def set(self, session_id: str, journey: Journey):
+        self._journeys.set(session_id, journey)
+
+
+class SqliteJourneyStore():
+    """
+    A journey store in a sqlite file shared by every worker process.
+    Journeys are stored as their query and raw API response and are
+    rebuilt on read, with a small per-process memo of rebuilt journeys.
+    Journeys planned offline have no API response, so they are only
+    held in the memo of the process that planned them.
+
+    Attributes:
+        path (str): sqlite database file
+        max_age (float): seconds after which sessions are pruned
+    """
+
+    def __init__(
+            self,
+            path: str,
+            client: TflClient,
+            max_age: float = 24 * 60 * 60,
+            memo_size: int = 64,
+            resolver: Optional[PointResolver] = None,
+        ):
+        self.path = path
+        self.client = client
+        self.resolver = resolver
+        self.max_age = max_age
+        self._memo = LruCache(memo_size)
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(session_id TEXT PRIMARY KEY, updated REAL, record TEXT)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        One connection per thread; WAL lets readers and a writer in
+        different processes proceed concurrently
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, session_id: str) -> Optional[Journey]:
+        row = self._connection().execute(
+            "SELECT record FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+
+        memo_key = (session_id, record['retrieved_at'])
+        journey = self._memo.get(memo_key)
+        if journey is not None:
+            return journey
+        if record['full_content'] is None:
+            # planned offline by another process, or forgotten, so it is planned again
+            return None
+
+        journey = Journey.from_content(
+            points=tuple(record['points']),
+            route_params=record['route_params'],
+            content=record['full_content'],
+            retrieved_at=record['retrieved_at'],
+            client=self.client,
+            resolver=self.resolver,
+        )
+        self._memo.set(memo_key, journey)
+        return journey
+
+    def set(self, session_id: str, journey: Journey):
+        record = {
+            'points': list(journey.points),
+            'route_params': dict(journey.route_params),
+            'full_content': journey.full_content,
+            'retrieved_at': journey.retrieved_at,
+        }
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session_id, now, json.dumps(record, separators=(",", ":"))),
+            )
+            connection.execute("DELETE FROM sessions WHERE updated < ?", (now - self.max_age,))
+        self._memo.set((session_id, journey.retrieved_at), journey)
+
+
+def journey_store_from_params(
+        store_params,
+        client: TflClient,
+        resolver: Optional[PointResolver] = None,
+    ):
+    """
+    Builds a journey store from the `session_store` block of `params.yml`
+    """
+    store_params = store_params or {}
+    if store_params.get('backend', 'memory') == 'sqlite':
+        return SqliteJourneyStore(
+            store_params.get('path', 'cache/sessions.sqlite'),
+            client,
+            max_age=store_params.get('max_age_seconds', 24 * 60 * 60),
+            resolver=resolver,
+        )
+    return MemoryJourneyStore(store_params.get('max_sessions', 1024))
@@ -1,16 +1,57 @@
 """
 When executed, this script launches the web application
 with initial map.
+
+Folium is imported when a map is first drawn, and omegaconf
+only when the parameters are read by `create_server` or when
+the script is run, and the initial journey is planned in the
+background, so the server can bind its port as soon as the
+app is built.
 """
 
+import time
+_IMPORT_START = time.perf_counter()
+
 import dash
+import flask
 from dash import html, dcc
 from dash.dependencies import Input, Output
-import omegaconf
-import folium
-from typing import Union, List, Any
-from init_map import Map
-from get_routes import Journey
+import logging
+from functools import partial
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Union, List, Any, Optional
+from journey_archive import JourneyArchive
+from journey_store import journey_store_from_params
+from map_assets import LEAFLET_CSS, LEAFLET_JS, map_assets_from_params
+from metrics import METRICS, configure_metrics
+from offline_router import OfflineRouter, router_from_params
+from postcode_index import resolver_from_params
+from get_routes import Journey, leg_table_from_params
+from isochrones import IsochroneJob, viewport_bounds
+from render_cache import MapRenderCache
+from route_ranking import rank_routes
+from response_cache import cache_from_params
+from tfl_client import TflClient
+
+# session the start up journey is stored under
+DEFAULT_SESSION = "default"
+# orders offered for the route dropdown, routes keep API order when none is chosen
+SORT_OPTIONS = [
+    {'label': 'Fastest', 'value': 'time'},
+    {'label': 'Shortest', 'value': 'distance'},
+    {'label': 'Lowest emissions', 'value': 'emissions'},
+    {'label': 'Balanced', 'value': 'balanced'},
+    {'label': 'Best trade-offs first (Pareto)', 'value': 'pareto'},
+]
+# isochrones kept for polling, the oldest is cancelled beyond this
+MAX_ISOCHRONE_JOBS = 16
+# seconds the app may take to import and build before a warning is logged
+STARTUP_BUDGET_SECONDS = 0.5
+
+logger = logging.getLogger('green_mapper')
 
 
 class MapApp():
@@ -20,27 +61,243 @@ class MapApp():
             params):
         """
         This initialises an App class with the base map
-        ready to be launched
+        ready to be launched. The initial journey and any warm-up
+        journeys are planned in the background.
         """
-        # initialise application
-        self.app = dash.Dash(__name__)
+        init_start = time.perf_counter()
         self.base_map_params = params.init_map
+        self.display_params = params.get('display', None) or {}
+        # stage timings and api/cache counters, negligible overhead while disabled
+        self.metrics = configure_metrics(params.get('metrics', None))
+        # 'server' renders folium html per selection, 'client' draws encoded polylines in the browser
+        self.render_mode = self.display_params.get('render_mode', 'server')
+
+        # map javascript and css served by the app rather than CDNs, if fetched
+        self.map_assets = map_assets_from_params(self.display_params)
+
+        # initialise application
+        if self.render_mode == 'client':
+            self.app = dash.Dash(
+                __name__,
+                external_scripts=[self.asset_url(LEAFLET_JS)],
+                external_stylesheets=[self.asset_url(LEAFLET_CSS)],
+            )
+        else:
+            self.app = dash.Dash(__name__)
         self.route_params = params.route_params
         self.api_creds = params.api_cred
+        # one pooled api client and response cache shared by every journey the app plans
+        self.client = TflClient.from_params(params)
+        self.cache = cache_from_params(params.get('cache', None))
+        # age after which asking for the same journey again refreshes it
+        self.refresh_after = (params.get('cache', None) or {}).get('refresh_after_seconds', 30)
+        # legs shared by every journey, e.g. the walk to a popular station, built once
+        self.leg_table = leg_table_from_params(params.get('cache', None))
+        # rendered route maps, alternatives are prerendered in the background
+        self.map_renders = MapRenderCache(
+            max_entries=self.display_params.get('render_cache_entries', 64),
+            workers=self.display_params.get('prerender_workers', 2),
+        )
 
-        # init start and end points to keep track of
-        self.last_start = None
-        self.last_end = None
-        self.get_n_routes(0, params.points['start'], params.points['end'])
+        self.server_params = params.get('server', None) or {}
+        # resolves inputs to canonical coordinates so the api and cache see stable points
+        self.resolver = resolver_from_params(params.get('postcodes', None))
+        # last journey planned by each browser session
+        store_params = params.get('session_store', None) or {}
+        self.journey_store = journey_store_from_params(store_params, self.client, self.resolver)
+        # parse responses as they download without keeping them, the sqlite store needs whole responses
+        self.stream_responses = (
+            (params.get('client', None) or {}).get('stream_responses', False)
+            and store_params.get('backend', 'memory') != 'sqlite'
+        )
+
+        # optional columnar archive of every journey planned, written by one background thread
+        archive_dir = (params.get('archive', None) or {}).get('directory', None)
+        self.archive = JourneyArchive(archive_dir) if archive_dir else None
+        self.archive_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        # area reachable from a start point, planned in the background per session
+        self.isochrone_params = params.get('isochrone', None) or {}
+        self.isochrones = OrderedDict()
+        self.isochrone_lock = threading.Lock()
+
+        # plan the default journey, used by sessions that have not planned their own,
+        # then build the optional fallback planner over the archived legs and plan
+        # the warm-up journeys, off the startup path
+        self.startup_params = params.get('startup', None) or {}
+        self.warmup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warmup")
+        self.default_journey = self.warmup_pool.submit(
+            self.warm_up_journey, params.points['start'], params.points['end'], DEFAULT_SESSION
+        )
+        self.offline_router = self.warmup_pool.submit(
+            router_from_params, params.get('offline_router', None), self.archive, self.resolver
+        )
+        self.offline_router.add_done_callback(self._log_router_failure)
+        for start_point, end_point in self.startup_params.get('warmup', None) or []:
+            self.warmup_pool.submit(self.warm_up_journey, start_point, end_point)
 
         self.setup_layout()
+        self.setup_metrics()
+        if self.map_assets is not None:
+            self.map_assets.add_routes(self.app.server)
+        self.check_startup_time(init_start)
+
+    def check_startup_time(self, init_start: float):
+        """
+        This function records how long importing and building the app
+        took, logging a warning when it is over the startup budget
+        """
+        now = time.perf_counter()
+        self.startup_seconds = {
+            'import': init_start - _IMPORT_START,
+            'init': now - init_start,
+            'total': now - _IMPORT_START,
+        }
+        budget = self.startup_params.get('budget_seconds', STARTUP_BUDGET_SECONDS)
+        if budget is not None and self.startup_seconds['total'] > budget:
+            logger.warning(
+                "Startup took %.3fs (import %.3fs, init %.3fs), over the %.3fs budget",
+                self.startup_seconds['total'], self.startup_seconds['import'],
+                self.startup_seconds['init'], budget,
+            )
+
+    @property
+    def router(self) -> Optional[OfflineRouter]:
+        """
+        The offline router, or None until it has been built in the
+        background or if there is none
+        """
+        if not self.offline_router.done() or self.offline_router.exception() is not None:
+            return None
+        return self.offline_router.result()
+
+    @staticmethod
+    def _log_router_failure(future: Future):
+        error = future.exception()
+        if error is not None:
+            logger.error("Building the offline router failed", exc_info=error)
+
+    def warm_up_journey(
+            self,
+            start_point: Union[str, tuple[str, str]],
+            end_point: Union[str, tuple[str, str]],
+            session_id: Optional[str] = None,
+        ):
+        """
+        This function plans a journey in the background so its api
+        response and route maps are cached before it is first asked for,
+        storing it for a session if one is given
+        """
+        try:
+            if session_id is not None:
+                self.get_n_routes(0, start_point, end_point, session_id)
+            else:
+                self.prerender_route_maps(self.get_routes(start_point, end_point))
+        except Exception:
+            logger.exception("Warm-up of journey from %s to %s failed", start_point, end_point)
     
+    def setup_metrics(self):
+        """
+        This function exposes the metrics on the Flask server at
+        `/metrics` and traces the stages of each request when enabled
+        """
+        server = self.app.server
+        server.add_url_rule('/metrics', 'metrics', self.serve_metrics)
+        if self.metrics.trace_logger is not None:
+            server.before_request(self.metrics.start_trace)
+            server.after_request(self.finish_request_trace)
+
+    def serve_metrics(self) -> flask.Response:
+        """
+        Returns every metric in the Prometheus text format
+        """
+        return flask.Response(
+            self.metrics.exposition(),
+            mimetype='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+    def finish_request_trace(self, response: flask.Response) -> flask.Response:
+        """
+        Logs the stage timings of the finished request
+        """
+        self.metrics.finish_trace(path=flask.request.path, status=response.status_code)
+        return response
+
     def setup_layout(self):
         """
         This function sets up the structre of the dash
         page with headers, inputs/buttons, and output placeholder
         """
-        self.app.layout = html.Div([
+        # a layout function so every page load gets its own session id
+        self.app.layout = self.serve_layout
+
+        # callback for getting routes
+        self.app.callback(
+            Output('route-id-drop', 'options'),
+            [
+                Input('get-routes-button', 'n_clicks'),
+                Input('sort-by-drop', 'value'),
+            ],
+            [
+                dash.dependencies.State('start-point', 'value'),
+                dash.dependencies.State('end-point', 'value'),
+                dash.dependencies.State('session-id', 'data'),
+            ]
+        )(self.get_sorted_routes)
+
+        if self.render_mode == 'client':
+            # server sends encoded route geometry, drawn onto the base map in the browser
+            self.app.callback(
+                [
+                    Output('route-geometry', 'data'),
+                    Output('route-details', 'children')
+                ],
+                [Input('route-id-drop', 'value')],
+                [dash.dependencies.State('session-id', 'data')],
+            )(self.update_visuals)
+
+            self.app.clientside_callback(
+                dash.ClientsideFunction(namespace='green_mapper', function_name='draw_route'),
+                Output('route-drawn', 'children'),
+                [Input('route-geometry', 'data')],
+                [dash.dependencies.State('base-map', 'data')],
+            )
+        else:
+            # callback for plotting routes and updating info
+            self.app.callback(
+                [
+                    Output('folium-map', 'srcDoc'),
+                    Output('route-details', 'children')
+                ],
+                [Input('route-id-drop', 'value')],
+                [dash.dependencies.State('session-id', 'data')],
+            )(self.update_visuals)
+
+            # callback for starting an isochrone and redrawing it as finer cells arrive
+            self.app.callback(
+                [
+                    Output('folium-map', 'srcDoc', allow_duplicate=True),
+                    Output('isochrone-poll', 'disabled'),
+                ],
+                [
+                    Input('isochrone-button', 'n_clicks'),
+                    Input('isochrone-poll', 'n_intervals'),
+                ],
+                [
+                    dash.dependencies.State('start-point', 'value'),
+                    dash.dependencies.State('isochrone-minutes', 'value'),
+                    dash.dependencies.State('session-id', 'data'),
+                ],
+                prevent_initial_call=True,
+            )(self.update_isochrone)
+
+    def serve_layout(self) -> html.Div:
+        """
+        This function builds the page layout for a new page load
+        """
+        return html.Div([
+            # identifies the browser tab's journeys on the server
+            dcc.Store(id='session-id', storage_type='session', data=str(uuid.uuid4())),
+
             html.H1(
                 "Green Mapper",
                 style={
@@ -77,6 +334,15 @@ class MapApp():
                         id='route-id-drop',
                         placeholder='Select route option'
                     ),
+
+                    # orders the route options
+                    dcc.Dropdown(
+                        id='sort-by-drop',
+                        options=SORT_OPTIONS,
+                        placeholder='Sort routes by..'
+                    ),
+
+                    *self.isochrone_controls(),
                 ],
                 style= {
                     'width': '22%',
@@ -87,7 +353,7 @@ class MapApp():
             ),
 
             html.Div(
-                [html.Iframe(id='folium-map', width='100%', height='600px')],
+                self.map_container(),
                 style= {
                     'padding-left': '2%',
                     'width': '50%',
@@ -111,24 +377,46 @@ class MapApp():
 
         ])
 
-        # callback for getting routes
-        self.app.callback(
-            Output('route-id-drop', 'options'),
-            [Input('get-routes-button', 'n_clicks')],
-            [
-                dash.dependencies.State('start-point', 'value'),
-                dash.dependencies.State('end-point', 'value')
-            ]
-        )(self.get_n_routes)
+    def isochrone_controls(self) -> List:
+        """
+        This function returns the inputs for showing the area reachable
+        from the start point, drawn on the folium map in server render mode
+        """
+        if self.render_mode == 'client':
+            return []
+        return [
+            dcc.Input(
+                id='isochrone-minutes',
+                type='number',
+                min=5,
+                step=5,
+                value=self.isochrone_params.get('max_minutes', 30),
+                style={'display': 'block'}
+            ),
+            html.Button(
+                'Show reachable area',
+                id='isochrone-button',
+                style={'display': 'block'}
+            ),
+            # redraws the isochrone while its finer cells are planned
+            dcc.Interval(id='isochrone-poll', interval=1000, disabled=True),
+        ]
 
-        # callback for plotting routes and updating info
-        self.app.callback(
-            [
-                Output('folium-map', 'srcDoc'),
-                Output('route-details', 'children')
-            ],
-            [Input('route-id-drop', 'value')],
-        )(self.update_visuals)
+    def map_container(self) -> List:
+        """
+        This function returns the map placeholder for the render mode:
+        an iframe for folium html or a div for the client-side Leaflet map
+        """
+        if self.render_mode == 'client':
+            from init_map import base_map_config
+
+            return [
+                html.Div(id='leaflet-map', style={'width': '100%', 'height': '600px'}),
+                dcc.Store(id='base-map', data=base_map_config(self.base_map_params)),
+                dcc.Store(id='route-geometry'),
+                html.Div(id='route-drawn', hidden=True),
+            ]
+        return [html.Iframe(id='folium-map', width='100%', height='600px')]
     
     
     def get_routes(
@@ -138,47 +426,204 @@ class MapApp():
         ) -> Journey:
         """
         This function takes a start and end point and 
-        retrieves the routes from the TFL API
+        retrieves the routes from the TFL API, falling back
+        to the offline router once it has been built, if one
+        is configured
         """
         journey = Journey(
             points=(start_point, end_point),
             route_params = self.route_params,
-            cred_file = self.api_creds
+            cred_file = self.api_creds,
+            cache = self.cache,
+            client = self.client,
+            resolver = self.resolver,
+            leg_table = self.leg_table,
         )
-        journey.retrieve_routes()
-        journey.extract_route_info()
+        if self.stream_responses:
+            journey.stream_routes()
+        else:
+            journey.retrieve_routes()
+        router = self.router
+        if journey.status != "Successful" and router is not None:
+            # the api is unavailable, plan from archived legs instead
+            return router.plan((start_point, end_point), self.route_params)
+        if journey.status != "Successful":
+            # nothing to extract, the failed journey is shown with no routes
+            journey.routes = {}
+            journey.num_routes = 0
+        elif not self.stream_responses:
+            # the dropdown only needs route modes, legs are built when a route is viewed
+            journey.extract_route_info(lazy=True)
 
         return journey
     
+    def get_journey(self, session_id: Optional[str]) -> Journey:
+        """
+        This function returns the last journey planned by a session,
+        falling back to the default journey
+        """
+        journey = self.journey_store.get(session_id or DEFAULT_SESSION)
+        if journey is None:
+            # the default journey may still be planning in the background
+            self.default_journey.result()
+            journey = self.journey_store.get(DEFAULT_SESSION)
+        return journey
+
     def get_n_routes(
             self,
             n_clicks: int,
             start_point: Union[str, tuple[str, str]],
             end_point: Union[str, tuple[str, str]],
+            session_id: Optional[str] = None,
+            sort_by: Optional[str] = None,
+            refresh: bool = False,
         ) -> List[dict[str, Any]]:
         """
         Creates labels and value dictionary for route id dropdown menu
-        based in the journey provided
+        based in the journey provided, ordered by `sort_by` if given.
+        With `refresh=True` a repeated request for the same journey
+        refreshes it once it is older than `cache.refresh_after_seconds`.
         """
         if n_clicks is None:
             return []
 
-        # if new route has been requested, retrieve route
-        if start_point != self.last_start or end_point != self.last_end:
-            self.journey = self.get_routes(start_point, end_point)
-            # update latest requested route
-            self.last_start = start_point
-            self.last_end = end_point
-        
-        route_names = [
-            {'label': f"{id+1} - {' - '.join(route.modes)}", 'value': id}
-            for id, route in self.journey.routes.items()
-        ]
-        return route_names
+        with METRICS.span('get_n_routes'):
+            session_id = session_id or DEFAULT_SESSION
+            journey = self.journey_store.get(session_id)
+            # if new route has been requested, or the last attempt failed, retrieve route
+            if (
+                journey is None
+                or (start_point, end_point) != tuple(journey.points)
+                or journey.status != "Successful"
+            ):
+                journey = self.plan_for_session(session_id, start_point, end_point)
+            elif refresh and self.is_stale(journey):
+                if journey.client is None:
+                    # planned offline, see if the api is back
+                    journey = self.plan_for_session(session_id, start_point, end_point)
+                elif journey.refresh():
+                    self.journey_store.set(session_id, journey)
+                    self.prerender_route_maps(journey)
+
+            route_ids = rank_routes(journey, sort_by) if sort_by else list(journey.routes)
+            route_names = [
+                {'label': f"{id+1} - {' - '.join(journey.routes[id].modes)}", 'value': id}
+                for id in route_ids
+            ]
+            return route_names
+
+    def get_sorted_routes(
+            self,
+            n_clicks: int,
+            sort_by: Optional[str],
+            start_point: Union[str, tuple[str, str]],
+            end_point: Union[str, tuple[str, str]],
+            session_id: Optional[str] = None,
+        ) -> List[dict[str, Any]]:
+        """
+        This wrapper function lists the route options whenever routes
+        are requested or the sort order changes
+        """
+        refresh = dash.callback_context.triggered_id == 'get-routes-button'
+        return self.get_n_routes(n_clicks, start_point, end_point, session_id, sort_by=sort_by, refresh=refresh)
+
+    def plan_for_session(
+            self,
+            session_id: str,
+            start_point: Union[str, tuple[str, str]],
+            end_point: Union[str, tuple[str, str]],
+        ) -> Journey:
+        """
+        This function plans a journey, stores it as the session's
+        journey and queues its maps and archiving
+        """
+        journey = self.get_routes(start_point, end_point)
+        self.journey_store.set(session_id, journey)
+        self.prerender_route_maps(journey)
+        # offline routed journeys have no api client and are already archived
+        if self.archive is not None and journey.status == "Successful" and journey.client is not None:
+            self.archive_writer.submit(self.archive.append, journey).add_done_callback(self._log_archive_failure)
+        return journey
+
+    @staticmethod
+    def _log_archive_failure(future: Future):
+        """
+        Logs a journey the archive writer failed to append, as nothing
+        else reads the result of its future
+        """
+        error = future.exception()
+        if error is not None:
+            logger.error("Archiving a journey failed", exc_info=error)
+
+    def is_stale(self, journey: Journey) -> bool:
+        """
+        Whether a journey is old enough to be refreshed, or planned
+        again through the api if it was planned offline
+        """
+        if journey.retrieved_at is None:
+            return journey.client is None
+        return time.time() - journey.retrieved_at >= self.refresh_after
     
+    def render_route_map(self, journey: Journey, route_id: int) -> str:
+        """
+        This function plots a route of a journey onto a fresh
+        base map and returns the rendered html
+        """
+        from init_map import Map
+
+        with METRICS.span('build_map'):
+            map = Map(self.base_map_params, self.display_params.get('simplify_px', 1.0))
+            map._plot_route(journey, route_id)
+        # return html representation of folium map
+        with METRICS.span('render_html'):
+            return self.map_html(map)
+
+    def asset_url(self, url: str) -> str:
+        """
+        Returns the url a map asset is loaded from, the app's own copy if fetched
+        """
+        return url if self.map_assets is None else self.map_assets.url(url)
+
+    def map_html(self, map) -> str:
+        """
+        This function renders a folium map for the map iframe, linking
+        to the app's bundled copies of the map assets if they are served
+        """
+        html = map._repr_html_()
+        if self.map_assets is None:
+            return html
+        return self.map_assets.localise(html)
+
+    def route_map_key(self, journey: Journey, route_id: int) -> tuple:
+        """
+        Key of a rendered route map: the content of the route, so maps
+        of routes unchanged by a refresh are reused, or else the journey
+        query, when it was retrieved and the route, and the map display
+        parameters
+        """
+        map_params = repr(sorted(dict(self.base_map_params).items()))
+        display = self.display_params.get('simplify_px', 1.0)
+        route = journey.routes.get(route_id)
+        route_key = route.content_hash if route is not None else None
+        if route_key is None:
+            route_key = (journey.cache_key, journey.retrieved_at, route_id)
+        return (route_key, map_params, display)
+
+    def prerender_route_maps(self, journey: Journey):
+        """
+        Queues every route of a journey to be rendered in the background
+        """
+        if self.render_mode != 'server' or getattr(journey, 'routes', None) is None:
+            return
+        self.map_renders.prerender(
+            (self.route_map_key(journey, route_id), partial(self.render_route_map, journey, route_id))
+            for route_id in journey.routes
+        )
+
     def update_route_map(
             self,
-            route_id: int
+            route_id: int,
+            session_id: Optional[str] = None,
         ) -> dash:
         """
         This function takes user specified inputs, and 
@@ -186,20 +631,38 @@ class MapApp():
         """
         if route_id is not None:
             try:
-                map = Map(self.base_map_params)
-                map._plot_route(self.journey, int(route_id))
-                # return html representation of folium map
-                return map._repr_html_()
+                route_id = int(route_id)
+                journey = self.get_journey(session_id)
+                return self.map_renders.get(
+                    self.route_map_key(journey, route_id),
+                    partial(self.render_route_map, journey, route_id),
+                )
             except ValueError:
                 return "Please enter a valid route ID"
         else:
             return dash.no_update
         
-    def update_route_info(self, route_id: int) -> List:
+    def update_route_geometry(self, route_id: int, session_id: Optional[str] = None) -> dash:
+        """
+        This function returns the selected route as compact encoded
+        geometry for the client-side render mode
+        """
+        if route_id is None:
+            return dash.no_update
+        from init_map import route_geometry
+
+        return route_geometry(
+            self.get_journey(session_id),
+            int(route_id),
+            zoom=float(self.base_map_params.get('zoom_start', 10)),
+            simplify_px=self.display_params.get('simplify_px', 1.0),
+        )
+
+    def update_route_info(self, route_id: int, session_id: Optional[str] = None) -> List:
         """
         This function updates the route information displayed in the app
         """
-        route = self.journey.routes[int(route_id)]
+        route = self.get_journey(session_id).routes[int(route_id)]
         return [
 
             html.Div([
@@ -276,21 +739,117 @@ class MapApp():
  
         ]
     
-    def update_visuals(self, route_id: int) -> tuple:
+    def start_isochrone(
+            self,
+            session_id: str,
+            start_point: Union[str, tuple[str, str]],
+            max_minutes: float,
+        ):
+        """
+        This function starts planning journeys from the start point to a
+        grid over the base map in the background, replacing any isochrone
+        the session was already planning
+        """
+        viewport_px = self.isochrone_params.get('viewport_px', [800, 600])
+        bounds = viewport_bounds(
+            self.base_map_params['location'],
+            float(self.base_map_params.get('zoom_start', 10)),
+            *viewport_px,
+        )
+        job = IsochroneJob(
+            self.resolver.resolve(start_point),
+            bounds,
+            self.client,
+            route_params=self.route_params,
+            cache=self.cache,
+            levels=list(self.isochrone_params.get('levels', [4, 8, 16])),
+            max_minutes=max_minutes,
+            max_in_flight=self.isochrone_params.get('max_in_flight', 8),
+        )
+        with self.isochrone_lock:
+            previous = self.isochrones.pop(session_id, None)
+            if previous is not None:
+                previous.cancel()
+            self.isochrones[session_id] = job
+            while len(self.isochrones) > MAX_ISOCHRONE_JOBS:
+                _, oldest = self.isochrones.popitem(last=False)
+                oldest.cancel()
+
+    def update_isochrone(
+            self,
+            n_clicks: int,
+            n_intervals: int,
+            start_point: Union[str, tuple[str, str]],
+            max_minutes: Optional[float],
+            session_id: Optional[str] = None,
+        ) -> tuple:
+        """
+        This function starts an isochrone when requested and then redraws
+        the latest grid on every poll until planning has finished
+        """
+        session_id = session_id or DEFAULT_SESSION
+        max_minutes = max_minutes or self.isochrone_params.get('max_minutes', 30)
+        if dash.callback_context.triggered_id == 'isochrone-button':
+            if not start_point:
+                return "Please enter a start point", True
+            self.start_isochrone(session_id, start_point, max_minutes)
+            return dash.no_update, False
+
+        with self.isochrone_lock:
+            job = self.isochrones.get(session_id)
+        if job is None or job.grid is None:
+            return dash.no_update, job is None or job.done
+        done = job.done
+        from init_map import Map
+
+        with METRICS.span('render_isochrone'):
+            map = Map(self.base_map_params)
+            map._plot_isochrone(job.grid, max_minutes)
+            return self.map_html(map), done
+
+    def update_visuals(self, route_id: int, session_id: Optional[str] = None) -> tuple:
         """
         This wrapper function calls functions to update the map and
         summary details of the updated route id
         """
-        map_src_doc = self.update_route_map(route_id)
-        route_blocks = self.update_route_info(route_id)
+        with METRICS.span('update_visuals'):
+            if self.render_mode == 'client':
+                map_output = self.update_route_geometry(route_id, session_id)
+            else:
+                map_output = self.update_route_map(route_id, session_id)
+            route_blocks = self.update_route_info(route_id, session_id)
 
-        return map_src_doc, route_blocks
+        return map_output, route_blocks
 
     def run(self):
-        self.app.run_server(debug=True)
+        """
+        Runs the app on the development server with the settings in the
+        `server` block of `params.yml`. For production use a WSGI server
+        on `create_server()`, e.g. `gunicorn "launch:create_server()"`.
+        """
+        self.app.run(
+            host=self.server_params.get('host', '127.0.0.1'),
+            port=self.server_params.get('port', 8050),
+            debug=self.server_params.get('debug', False),
+            threaded=True,
+        )
+
+
+def create_server(params_file: str = 'params.yml'):
+    """
+    Builds the app and returns its Flask server for a production WSGI
+    server. Every worker process builds its own app, so use the sqlite
+    session store when running more than one worker.
+    """
+    import omegaconf
+
+    params = omegaconf.OmegaConf.load(params_file).default
+    return MapApp(params).app.server
 
     
 if __name__ == "__main__":
+    import omegaconf
+
     params = omegaconf.OmegaConf.load('params.yml').default
     app = MapApp(params)
     app.run()
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+This script contains the thread-safe least recently used
+mapping that the app's in-memory caches and stores keep
+their entries in
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class LruCache():
+    """
+    A thread-safe mapping that evicts the least recently used
+    entries beyond a number of entries and, given a `size`
+    function, beyond a total size. Reading an entry with `get`
+    marks it as recently used.
+
+    Attributes:
+        max_entries (int): maximum number of entries held, None for no limit
+        max_size (int): maximum total size of entries held, None for no limit
+        total_size (int): total size of the entries held
+        evictions (int): number of entries evicted to stay within the limits
+    """
+
+    def __init__(
+            self,
+            max_entries: Optional[int] = None,
+            max_size: Optional[int] = None,
+            size: Optional[Callable[[Any], int]] = None,
+        ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.total_size = 0
+        self.evictions = 0
+        self._size = size or (lambda value: 0)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value held under a key, or `default` if there is none
+        """
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """
+        Holds a value under a key, evicting the least recently used
+        entries beyond the limits. A value larger than `max_size` is
+        not held, and False is returned.
+        """
+        with self._lock:
+            self._pop(key)
+            size = self._size(value)
+            if self.max_size is not None and size > self.max_size:
+                return False
+            self._entries[key] = value
+            self.total_size += size
+            self._evict()
+            return True
+
+    def setdefault(self, key: Hashable, value: Any) -> Any:
+        """
+        Holds a value under a key unless one is already held, and
+        returns the value held
+        """
+        with self._lock:
+            held = self._entries.get(key, _MISSING)
+            if held is not _MISSING:
+                self._entries.move_to_end(key)
+                return held
+            self._entries[key] = value
+            self.total_size += self._size(value)
+            self._evict()
+            return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Removes the value held under a key and returns it, or
+        `default` if there is none
+        """
+        with self._lock:
+            value = self._pop(key)
+            return default if value is _MISSING else value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_size = 0
+            self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pop(self, key: Hashable) -> Any:
+        value = self._entries.pop(key, _MISSING)
+        if value is not _MISSING:
+            self.total_size -= self._size(value)
+        return value
+
+    def _evict(self):
+        while (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_size is not None and self.total_size > self.max_size)
+        ):
+            _, value = self._entries.popitem(last=False)
+            self.total_size -= self._size(value)
+            self.evictions += 1
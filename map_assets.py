@@ -0,0 +1,235 @@
+"""
+This script serves the JavaScript and CSS that folium maps load
+from CDNs from the app itself. The assets are downloaded once into
+a local directory and bundled into one script and one stylesheet,
+served under content-hashed urls with long-lived cache headers, and
+rendered maps link to the bundles instead of to every CDN asset
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+from typing import Iterable, Optional
+from urllib.parse import urljoin, urlsplit
+
+import flask
+
+MANIFEST = "manifest.json"
+# an asset never changes under its content-hashed url
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+# leaflet loaded by the page itself in client render mode
+LEAFLET_JS = "https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"
+LEAFLET_CSS = "https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"
+
+_LINK = re.compile(r'((?:src|href)=")(https?://[^"]+)(")')
+# a whole script or stylesheet tag in folium's rendered header
+_LINK_TAG = re.compile(r'[ \t]*<(?:script src|link rel="stylesheet" href)="(https?://[^"]+)"(?:></script>|/>)\n?')
+_CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)""")
+
+
+def asset_path(url: str) -> str:
+    """
+    This function returns where an asset is stored relative to the
+    assets directory, mirroring its CDN host and path so relative
+    urls inside stylesheets still resolve
+    """
+    parts = urlsplit(url)
+    path = posixpath.normpath(f"{parts.netloc}/{parts.path.lstrip('/')}")
+    if path.startswith("..") or path.startswith("/"):
+        raise ValueError(f"Asset url {url} points outside the assets directory")
+    return path
+
+
+def map_asset_urls() -> list[str]:
+    """
+    This function renders a map with every layer the app draws and
+    returns the JavaScript and CSS urls it links to, in order
+    """
+    import numpy as np
+    from init_map import Map
+    from isochrones import IsochroneGrid
+
+    map = Map({'location': [51.5, -0.14], 'zoom_start': 13})
+    grid = IsochroneGrid(((51.49, -0.16), (51.53, -0.12)), 2)
+    grid.duration[:] = np.arange(4).reshape(2, 2)
+    grid.origin = [51.5, -0.14]
+    map._plot_isochrone(grid, max_minutes=30)
+    return list(dict.fromkeys(match.group(1) for match in _LINK_TAG.finditer(map.get_root().render())))
+
+
+def fetch_assets(
+        links: Iterable[str],
+        directory: str,
+        extra_urls: Iterable[str] = (LEAFLET_JS, LEAFLET_CSS),
+        timeout: float = 20.0,
+    ) -> dict:
+    """
+    This function downloads the assets maps link to, `extra_urls` such
+    as the leaflet assets of the client render mode, and the fonts and
+    images their stylesheets refer to, into `directory`. It writes a
+    manifest of the map links in order and each file's path and digest.
+    """
+    import requests
+
+    links = list(links)
+    files = {}
+    queue = links + list(extra_urls)
+    with requests.Session() as session:
+        while queue:
+            url = queue.pop(0)
+            if url in files:
+                continue
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+            path = asset_path(url)
+            os.makedirs(os.path.join(directory, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(directory, path), "wb") as file:
+                file.write(response.content)
+            files[url] = {'path': path, 'digest': content_digest(response.content)}
+
+            if path.endswith(".css"):
+                for reference in _CSS_URL.findall(response.text):
+                    if not reference.startswith("data:"):
+                        queue.append(urljoin(url, reference).split("#")[0].split("?")[0])
+
+    manifest = {'links': links, 'files': files}
+    with open(os.path.join(directory, MANIFEST), "w") as file:
+        json.dump(manifest, file, indent=1)
+    return manifest
+
+
+def content_digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+class MapAssets():
+    """
+    Locally stored map assets, served by the app under urls holding
+    their content digest so browsers can cache them indefinitely.
+    The scripts and stylesheets maps link to are bundled into one
+    `map.js` and one `map.css`, with the urls in the stylesheets
+    pointed at the local fonts and images.
+
+    Attributes:
+        directory (str): directory the assets were fetched into
+        prefix (str): url path the assets are served under
+        urls (dict): local url of each fetched CDN url
+        bundle_urls (list): local urls of the script and stylesheet bundles
+    """
+
+    def __init__(self, directory: str, prefix: str = "/map-assets/"):
+        self.directory = os.path.abspath(directory)
+        self.prefix = prefix
+        with open(os.path.join(directory, MANIFEST)) as file:
+            manifest = json.load(file)
+        files = manifest['files']
+        self.urls = {url: f"{prefix}{entry['digest']}/{entry['path']}" for url, entry in files.items()}
+        # the (digest, path) pairs served, any other combination is not found
+        self._served = {(entry['digest'], entry['path']) for entry in files.values()}
+
+        # links that are bundled, and the bundles by path
+        self._bundled = set()
+        self._bundles = {}
+        for name, links in (
+            ('map.js', [url for url in manifest['links'] if asset_path(url).endswith('.js')]),
+            ('map.css', [url for url in manifest['links'] if asset_path(url).endswith('.css')]),
+        ):
+            links = [url for url in links if url in files]
+            parts = [self._read_bundled(url, files[url]['path']) for url in links]
+            # a semicolon between scripts in case one omits its last
+            body = ("\n;\n" if name.endswith('.js') else "\n").join(parts).encode()
+            self._bundles[name] = body
+            self._served.add((content_digest(body), name))
+            self._bundled.update(links)
+        self.bundle_urls = [
+            f"{prefix}{content_digest(body)}/{name}" for name, body in self._bundles.items()
+        ]
+
+    def _read_bundled(self, url: str, path: str) -> str:
+        """
+        Reads an asset for a bundle, pointing a stylesheet's urls at
+        the local copies of what it refers to
+        """
+        with open(os.path.join(self.directory, path), encoding="utf-8") as file:
+            text = file.read()
+        if path.endswith('.css'):
+            def local(match):
+                target = urljoin(url, match.group(1)).split("#")[0].split("?")[0]
+                return match.group(0).replace(match.group(1), self.urls.get(target, match.group(1)))
+            text = _CSS_URL.sub(local, text)
+        return text
+
+    def url(self, url: str) -> str:
+        """
+        Returns the local url of an asset, or the url itself if the
+        asset has not been fetched
+        """
+        return self.urls.get(url, url)
+
+    def localise(self, html: str) -> str:
+        """
+        Replaces the script and stylesheet links of a rendered map with
+        links to the bundles, and points any other fetched asset's link
+        at its local copy
+        """
+        first = True
+
+        def bundle(match):
+            nonlocal first
+            if match.group(1) not in self._bundled:
+                return match.group(0)
+            if not first:
+                return ""
+            first = False
+            script, stylesheet = self.bundle_urls
+            return (
+                f'    <script src="{script}"></script>\n'
+                f'    <link rel="stylesheet" href="{stylesheet}"/>\n'
+            )
+
+        html = _LINK_TAG.sub(bundle, html)
+        return _LINK.sub(lambda match: match.group(1) + self.url(match.group(2)) + match.group(3), html)
+
+    def add_routes(self, server: flask.Flask, route_prefix: Optional[str] = None):
+        """
+        Serves the assets from a Flask server
+        """
+        server.add_url_rule(
+            f"{route_prefix or self.prefix}<digest>/<path:path>", 'map_assets', self.serve,
+        )
+
+    def serve(self, digest: str, path: str) -> flask.Response:
+        """
+        Returns an asset with headers letting the browser keep it for a year
+        """
+        if (digest, path) not in self._served:
+            flask.abort(404)
+        if path in self._bundles:
+            mimetype = 'text/javascript' if path.endswith('.js') else 'text/css'
+            response = flask.Response(self._bundles[path], mimetype=mimetype)
+        else:
+            response = flask.send_from_directory(self.directory, path)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+
+
+def map_assets_from_params(display_params, prefix: str = "/map-assets/") -> Optional[MapAssets]:
+    """
+    Loads the locally served map assets from the display block of
+    `params.yml`, or returns None if none are configured or fetched yet
+    """
+    directory = (display_params or {}).get('map_assets', None)
+    if directory and os.path.exists(os.path.join(directory, MANIFEST)):
+        return MapAssets(directory, prefix)
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the map assets to serve them locally")
+    parser.add_argument("out_dir", help="directory to write the assets to")
+    args = parser.parse_args()
+    manifest = fetch_assets(map_asset_urls(), args.out_dir)
+    print(f"Fetched {len(manifest['files'])} map assets into {args.out_dir}")
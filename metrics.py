@@ -0,0 +1,233 @@
+"""
+This script times the stages of planning and drawing a
+journey and counts cache lookups and API responses, for
+scraping in the Prometheus text format. Everything is off
+until enabled, when spans and counters cost a flag check.
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Optional
+
+# seconds, from a cached lookup up to a slow API call
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# bytes, from an error body up to a long journey with many alternatives
+PAYLOAD_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+_NO_SPAN = nullcontext()
+
+
+def _escape_label_value(value) -> str:
+    """
+    Escapes a label value as the Prometheus text format requires,
+    the backslashes first so the escapes added are not escaped again
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{name}="{_escape_label_value(value)}"' for name, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter():
+    """
+    A monotonically increasing count per combination of label values
+    """
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, labels)))} {value:g}")
+        return lines
+
+
+class Histogram():
+    """
+    Counts of observations in fixed buckets, with their sum,
+    per combination of label values
+    """
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float], labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = labelnames
+        # labels -> [per bucket counts (last is above every bound), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else sum(series[0])
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in series:
+            named = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels({**named, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(named)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(named)} {cumulative}")
+        return lines
+
+
+class Metrics():
+    """
+    The app's metrics and the per-request trace of stage timings.
+
+    Attributes:
+        enabled (bool): whether spans and counters record anything
+        trace_logger (logging.Logger): logger the trace of each request is
+            written to, None to not trace requests
+        stage_seconds (Histogram): wall time of each instrumented stage
+        api_responses (Counter): API responses by status code, "error" for
+            requests that got no response
+        api_payload_bytes (Histogram): size of API response bodies
+        cache_lookups (Counter): lookups by cache and hit/miss
+    """
+
+    def __init__(self, enabled: bool = False, trace_logger: Optional[logging.Logger] = None):
+        self.enabled = enabled
+        self.trace_logger = trace_logger
+        self.stage_seconds = Histogram(
+            'green_mapper_stage_seconds', "Wall time of each stage of planning and drawing a journey",
+            STAGE_BUCKETS, ('stage',),
+        )
+        self.api_responses = Counter(
+            'green_mapper_api_responses_total', "TFL API responses by status code", ('status',),
+        )
+        self.api_payload_bytes = Histogram(
+            'green_mapper_api_payload_bytes', "Size of TFL API response bodies", PAYLOAD_BUCKETS,
+        )
+        self.cache_lookups = Counter(
+            'green_mapper_cache_lookups_total', "Cache lookups by cache and result", ('cache', 'result'),
+        )
+        self._trace = threading.local()
+
+    def span(self, stage: str):
+        """
+        Returns a context manager timing a stage, or a shared no-op one
+        when metrics are disabled
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(stage)
+
+    @contextmanager
+    def _span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_seconds.observe(elapsed, stage)
+            spans = getattr(self._trace, 'spans', None)
+            if spans is not None:
+                spans.append((stage, elapsed))
+
+    def count_cache(self, cache: str, hit: bool):
+        if self.enabled:
+            self.cache_lookups.inc(cache, 'hit' if hit else 'miss')
+
+    def count_response(self, status, n_bytes: Optional[int] = None):
+        if self.enabled:
+            self.api_responses.inc(str(status))
+            if n_bytes is not None:
+                self.api_payload_bytes.observe(n_bytes)
+
+    def start_trace(self):
+        """
+        Starts collecting the spans of the current thread's request
+        """
+        if self.enabled and self.trace_logger is not None:
+            self._trace.spans = []
+            self._trace.start = time.perf_counter()
+
+    def finish_trace(self, **fields):
+        """
+        Logs the spans collected since `start_trace` as one JSON line,
+        with any extra fields such as the request path
+        """
+        spans = getattr(self._trace, 'spans', None)
+        if spans is None:
+            return
+        self._trace.spans = None
+        record = {
+            **fields,
+            'total_ms': round((time.perf_counter() - self._trace.start) * 1e3, 3),
+            'spans': [[stage, round(elapsed * 1e3, 3)] for stage, elapsed in spans],
+        }
+        self.trace_logger.info(json.dumps(record))
+
+    def exposition(self) -> str:
+        """
+        Returns every metric in the Prometheus text format
+        """
+        lines = []
+        for metric in (self.stage_seconds, self.api_responses, self.api_payload_bytes, self.cache_lookups):
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+
+# shared by every module, configured by the app from `params.yml`
+METRICS = Metrics()
+
+
+def configure_metrics(metrics_params) -> Metrics:
+    """
+    Enables the shared metrics from the `metrics` block of `params.yml`.
+    `trace_log` is a file to append each request's stage timings to,
+    or "-" for stderr.
+    """
+    metrics_params = metrics_params or {}
+    METRICS.enabled = bool(metrics_params.get('enabled', False))
+    trace_log = metrics_params.get('trace_log', None)
+    if METRICS.enabled and trace_log:
+        logger = logging.getLogger('green_mapper.trace')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            handler = logging.StreamHandler() if trace_log == "-" else logging.FileHandler(trace_log)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        METRICS.trace_logger = logger
+    else:
+        METRICS.trace_logger = None
+    return METRICS
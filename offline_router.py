@@ -0,0 +1,693 @@
+"""
+This script plans journeys offline from legs harvested
+from earlier TFL API responses. Legs are joined into a
+graph held in compressed sparse row (CSR) arrays, with
+stops deduplicated by name and coordinate, and searched
+for the fastest, shortest or lowest emission route
+"""
+
+import heapq
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from get_env_impacts import ENV_IMPACTS
+from get_routes import EARTH_RADIUS_M, Journey, Leg, Route, haversine_distances
+from journey_archive import JourneyArchive
+from postcode_index import PointResolver, parse_coordinates
+from route_ranking import OBJECTIVES
+
+# modes whose harvested legs can also be travelled in reverse
+REVERSIBLE_MODES = ('walking', 'cycle')
+WALK_SPEED_MPS = 1.33
+# stops are deduplicated on coordinates rounded to this many decimal places (~1 m)
+COORD_PRECISION = 5
+
+
+class RouteGraph():
+    """
+    A directed graph of stops joined by harvested legs and short
+    walking transfers, in CSR form: the edges leaving node `u` are
+    `indptr[u]:indptr[u+1]` of the edge arrays.
+
+    Attributes:
+        node_coords (np.ndarray): (n_nodes, 2) lat/lon of each stop
+        node_names (list): common name of each stop
+        indptr (np.ndarray): (n_nodes + 1,) CSR row offsets
+        sources (np.ndarray): origin node of each edge
+        targets (np.ndarray): destination node of each edge
+        weights (dict): objective name -> (n_edges,) cost of each edge,
+            minutes for 'time', metres for 'distance', gCO2e for 'emissions'
+        modes (list): transport mode of each edge
+        lines (list): line of each edge
+        edge_leg (np.ndarray): harvested leg of each edge, -1 for transfers
+        edge_reversed (np.ndarray): whether the edge runs its leg backwards
+    """
+
+    def __init__(
+            self,
+            node_coords: np.ndarray,
+            node_names: list,
+            sources: np.ndarray,
+            targets: np.ndarray,
+            weights: dict,
+            modes: list,
+            lines: list,
+            edge_leg: np.ndarray,
+            edge_reversed: np.ndarray,
+            load_leg: Callable[[int], Leg],
+        ):
+        # sort edges by origin so each node's edges are contiguous
+        order = np.argsort(sources, kind='stable')
+        self.node_coords = node_coords
+        self.node_names = node_names
+        self.sources = sources[order]
+        self.targets = targets[order]
+        self.weights = {objective: weight[order] for objective, weight in weights.items()}
+        self.modes = [modes[i] for i in order]
+        self.lines = [lines[i] for i in order]
+        self.edge_leg = edge_leg[order]
+        self.edge_reversed = edge_reversed[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.sources, minlength=len(node_names)))])
+        self._load_leg = load_leg
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_names)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.targets)
+
+    def leg(self, edge: int) -> Leg:
+        """
+        Returns the leg travelled along an edge, the harvested leg itself
+        where possible, otherwise a leg built from the edge
+        """
+        leg_id = int(self.edge_leg[edge])
+        if leg_id >= 0 and not self.edge_reversed[edge]:
+            return self._load_leg(leg_id)
+
+        start, end = int(self.sources[edge]), int(self.targets[edge])
+        if leg_id >= 0:
+            path = np.ascontiguousarray(self._load_leg(leg_id).path[::-1])
+        else:
+            path = self.node_coords[[start, end]]
+        mode = self.modes[edge]
+        return Leg.from_fields(
+            path=path,
+            duration=int(math.ceil(self.weights['time'][edge])),
+            start_point_coord=self.node_coords[start].tolist(),
+            start_point_name=self.node_names[start],
+            end_point_coord=self.node_coords[end].tolist(),
+            end_point_name=self.node_names[end],
+            summary=f"{mode.title()} to {self.node_names[end]}",
+            mode=mode,
+            line=self.lines[edge],
+            interchange_duration=None,
+            interchange_position=None,
+            distance=float(self.weights['distance'][edge]),
+            co2_cost=float(self.weights['emissions'][edge]),
+        )
+
+
+def build_graph(
+        legs: Sequence[Leg],
+        transfer_radius_m: float = 150.0,
+        reversible_modes: Iterable[str] = REVERSIBLE_MODES,
+    ) -> RouteGraph:
+    """
+    This function builds a route graph from harvested legs. Stops with
+    the same name and (rounded) coordinate become one node, repeated
+    legs between the same stops on the same line keep the fastest, and
+    stops within `transfer_radius_m` of each other are joined by walks.
+    """
+    legs = list(legs)
+    names = {}
+
+    def name_id(name) -> int:
+        return names.setdefault(name, len(names))
+
+    return _build_graph(
+        start_names=np.array([name_id(leg.start_point_name) for leg in legs], dtype=np.int64),
+        start_coords=np.array([leg.start_point_coord for leg in legs], dtype=np.float64).reshape(-1, 2),
+        end_names=np.array([name_id(leg.end_point_name) for leg in legs], dtype=np.int64),
+        end_coords=np.array([leg.end_point_coord for leg in legs], dtype=np.float64).reshape(-1, 2),
+        name_pool=list(names),
+        modes=[leg.mode for leg in legs],
+        lines=[leg.line for leg in legs],
+        durations=np.array([leg.duration for leg in legs], dtype=np.float64),
+        distances=np.array([leg.distance for leg in legs], dtype=np.float64),
+        load_leg=legs.__getitem__,
+        transfer_radius_m=transfer_radius_m,
+        reversible_modes=reversible_modes,
+    )
+
+
+def graph_from_journeys(journeys: Iterable[Journey], **kwargs) -> RouteGraph:
+    """
+    This function builds a route graph from every leg of already
+    extracted journeys, see `build_graph` for the options
+    """
+    return build_graph(
+        [leg for journey in journeys for route in journey.routes.values() for leg in route.legs.values()],
+        **kwargs,
+    )
+
+
+def graph_from_archive(archive: JourneyArchive, **kwargs) -> RouteGraph:
+    """
+    This function builds a route graph from the legs table of a journey
+    archive without loading its journeys. Only the legs the graph keeps
+    are read back, when a route uses them.
+    """
+    table = archive.legs
+    pool = archive.strings()
+    refs = np.concatenate([table['start_name'], table['end_name']])
+    # compact the string pool to the stop names actually used
+    name_refs, name_ids = np.unique(refs, return_inverse=True)
+    return _build_graph(
+        start_names=name_ids[:len(table)],
+        start_coords=np.column_stack([table['start_lat'], table['start_lon']]),
+        end_names=name_ids[len(table):],
+        end_coords=np.column_stack([table['end_lat'], table['end_lon']]),
+        name_pool=[archive.string(int(ref)) for ref in name_refs],
+        modes=[pool[ref] for ref in table['mode']],
+        lines=[None if ref < 0 else pool[ref] for ref in table['line']],
+        durations=np.asarray(table['duration'], dtype=np.float64),
+        distances=np.asarray(table['distance'], dtype=np.float64),
+        load_leg=archive._load_leg,
+        **kwargs,
+    )
+
+
+def _build_graph(
+        start_names: np.ndarray,
+        start_coords: np.ndarray,
+        end_names: np.ndarray,
+        end_coords: np.ndarray,
+        name_pool: list,
+        modes: list,
+        lines: list,
+        durations: np.ndarray,
+        distances: np.ndarray,
+        load_leg: Callable[[int], Leg],
+        transfer_radius_m: float = 150.0,
+        reversible_modes: Iterable[str] = REVERSIBLE_MODES,
+    ) -> RouteGraph:
+    n_legs = len(modes)
+    scale = 10**COORD_PRECISION
+    # deduplicate stops on (name, rounded lat, rounded lon)
+    stop_keys = np.column_stack([
+        np.concatenate([start_names, end_names]),
+        np.round(np.concatenate([start_coords, end_coords]) * scale).astype(np.int64).reshape(-1, 2),
+    ]).reshape(-1, 3)
+    keys, first, node_ids = np.unique(stop_keys, axis=0, return_index=True, return_inverse=True)
+    node_ids = node_ids.ravel()
+    node_coords = np.concatenate([start_coords, end_coords]).reshape(-1, 2)[first]
+    node_names = [name_pool[name] for name in keys[:, 0]]
+    starts, ends = node_ids[:n_legs], node_ids[n_legs:]
+
+    # keep the fastest harvested leg per (start, end, mode, line)
+    services = {}
+    start_list, end_list = starts.tolist(), ends.tolist()
+    for leg_id in np.argsort(durations, kind='stable').tolist():
+        if start_list[leg_id] != end_list[leg_id]:
+            services.setdefault((start_list[leg_id], end_list[leg_id], modes[leg_id], lines[leg_id]), leg_id)
+    kept = np.fromiter(services.values(), dtype=np.int64, count=len(services))
+    reversible = set(reversible_modes)
+    reverse = kept[np.fromiter((modes[leg_id] in reversible for leg_id in kept), dtype=bool, count=len(kept))]
+
+    edge_leg = np.concatenate([kept, reverse])
+    sources = np.concatenate([starts[kept], ends[reverse]])
+    targets = np.concatenate([ends[kept], starts[reverse]])
+    edge_reversed = np.arange(len(edge_leg)) >= len(kept)
+    edge_modes = [modes[leg_id] for leg_id in edge_leg]
+    edge_lines = [lines[leg_id] for leg_id in edge_leg]
+    edge_time = durations[edge_leg]
+    edge_distance = distances[edge_leg]
+
+    # short walks between nearby stops let routes change between harvested legs
+    walk_from, walk_to, walk_distance = _transfers(node_coords, transfer_radius_m)
+    n_walks = len(walk_from)
+    sources = np.concatenate([sources, walk_from])
+    targets = np.concatenate([targets, walk_to])
+    edge_leg = np.concatenate([edge_leg, np.full(n_walks, -1, dtype=np.int64)])
+    edge_reversed = np.concatenate([edge_reversed, np.zeros(n_walks, dtype=bool)])
+    edge_modes += ['walking'] * n_walks
+    edge_lines += ['walking'] * n_walks
+    edge_time = np.concatenate([edge_time, walk_distance / WALK_SPEED_MPS / 60])
+    edge_distance = np.concatenate([edge_distance, walk_distance])
+
+    edge_co2, _ = ENV_IMPACTS.score(edge_modes, edge_distance)
+    return RouteGraph(
+        node_coords=node_coords,
+        node_names=node_names,
+        sources=sources.astype(np.int64),
+        targets=targets.astype(np.int64),
+        weights={'time': edge_time, 'distance': edge_distance, 'emissions': edge_co2},
+        modes=edge_modes,
+        lines=edge_lines,
+        edge_leg=edge_leg,
+        edge_reversed=edge_reversed,
+        load_leg=load_leg,
+    )
+
+
+def _transfers(node_coords: np.ndarray, radius_m: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the (from, to, metres) of every ordered pair of distinct
+    stops within `radius_m`, found by bucketing stops into grid cells
+    of at least the radius and comparing neighbouring cells only
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+    if radius_m <= 0 or len(node_coords) < 2:
+        return empty
+    cell_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cell_lon = cell_lat / max(math.cos(math.radians(float(np.abs(node_coords[:, 0]).max()))), 1e-6)
+    cells = np.floor(node_coords / (cell_lat, cell_lon)).astype(np.int64)
+
+    buckets = {}
+    for node, cell in enumerate(map(tuple, cells.tolist())):
+        buckets.setdefault(cell, []).append(node)
+
+    walk_from, walk_to, walk_distance = [], [], []
+    for (row, col), nodes in buckets.items():
+        nearby = np.array([
+            other
+            for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)
+            for other in buckets.get((row + d_row, col + d_col), ())
+        ])
+        for node in nodes:
+            distance = haversine_distances(node_coords[nearby], node_coords[node])
+            close = (distance <= radius_m) & (nearby != node)
+            walk_from.append(np.full(int(close.sum()), node))
+            walk_to.append(nearby[close])
+            walk_distance.append(distance[close])
+    if not walk_from:
+        return empty
+    return (
+        np.concatenate(walk_from).astype(np.int64),
+        np.concatenate(walk_to).astype(np.int64),
+        np.concatenate(walk_distance),
+    )
+
+
+class ContractionHierarchy():
+    """
+    A contraction hierarchy of a route graph for one objective.
+    Nodes are contracted in order of importance, adding shortcut edges
+    that preserve shortest paths, so a query is two small upward
+    searches that meet at the most important node of the route.
+
+    Attributes:
+        objective (str): the objective the hierarchy was built for
+        rank (np.ndarray): contraction order of each node
+        n_shortcuts (int): number of shortcut edges added
+    """
+
+    def __init__(self, graph: RouteGraph, objective: str = 'time', witness_limit: int = 64):
+        self.objective = objective
+        self.witness_limit = witness_limit
+        n_nodes = graph.n_nodes
+
+        # (u, v) -> (weight, graph edge or -1, middle node or -1), cheapest per pair
+        self._arcs = {}
+        weights = graph.weights[objective].tolist()
+        for edge, (u, v) in enumerate(zip(graph.sources.tolist(), graph.targets.tolist())):
+            if u != v and weights[edge] < self._arcs.get((u, v), (math.inf,))[0]:
+                self._arcs[(u, v)] = (weights[edge], edge, -1)
+
+        # the graph of not yet contracted nodes
+        self._out = [dict() for _ in range(n_nodes)]
+        self._in = [dict() for _ in range(n_nodes)]
+        for (u, v), (weight, _, _) in self._arcs.items():
+            self._out[u][v] = weight
+            self._in[v][u] = weight
+
+        rank = [-1] * n_nodes
+        contracted_neighbours = [0] * n_nodes
+        queue = [(self._priority(v, self._shortcuts(v), contracted_neighbours), v) for v in range(n_nodes)]
+        heapq.heapify(queue)
+        self.n_shortcuts = 0
+        order = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            if rank[v] >= 0:
+                continue
+            # lazy update: contract only if still the least important node
+            shortcuts = self._shortcuts(v)
+            priority = self._priority(v, shortcuts, contracted_neighbours)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, v))
+                continue
+            for u, w, weight in shortcuts:
+                self._arcs[(u, w)] = (weight, -1, v)
+                self._out[u][w] = weight
+                self._in[w][u] = weight
+                self.n_shortcuts += 1
+            for u in self._in[v]:
+                del self._out[u][v]
+                contracted_neighbours[u] += 1
+            for w in self._out[v]:
+                del self._in[w][v]
+                contracted_neighbours[w] += 1
+            self._out[v], self._in[v] = {}, {}
+            rank[v] = order
+            order += 1
+        self.rank = np.array(rank, dtype=np.int64)
+
+        # upward edges for the forward search, downward edges reversed for the backward search
+        self._up = [[] for _ in range(n_nodes)]
+        self._down = [[] for _ in range(n_nodes)]
+        for (u, v), (weight, _, _) in self._arcs.items():
+            if rank[u] < rank[v]:
+                self._up[u].append((v, weight))
+            else:
+                self._down[v].append((u, weight))
+        self._out = self._in = None
+
+    def _priority(self, v: int, shortcuts: list, contracted_neighbours: list) -> int:
+        """
+        Edge difference of contracting `v` plus its contracted neighbours
+        """
+        return len(shortcuts) - len(self._in[v]) - len(self._out[v]) + contracted_neighbours[v]
+
+    def _shortcuts(self, v: int) -> list[tuple[int, int, float]]:
+        """
+        Returns the (u, w, weight) shortcuts needed to contract `v`:
+        paths u -> v -> w with no witness path of the same cost or less
+        """
+        shortcuts = []
+        if not self._out[v]:
+            return shortcuts
+        max_out = max(self._out[v].values())
+        for u, in_weight in self._in[v].items():
+            limit = in_weight + max_out
+            # bounded Dijkstra from u that avoids v
+            dist = {u: 0.0}
+            heap = [(0.0, u)]
+            settled = 0
+            while heap and settled < self.witness_limit:
+                d, x = heapq.heappop(heap)
+                if d > dist[x]:
+                    continue
+                if d > limit:
+                    break
+                settled += 1
+                for y, weight in self._out[x].items():
+                    if y != v and d + weight < dist.get(y, math.inf):
+                        dist[y] = d + weight
+                        heapq.heappush(heap, (d + weight, y))
+            for w, out_weight in self._out[v].items():
+                via = in_weight + out_weight
+                if w != u and dist.get(w, math.inf) > via:
+                    shortcuts.append((u, w, via))
+        return shortcuts
+
+    def query(self, source: int, target: int) -> tuple[float, list[int]]:
+        """
+        Returns the cost and graph edges of the cheapest path from
+        `source` to `target`, or (inf, []) if there is none
+        """
+        if source == target:
+            return 0.0, []
+        forward = self._upward_search(source, self._up)
+        backward = self._upward_search(target, self._down)
+        best, meet = math.inf, -1
+        for node, (d, _) in forward.items():
+            if node in backward and d + backward[node][0] < best:
+                best, meet = d + backward[node][0], node
+        if meet < 0:
+            return math.inf, []
+
+        arcs = []
+        node = meet
+        while forward[node][1] >= 0:
+            arcs.append((forward[node][1], node))
+            node = forward[node][1]
+        arcs.reverse()
+        node = meet
+        while backward[node][1] >= 0:
+            arcs.append((node, backward[node][1]))
+            node = backward[node][1]
+        return best, [edge for arc in arcs for edge in self._unpack(arc)]
+
+    def _upward_search(self, start: int, adjacency: list) -> dict:
+        """
+        Dijkstra over edges towards more important nodes, returning
+        node -> (cost, previous node)
+        """
+        found = {start: (0.0, -1)}
+        heap = [(0.0, start)]
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > found[x][0]:
+                continue
+            for y, weight in adjacency[x]:
+                if d + weight < found.get(y, (math.inf,))[0]:
+                    found[y] = (d + weight, x)
+                    heapq.heappush(heap, (d + weight, y))
+        return found
+
+    def _unpack(self, arc: tuple[int, int]) -> list[int]:
+        """
+        Expands an arc of the hierarchy into the graph edges it stands for
+        """
+        edges = []
+        stack = [arc]
+        while stack:
+            u, v = stack.pop()
+            _, edge, middle = self._arcs[(u, v)]
+            if middle < 0:
+                edges.append(edge)
+            else:
+                # second half pushed first so the first half is expanded first
+                stack.append((middle, v))
+                stack.append((u, middle))
+        return edges
+
+
+class OfflineRouter():
+    """
+    Plans journeys on a route graph without calling the TFL API.
+    Queries use A* with a great circle lower bound where one exists,
+    or a contraction hierarchy for objectives that have been contracted.
+
+    Attributes:
+        graph (RouteGraph): the graph searched
+        max_snap_m (float): furthest a journey point may be from a stop
+        hierarchies (dict): objective -> ContractionHierarchy
+    """
+
+    def __init__(
+            self,
+            graph: RouteGraph,
+            resolver: Optional[PointResolver] = None,
+            max_snap_m: float = 1000.0,
+        ):
+        self.graph = graph
+        self.resolver = resolver
+        self.max_snap_m = max_snap_m
+        self.hierarchies = {}
+        # plain lists index faster than arrays in the search loops
+        self._indptr = graph.indptr.tolist()
+        self._targets = graph.targets.tolist()
+        self._weights = {objective: weight.tolist() for objective, weight in graph.weights.items()}
+        self._stops = {}
+        for node, name in enumerate(graph.node_names):
+            if name is not None:
+                self._stops.setdefault(str(name).lower(), node)
+
+        # lower bound of each objective per metre of great circle distance between
+        # stops, so the cost still to go is at least this times the distance left
+        crow = haversine_distances(graph.node_coords[graph.sources], graph.node_coords[graph.targets])
+        moving = crow > 0
+        self._bound_per_metre = {
+            objective: float(np.min(weight[moving] / crow[moving])) if moving.any() else 0.0
+            for objective, weight in graph.weights.items()
+        }
+
+    def contract(self, objectives: Iterable[str] = ('time',), witness_limit: int = 64):
+        """
+        Builds contraction hierarchies so queries on these objectives
+        skip most of the graph
+        """
+        for objective in objectives:
+            self.hierarchies[objective] = ContractionHierarchy(self.graph, objective, witness_limit)
+
+    def nearest_node(self, point: Union[str, tuple, list]) -> Optional[int]:
+        """
+        Returns the stop nearest a coordinate, postcode or stop name,
+        or None if there is none within `max_snap_m`
+        """
+        coords = parse_coordinates(point)
+        if coords is None and self.resolver is not None:
+            coords = parse_coordinates(self.resolver.resolve(point))
+        if coords is None:
+            return self._stops.get(str(point).strip().lower())
+        if self.graph.n_nodes == 0:
+            return None
+        distance = haversine_distances(self.graph.node_coords, coords)
+        node = int(np.argmin(distance))
+        return node if distance[node] <= self.max_snap_m else None
+
+    def shortest_path(self, source: int, target: int, objective: str = 'time') -> tuple[float, list[int]]:
+        """
+        Returns the cost and edges of the cheapest path between
+        two nodes, or (inf, []) if there is none
+        """
+        if objective in self.hierarchies:
+            return self.hierarchies[objective].query(source, target)
+        if source == target:
+            return 0.0, []
+
+        indptr, targets, weights = self._indptr, self._targets, self._weights[objective]
+        bound = self._bound_per_metre[objective]
+        if bound > 0:
+            heuristic = (bound * haversine_distances(self.graph.node_coords, self.graph.node_coords[target])).tolist()
+        else:
+            heuristic = [0.0] * self.graph.n_nodes
+
+        dist = {source: 0.0}
+        previous = {}
+        heap = [(heuristic[source], 0.0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u == target:
+                break
+            if d > dist[u]:
+                continue
+            for edge in range(indptr[u], indptr[u + 1]):
+                v = targets[edge]
+                cost = d + weights[edge]
+                if cost < dist.get(v, math.inf):
+                    dist[v] = cost
+                    previous[v] = edge
+                    heapq.heappush(heap, (cost + heuristic[v], cost, v))
+        if target not in dist:
+            return math.inf, []
+
+        edges = []
+        node = target
+        while node != source:
+            edge = previous[node]
+            edges.append(edge)
+            node = int(self.graph.sources[edge])
+        edges.reverse()
+        return dist[target], edges
+
+    def costs_from(self, source: int, objective: str = 'time') -> np.ndarray:
+        """
+        Returns the cost of the cheapest path from a node to every
+        node, inf where unreachable
+        """
+        indptr, targets, weights = self._indptr, self._targets, self._weights[objective]
+        dist = [math.inf] * self.graph.n_nodes
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for edge in range(indptr[u], indptr[u + 1]):
+                v = targets[edge]
+                if d + weights[edge] < dist[v]:
+                    dist[v] = d + weights[edge]
+                    heapq.heappush(heap, (dist[v], v))
+        return np.array(dist)
+
+    def od_matrix(
+            self,
+            sources: Sequence[Union[str, tuple]],
+            targets: Sequence[Union[str, tuple]],
+            objective: str = 'time',
+        ) -> np.ndarray:
+        """
+        Returns a (len(sources), len(targets)) matrix of cheapest costs,
+        one search per source, inf where a point has no stop or path
+        """
+        source_nodes = [self.nearest_node(point) for point in sources]
+        target_nodes = np.array([-1 if node is None else node for node in map(self.nearest_node, targets)])
+        matrix = np.full((len(source_nodes), len(target_nodes)), math.inf)
+        reachable = target_nodes >= 0
+        for row, node in enumerate(source_nodes):
+            if node is not None:
+                matrix[row, reachable] = self.costs_from(node, objective)[target_nodes[reachable]]
+        return matrix
+
+    def route(
+            self,
+            source: int,
+            target: int,
+            objective: str = 'time',
+            depart: Optional[datetime] = None,
+        ) -> Optional[Route]:
+        """
+        Returns the cheapest route between two nodes as a Route,
+        departing at `depart` (default now), or None if there is none
+        """
+        _, edges = self.shortest_path(source, target, objective)
+        return self._route_from_edges(edges, depart)
+
+    def _route_from_edges(self, edges: list[int], depart: Optional[datetime] = None) -> Optional[Route]:
+        if not edges:
+            return None
+        legs = {i: self.graph.leg(edge) for i, edge in enumerate(edges)}
+        duration = int(math.ceil(float(self.graph.weights['time'][edges].sum())))
+        depart = (depart or datetime.now()).replace(microsecond=0)
+        return Route.from_legs(
+            legs,
+            duration,
+            depart.isoformat(),
+            (depart + timedelta(minutes=duration)).isoformat(),
+        )
+
+    def plan(
+            self,
+            points: tuple[Union[str, tuple], Union[str, tuple]],
+            route_params: dict = {},
+            objectives: Iterable[str] = OBJECTIVES,
+            depart: Optional[datetime] = None,
+        ) -> Journey:
+        """
+        Plans a journey offline with the best route for each objective,
+        dropping routes found by more than one. The journey has the same
+        shape as one retrieved from the API, so it can be mapped and ranked.
+        """
+        source, target = self.nearest_node(points[0]), self.nearest_node(points[1])
+        routes, seen = {}, set()
+        if source is not None and target is not None:
+            for objective in objectives:
+                _, edges = self.shortest_path(source, target, objective)
+                if edges and tuple(edges) not in seen:
+                    seen.add(tuple(edges))
+                    routes[len(routes)] = self._route_from_edges(edges, depart)
+        journey = Journey.from_routes(points, route_params, routes, retrieved_at=time.time())
+        if not routes:
+            journey.status = "No offline route found"
+        return journey
+
+
+def router_from_params(
+        offline_params,
+        archive: Optional[JourneyArchive],
+        resolver: Optional[PointResolver] = None,
+    ) -> Optional[OfflineRouter]:
+    """
+    Builds an offline router over the journey archive from the
+    `offline_router` block of `params.yml`, or None if it is disabled
+    or there is nothing archived yet
+    """
+    offline_params = offline_params or {}
+    if not offline_params.get('enabled', False) or archive is None or len(archive.legs) == 0:
+        return None
+    graph = graph_from_archive(archive, transfer_radius_m=offline_params.get('transfer_radius_m', 150.0))
+    router = OfflineRouter(graph, resolver, max_snap_m=offline_params.get('max_snap_m', 1000.0))
+    contract = offline_params.get('contract', None)
+    if contract:
+        router.contract(contract)
+    return router
@@ -0,0 +1,162 @@
+"""
+This script resolves journey start and end points to
+canonical coordinates offline, using a sorted postcode
+index built from an ONS Postcode Directory extract and
+memory-mapped at load time
+"""
+
+import argparse
+import csv
+import os
+import re
+from typing import Optional, Union
+
+import numpy as np
+
+POSTCODE_PATTERN = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?[0-9][A-Z]{2}$")
+COORDINATE_PATTERN = re.compile(r"^\s*\(?\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)?\s*$")
+# ONSPD marks postcodes without a grid reference with this latitude
+ONSPD_MISSING_LAT = 99.999999
+
+
+def normalise_postcode(text: str) -> Optional[str]:
+    """
+    This function upper-cases a UK postcode and strips its spaces,
+    returning None if the text is not shaped like a postcode
+    """
+    postcode = str(text).replace(" ", "").upper()
+    if POSTCODE_PATTERN.match(postcode):
+        return postcode
+    return None
+
+
+def parse_coordinates(point: Union[str, tuple, list]) -> Optional[tuple[float, float]]:
+    """
+    This function parses a "lat,lon" string or a (lat, lon) pair,
+    returning None if the point is not a valid coordinate pair
+    """
+    if isinstance(point, (tuple, list)) and len(point) == 2:
+        try:
+            lat, lon = float(point[0]), float(point[1])
+        except (TypeError, ValueError):
+            return None
+    else:
+        match = COORDINATE_PATTERN.match(str(point))
+        if match is None:
+            return None
+        lat, lon = float(match.group(1)), float(match.group(2))
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
+
+
+def build_index(
+        csv_path: str,
+        out_dir: str,
+        postcode_col: str = 'pcds',
+        lat_col: str = 'lat',
+        lon_col: str = 'long',
+    ) -> int:
+    """
+    This function builds a postcode index from a CSV such as the ONS
+    Postcode Directory. Postcodes are written sorted as fixed width
+    bytes in `postcodes.npy` alongside their (lat, lon) in `coords.npy`.
+    Returns the number of postcodes indexed.
+    """
+    postcodes, coords = [], []
+    with open(csv_path, newline='') as file:
+        for row in csv.DictReader(file):
+            postcode = normalise_postcode(row[postcode_col])
+            try:
+                lat, lon = float(row[lat_col]), float(row[lon_col])
+            except ValueError:
+                continue
+            if postcode is None or lat == ONSPD_MISSING_LAT:
+                continue
+            postcodes.append(postcode)
+            coords.append((lat, lon))
+
+    keys = np.array(postcodes, dtype='S7')
+    order = np.argsort(keys, kind='stable')
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, 'postcodes.npy'), keys[order])
+    np.save(os.path.join(out_dir, 'coords.npy'), np.array(coords, dtype=np.float64).reshape(-1, 2)[order])
+    return len(keys)
+
+
+class PostcodeIndex():
+    """
+    A sorted postcode index opened as memory maps, so loading is
+    near instant and a lookup is a binary search touching only
+    the pages it needs.
+
+    Attributes:
+        postcodes (np.ndarray): sorted fixed width postcodes without spaces
+        coords (np.ndarray): (n, 2) array of (lat, lon) for each postcode
+    """
+
+    def __init__(self, index_dir: str):
+        self.postcodes = np.load(os.path.join(index_dir, 'postcodes.npy'), mmap_mode='r')
+        self.coords = np.load(os.path.join(index_dir, 'coords.npy'), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.postcodes)
+
+    def lookup(self, postcode: str) -> Optional[tuple[float, float]]:
+        """
+        Returns the (lat, lon) of a postcode or None if it is not indexed
+        """
+        key = normalise_postcode(postcode)
+        if key is None:
+            return None
+        key = key.encode()
+        position = int(np.searchsorted(self.postcodes, key))
+        if position < len(self.postcodes) and self.postcodes[position] == key:
+            lat, lon = self.coords[position]
+            return float(lat), float(lon)
+        return None
+
+
+class PointResolver():
+    """
+    Turns user supplied journey points into the canonical form sent
+    to the API: "lat,lon" at fixed precision for coordinates and indexed
+    postcodes, the normalised postcode for unindexed postcodes, and the
+    stripped text for anything else (e.g. place names).
+    """
+
+    def __init__(self, index: Optional[PostcodeIndex] = None, precision: int = 6):
+        self.index = index
+        self.precision = precision
+
+    def resolve(self, point: Union[str, tuple, list]) -> str:
+        coords = parse_coordinates(point)
+        if coords is None and self.index is not None:
+            coords = self.index.lookup(point)
+        if coords is not None:
+            return f"{coords[0]:.{self.precision}f},{coords[1]:.{self.precision}f}"
+        return normalise_postcode(point) or str(point).strip()
+
+
+def resolver_from_params(postcode_params) -> PointResolver:
+    """
+    Builds a point resolver from the `postcodes` block of `params.yml`,
+    without an index if none is configured or built yet
+    """
+    postcode_params = postcode_params or {}
+    index_dir = postcode_params.get('index_dir', None)
+    if index_dir and os.path.exists(os.path.join(index_dir, 'postcodes.npy')):
+        return PointResolver(PostcodeIndex(index_dir))
+    return PointResolver()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline postcode index")
+    parser.add_argument("csv_path", help="ONS Postcode Directory (or similar) CSV extract")
+    parser.add_argument("out_dir", help="directory to write the index to")
+    parser.add_argument("--postcode-col", default="pcds")
+    parser.add_argument("--lat-col", default="lat")
+    parser.add_argument("--lon-col", default="long")
+    args = parser.parse_args()
+    n = build_index(args.csv_path, args.out_dir, args.postcode_col, args.lat_col, args.lon_col)
+    print(f"Indexed {n} postcodes into {args.out_dir}")
@@ -0,0 +1,89 @@
+"""
+This script memoises rendered route map html so that
+switching between routes that have already been viewed,
+or prerendered in the background, does not re-render them
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable, Iterable
+from lru import LruCache
+from metrics import METRICS
+
+
+class MapRenderCache():
+    """
+    A bounded LRU cache of rendered map html with a thread pool
+    for prerendering. A render that is already in progress is
+    shared rather than started again.
+
+    Attributes:
+        max_entries (int): maximum number of rendered maps kept
+        hits (int): number of lookups served without rendering
+        misses (int): number of lookups that had to render
+    """
+
+    def __init__(self, max_entries: int = 64, workers: int = 2):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = LruCache(max_entries)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prerender")
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> str:
+        """
+        Returns the html stored for a key, waiting on an in-progress
+        prerender of it or calling `render` if there is neither
+        """
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self.hits += 1
+                METRICS.count_cache('route_maps', True)
+                return html
+            future = self._in_flight.get(key)
+            METRICS.count_cache('route_maps', future is not None)
+            if future is None:
+                self.misses += 1
+                future = Future()
+                self._in_flight[key] = future
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+
+        if owner:
+            self._run(key, render, future)
+        return future.result()
+
+    def prerender(self, jobs: Iterable[tuple[Hashable, Callable[[], str]]]):
+        """
+        Queues `(key, render)` jobs on the background pool,
+        skipping keys that are cached or already being rendered
+        """
+        for key, render in jobs:
+            with self._lock:
+                if key in self._entries or key in self._in_flight:
+                    continue
+                future = Future()
+                self._in_flight[key] = future
+            self._executor.submit(self._run, key, render, future)
+
+    def _run(self, key: Hashable, render: Callable[[], str], future: Future):
+        try:
+            html = render()
+        except Exception as error:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(error)
+            return
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._entries.set(key, html)
+        future.set_result(html)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,205 @@
+"""
+This script contains a cache for TFL API journey
+responses so that popular start/end pairs are not
+requested from the API over and over again
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Union
+
+from lru import LruCache
+
+
+def make_cache_key(
+        start: Union[float, str],
+        end: Union[float, str],
+        route_params: dict,
+    ) -> str:
+    """
+    This function builds a normalised cache key from the start
+    and end points of a journey and the route parameters.
+    Credentials are deliberately not part of the key.
+    """
+    def normalise(point) -> str:
+        return str(point).replace(" ", "").upper()
+
+    params = "&".join(f"{key}={value}" for key, value in sorted(dict(route_params).items()))
+    return f"{normalise(start)}/to/{normalise(end)}?{params}"
+
+
+class ResponseCache():
+    """
+    A TTL cache of decoded API responses with LRU eviction
+    by number of entries and by size in bytes, and an optional
+    sqlite tier on disk that survives restarts. Expired rows are
+    deleted from the disk tier as they are read and, with the rows
+    beyond its own limits, every `prune_every` writes.
+
+    Attributes:
+        ttl (float): seconds an entry stays valid for
+        max_entries (int): maximum number of entries held in memory
+        max_bytes (int): maximum total size of entries held in memory
+        disk_max_entries (int): maximum number of entries kept on disk
+        disk_max_bytes (int): maximum total size of entries kept on disk
+        hits (int): number of lookups served from the cache
+        misses (int): number of lookups not found or expired
+    """
+
+    def __init__(
+            self,
+            ttl: float = 300,
+            max_entries: int = 512,
+            max_bytes: int = 64 * 1024 * 1024,
+            disk_path: Optional[str] = None,
+            disk_max_entries: int = 10000,
+            disk_max_bytes: int = 512 * 1024 * 1024,
+            prune_every: int = 64,
+        ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.prune_every = prune_every
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (expiry time, serialised response)
+        self._entries = LruCache(max_entries, max_bytes, size=lambda entry: len(entry[1]))
+        self._lock = threading.Lock()
+
+        self._disk = None
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, expires REAL, body BLOB)"
+            )
+            self._disk.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns the cached response for a key, or None if the
+        key is missing or has expired
+        """
+        body = self._get_raw(key)
+        # decoded outside the lock so hits are not serialised behind it
+        return None if body is None else json.loads(body)
+
+    def _get_raw(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, body = entry
+                if expires > now:
+                    self.hits += 1
+                    return body
+                self._entries.pop(key)
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT expires, body FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[0] > now:
+                    # promote back into the memory tier
+                    self._entries.set(key, (row[0], row[1]))
+                    self.hits += 1
+                    return row[1]
+                if row is not None:
+                    self._disk.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._disk.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, content: dict):
+        """
+        Stores a decoded response against a key
+        """
+        self.set_raw(key, json.dumps(content, separators=(",", ":")).encode())
+
+    def set_raw(self, key: str, body: bytes):
+        """
+        Stores an already serialised JSON response against a key
+        """
+        expires = time.time() + self.ttl
+        with self._lock:
+            # entries that can never fit in memory are left to the disk tier
+            self._entries.set(key, (expires, body))
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (key, expires, body),
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune_disk()
+                self._disk.commit()
+
+    def _prune_disk(self):
+        """
+        Deletes expired rows from the disk tier and then the rows
+        closest to expiry beyond its entry and byte limits
+        """
+        self._disk.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+        self._disk.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,),
+        )
+        self._disk.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM "
+            "(SELECT key, SUM(LENGTH(body)) OVER (ORDER BY expires DESC, key) AS total FROM responses) "
+            "WHERE total > ?)",
+            (self.disk_max_bytes,),
+        )
+
+    def clear(self):
+        """
+        Removes every entry from both tiers and resets the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM responses")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters and current memory tier usage
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self._entries.evictions,
+                'entries': len(self._entries),
+                'bytes': self._entries.total_size,
+            }
+
+
+def cache_from_params(cache_params) -> Optional[ResponseCache]:
+    """
+    Builds a response cache from the `cache` block of `params.yml`.
+    Returns None when caching is switched off.
+    """
+    if cache_params is None or not cache_params.get('enabled', True):
+        return None
+    return ResponseCache(
+        ttl=cache_params.get('ttl_seconds', 300),
+        max_entries=cache_params.get('max_entries', 512),
+        max_bytes=cache_params.get('max_bytes', 64 * 1024 * 1024),
+        disk_path=cache_params.get('disk_path', None),
+        disk_max_entries=cache_params.get('disk_max_entries', 10000),
+        disk_max_bytes=cache_params.get('disk_max_bytes', 512 * 1024 * 1024),
+    )
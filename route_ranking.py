@@ -0,0 +1,107 @@
+"""
+This script ranks the alternative routes of a journey by
+journey time, distance and emissions, either on a single
+objective, a weighted blend of them, or by Pareto front
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+
+from get_routes import Journey
+
+# objective columns, every objective is minimised
+OBJECTIVES = ('time', 'distance', 'emissions')
+
+# weights of the named rankings offered in the app, 'pareto' is handled separately
+RANKINGS = {
+    'time': (1.0, 0.0, 0.0),
+    'distance': (0.0, 1.0, 0.0),
+    'emissions': (0.0, 0.0, 1.0),
+    'balanced': (1.0, 1.0, 1.0),
+}
+
+
+def objective_matrix(journey: Journey) -> np.ndarray:
+    """
+    This function returns an (n_routes, 3) array of total duration
+    in minutes, distance in metres and gCO2e for each route
+    """
+    return np.array(
+        [
+            (
+                route.total_duration,
+                route.total_distance,
+                np.nan if route.total_co2 is None else route.total_co2,
+            )
+            for _, route in journey.routes.items()
+        ],
+        dtype=np.float64,
+    ).reshape(-1, len(OBJECTIVES))
+
+
+def pareto_front(objectives: np.ndarray, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    This function returns a boolean mask of the non-dominated rows of
+    an (..., n_routes, n_objectives) array, where a route is dominated
+    if another is no worse on every objective and better on at least one.
+    Leading axes are batches of journeys, so thousands of journeys
+    (padded to the same number of routes, with `valid` marking real
+    routes) are handled in one broadcast.
+    """
+    objectives = np.asarray(objectives, dtype=np.float64)
+    if valid is None:
+        valid = np.ones(objectives.shape[:-1], dtype=bool)
+    # padding and missing values can never dominate
+    values = np.where(valid[..., None] & ~np.isnan(objectives), objectives, np.inf)
+
+    # [..., i, j]: route j dominates route i
+    no_worse = (values[..., None, :, :] <= values[..., :, None, :]).all(axis=-1)
+    better = (values[..., None, :, :] < values[..., :, None, :]).any(axis=-1)
+    dominated = (no_worse & better & valid[..., None, :]).any(axis=-1)
+    return valid & ~dominated
+
+
+def weighted_scores(
+        objectives: np.ndarray,
+        weights: Union[tuple, np.ndarray],
+        valid: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+    """
+    This function scalarises an (..., n_routes, n_objectives) array into
+    one score per route, lower being better. Each objective is min-max
+    normalised across the routes of its journey before weighting, so
+    minutes, metres and grams are comparable.
+    """
+    objectives = np.asarray(objectives, dtype=np.float64)
+    if valid is None:
+        valid = np.ones(objectives.shape[:-1], dtype=bool)
+    masked = np.where(valid[..., None], objectives, np.nan)
+    with np.errstate(invalid='ignore'):
+        low = np.nanmin(masked, axis=-2, keepdims=True)
+        span = np.nanmax(masked, axis=-2, keepdims=True) - low
+    span = np.where(span > 0, span, 1.0)
+    normalised = np.nan_to_num((masked - low) / span, nan=0.0)
+    scores = normalised @ np.asarray(weights, dtype=np.float64)
+    return np.where(valid, scores, np.inf)
+
+
+def rank_routes(journey: Journey, ranking: str = 'balanced') -> list[int]:
+    """
+    This function orders the route ids of a journey by a named ranking,
+    ties keeping API order. The 'pareto' ranking lists the Pareto-optimal
+    routes first, each group ordered by the balanced score.
+    """
+    route_ids = list(journey.routes)
+    if not route_ids:
+        return []
+    objectives = objective_matrix(journey)
+    if ranking == 'pareto':
+        scores = weighted_scores(objectives, RANKINGS['balanced'])
+        dominated = ~pareto_front(objectives)
+    else:
+        scores = weighted_scores(objectives, RANKINGS[ranking])
+        dominated = np.zeros(len(route_ids), dtype=bool)
+    # lexsort sorts by the last key first
+    order = np.lexsort((np.arange(len(route_ids)), scores, dominated))
+    return [route_ids[i] for i in order]
@@ -0,0 +1,100 @@
+"""
+This script simplifies route geometry for display on
+the map, dropping vertices that would not be visible at
+the zoom level the map is rendered at
+"""
+
+import math
+from typing import Iterable, Union
+
+import numpy as np
+
+from get_routes import EARTH_RADIUS_M
+
+# web mercator ground resolution at the equator and zoom level 0
+METRES_PER_PIXEL_Z0 = 2 * math.pi * 6378137 / 256
+
+
+def tolerance_for_zoom(zoom: float, latitude: float, pixels: float = 1.0) -> float:
+    """
+    This function converts a tolerance in screen pixels into metres
+    on the ground for a web mercator map at the given zoom and latitude
+    """
+    return pixels * METRES_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / 2**zoom
+
+
+def _to_metres(path: np.ndarray) -> np.ndarray:
+    """
+    Projects (lat, lon) degrees onto a local equirectangular plane in metres,
+    which is accurate enough at the scale of a single route
+    """
+    radians = np.radians(path)
+    x = radians[:, 1] * math.cos(float(radians[:, 0].mean())) * EARTH_RADIUS_M
+    y = radians[:, 0] * EARTH_RADIUS_M
+    return np.column_stack([x, y])
+
+
+def simplify_mask(path: Union[np.ndarray, list], tolerance: float) -> np.ndarray:
+    """
+    This function runs Douglas-Peucker over an (n, 2) array of
+    (lat, lon) points with a tolerance in metres and returns a boolean
+    mask of the points to keep. The distances of every point in a span
+    to its chord are computed in a single vectorised step.
+    """
+    points = _to_metres(np.asarray(path, dtype=np.float64).reshape(-1, 2))
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n <= 2:
+        keep[:] = True
+        return keep
+    keep[0] = keep[-1] = True
+
+    spans = [(0, n - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        chord = end - start
+        length = math.hypot(chord[0], chord[1])
+        if length == 0.0:
+            distances = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            # perpendicular distance via the 2D cross product
+            distances = np.abs(
+                chord[0] * (inner[:, 1] - start[1]) - chord[1] * (inner[:, 0] - start[0])
+            ) / length
+        furthest = int(distances.argmax())
+        if distances[furthest] > tolerance:
+            split = first + 1 + furthest
+            keep[split] = True
+            spans.append((first, split))
+            spans.append((split, last))
+    return keep
+
+
+def simplify_path(path: Union[np.ndarray, list], tolerance: float) -> np.ndarray:
+    """
+    This function returns the points of a path that survive
+    Douglas-Peucker simplification with a tolerance in metres
+    """
+    path = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+    return path[simplify_mask(path, tolerance)]
+
+
+def levels_of_detail(
+        path: Union[np.ndarray, list],
+        zooms: Iterable[float] = range(10, 19),
+        pixels: float = 1.0,
+    ) -> dict:
+    """
+    This function precomputes simplified copies of a path for
+    several zoom levels, returning a dictionary of zoom to path
+    """
+    path = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+    latitude = float(path[:, 0].mean()) if len(path) else 0.0
+    return {
+        zoom: simplify_path(path, tolerance_for_zoom(zoom, latitude, pixels))
+        for zoom in zooms
+    }
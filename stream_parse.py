@@ -0,0 +1,97 @@
+"""
+This script parses a JSON response body as it downloads,
+yielding the items of one top-level array one at a time
+so the whole document is never held in memory decoded
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+# the next character that opens or closes an object, array or string
+_STRUCTURE = re.compile(r'[{}\[\]"]')
+
+
+def _string_end(buffer: str, start: int) -> int:
+    """
+    Returns the index just after the closing quote of the string whose
+    contents begin at `start`, or -1 if it has not fully arrived yet.
+    `str.find` skips long strings such as lineStrings far faster than a regex.
+    """
+    quote = buffer.find('"', start)
+    while quote != -1:
+        # a quote is escaped by an odd number of backslashes before it
+        escape = quote
+        while escape > start and buffer[escape - 1] == '\\':
+            escape -= 1
+        if (quote - escape) % 2 == 0:
+            return quote + 1
+        quote = buffer.find('"', quote + 1)
+    return -1
+
+
+def iter_array_items(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """
+    This function takes the body of a JSON object as an iterable of
+    byte chunks and yields each object or array item of its top-level
+    `key` array as soon as the item has arrived. Only the item being
+    read is buffered, everything else in the document is skipped.
+    Raises a ValueError if the body is cut short or has no `key` array.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    pos = 0
+    depth = 0
+    # last string seen in the top-level object, i.e. the key of the next value
+    last_string = None
+    in_array = False
+    found = False
+    item_start = None
+
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        while True:
+            match = _STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char = match.group()
+            if char == '"':
+                end = _string_end(buffer, match.end())
+                if end == -1:
+                    # the string carries on in the next chunk
+                    pos = match.start()
+                    break
+                if depth == 1:
+                    last_string = buffer[match.end():end - 1]
+                pos = end
+                continue
+
+            pos = match.end()
+            if char in '{[':
+                depth += 1
+                if depth == 2 and char == '[' and last_string == key:
+                    in_array = found = True
+                elif in_array and depth == 3:
+                    item_start = match.start()
+            else:
+                depth -= 1
+                if in_array and depth == 2 and item_start is not None:
+                    yield json.loads(buffer[item_start:pos])
+                    item_start = None
+                elif in_array and depth == 1:
+                    in_array = False
+
+        # drop what has been read, keeping any item still arriving
+        cut = pos if item_start is None else item_start
+        buffer = buffer[cut:]
+        pos -= cut
+        if item_start is not None:
+            item_start = 0
+
+    decoder.decode(b"", final=True)
+    if depth != 0:
+        raise ValueError("Response ended before the end of the JSON document")
+    if not found:
+        raise ValueError(f"Response has no '{key}' array")
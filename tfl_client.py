@@ -0,0 +1,234 @@
+"""
+This script contains a long-lived client for the TFL API
+that holds the credentials and a pooled keep-alive session
+so journeys can share connections, timeouts and retries
+"""
+
+import random
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Union
+from urllib.parse import quote
+
+if TYPE_CHECKING:
+    import requests
+
+# live journey planner endpoint
+TFL_JOURNEY_URL = "https://api.tfl.gov.uk/Journey/JourneyResults/"
+# the credentials in a journey url's query string
+_CREDENTIAL_PARAMS = re.compile(r"(app_(?:id|key)=)[^&\s'\"]*")
+
+
+class Credentials():
+    def __init__(self, app_id, app_key):
+        self.app_id = app_id
+        self.app_key = app_key
+
+
+def load_credentials(file: str) -> Credentials:
+    """
+    This function accesses the text file with
+    the TFL API credentials and stores them in
+    a Credentials container
+    """
+    with open(file, 'r') as file:
+        lines = file.readlines()
+
+    app_id = lines[0].replace(" ", "").replace("\n", "").split(':')[1]
+    app_key = lines[1].replace(" ", "").replace("\n", "").split(':')[1]
+
+    return Credentials(app_id, app_key)
+
+
+class TokenBucket():
+    """
+    A thread-safe token bucket rate limiter.
+
+    Attributes:
+        rate (float): tokens added per second
+        capacity (float): maximum number of tokens, i.e. the allowed burst
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: Optional[float] = None) -> "TokenBucket":
+        """
+        Builds a bucket from a per-minute quota such as the TFL API's
+        500 requests per minute per key
+        """
+        return cls(requests_per_minute / 60, burst or max(requests_per_minute / 60, 1))
+
+    def acquire(self):
+        """
+        Blocks until a token is available and then takes it
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TflClient():
+    """
+    A reusable client for the TFL API.
+
+    Attributes:
+        credentials (Credentials): API id and key pair
+        base_url (str): root of the journey planner endpoint, the live API by default
+        timeout (tuple): connect and read timeouts in seconds
+        max_retries (int): number of retries on 429/5xx responses or connection errors
+        backoff_factor (float): base number of seconds for exponential backoff
+        session (requests.Session): pooled session shared by every request,
+            created with its first use so building a client does not import requests
+        rate_limiter (TokenBucket): optional limiter applied to every request sent
+    """
+
+    retry_status_codes = (429, 500, 502, 503, 504)
+
+    def __init__(
+            self,
+            credentials: Credentials,
+            base_url: Optional[str] = None,
+            pool_size: int = 10,
+            connect_timeout: float = 3.05,
+            read_timeout: float = 20.0,
+            max_retries: int = 3,
+            backoff_factor: float = 0.5,
+            max_backoff: float = 10.0,
+            rate_limiter: Optional[TokenBucket] = None,
+        ):
+        self.credentials = credentials
+        self.base_url = base_url or TFL_JOURNEY_URL
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter
+        self.pool_size = pool_size
+
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    @classmethod
+    def from_params(cls, params) -> "TflClient":
+        """
+        Builds a client from the default block of `params.yml`,
+        loading the credentials file once
+        """
+        client_params = params.get('client', None) or {}
+        rate_limiter = None
+        requests_per_minute = client_params.get('requests_per_minute', None)
+        if requests_per_minute:
+            rate_limiter = TokenBucket.per_minute(requests_per_minute)
+        return cls(
+            credentials=load_credentials(params.api_cred),
+            base_url=client_params.get('base_url', None),
+            pool_size=client_params.get('pool_size', 10),
+            connect_timeout=client_params.get('connect_timeout', 3.05),
+            read_timeout=client_params.get('read_timeout', 20.0),
+            max_retries=client_params.get('max_retries', 3),
+            backoff_factor=client_params.get('backoff_factor', 0.5),
+            rate_limiter=rate_limiter,
+        )
+
+    def journey_url(
+            self,
+            start: Union[float, str],
+            end: Union[float, str],
+            route_params: dict,
+        ) -> str:
+        """
+        This function constructs the journey planner url for a
+        start and end point with any additional route parameters
+        """
+        url = (
+            f"{self.base_url}{start}/to/{end}"
+            f"?app_id={self.credentials.app_id}&app_key={self.credentials.app_key}"
+        )
+        for key, value in route_params.items():
+            url += f"&{key}={value}"
+        return url
+
+    def describe_error(self, error: Exception) -> str:
+        """
+        Describes a failed request for logs and journey statuses with
+        the credentials taken out, as request errors quote the url
+        """
+        message = _CREDENTIAL_PARAMS.sub(r"\1<redacted>", f"{type(error).__name__}: {error}")
+        if self.credentials.app_key:
+            for form in {str(self.credentials.app_key), quote(str(self.credentials.app_key), safe="")}:
+                message = message.replace(form, "<redacted>")
+        return message
+
+    def get(self, url: str, stream: bool = False, headers: Optional[dict] = None) -> "requests.Response":
+        """
+        Executes a GET request through the pooled session, retrying
+        with jittered exponential backoff on 429/5xx responses and
+        connection errors. The last response or error is returned/raised.
+        With `stream=True` the body is left to be read by the caller.
+        `headers` are sent with every attempt, e.g. If-None-Match.
+        """
+        import requests
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, timeout=self.timeout, stream=stream, headers=headers)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in self.retry_status_codes or attempt == self.max_retries:
+                return response
+            # hand the connection back to the pool before retrying
+            response.close()
+            time.sleep(self._backoff(attempt, response.headers.get('Retry-After')))
+        return response
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Seconds to wait before the next attempt. A numeric Retry-After
+        header from the API takes precedence over the backoff schedule.
+        """
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        delay = self.backoff_factor * (2 ** attempt)
+        return min(delay * random.uniform(0.5, 1.5), self.max_backoff)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()